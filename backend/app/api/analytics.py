@@ -1,17 +1,49 @@
-from fastapi import APIRouter, HTTPException
+import logging
+from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel
+from app.core.session_recorder import open_recorder, recording
+from app.core.session_store import get_session_store
 from app.services.analytics_service import AnalyticsService
+from app.services.call_index import get_call_index
+from app.services.performance_rollups import get_rollup_store
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 class ReportRequest(BaseModel):
     session_id: str
 
+async def record_report(session_id: str, report: dict):
+    # The report is still returned if the rollups or the call index can't take it
+    try:
+        session = await get_session_store().get_session(session_id)
+        await get_rollup_store().record_report(session.get("agent_name"), session_id, report)
+    except Exception as e:
+        logger.error(f"Failed to record report for {session_id} in the rollups: {e}")
+    try:
+        await get_call_index().record_report(session_id, report)
+    except Exception as e:
+        logger.error(f"Failed to record report for {session_id} in the call index: {e}")
+
 @router.post("/end-call")
 async def end_call(request: ReportRequest):
     service = AnalyticsService()
     try:
-        report = await service.generate_report(request.session_id)
+        with recording(open_recorder(request.session_id, create=False)) as recorder:
+            if recorder is not None:
+                recorder.write("end_call", {})
+            report = await service.generate_report(request.session_id)
+            if isinstance(report, dict) and "error" not in report:
+                await record_report(request.session_id, report)
         return report
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/analytics/agents")
+async def agent_leaderboard():
+    return await get_rollup_store().leaderboard()
+
+@router.get("/analytics/agents/{agent_name}")
+async def agent_performance(agent_name: str, days: int = Query(7, ge=1, le=90)):
+    return await get_rollup_store().get_agent_stats(agent_name, days)
@@ -0,0 +1,34 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Query
+from app.services.call_index import decode_cursor, get_call_index
+
+router = APIRouter(prefix="/calls", tags=["calls"])
+
+@router.get("/search")
+async def search_calls(
+    q: str = Query(None, description="Words to look for in summaries, objections and transcripts"),
+    agent: str = Query(None),
+    since: str = Query(None, description="ISO date or timestamp"),
+    until: str = Query(None, description="ISO date or timestamp"),
+    semantic: bool = Query(False, description="Rank by meaning instead of matching words"),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str = Query(None, description="next_cursor from the previous page"),
+):
+    if semantic and cursor:
+        raise HTTPException(status_code=400, detail="semantic search returns a single page; cursor is only for word search")
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    service = get_call_index()
+    try:
+        if semantic:
+            if not q:
+                raise HTTPException(status_code=400, detail="semantic search needs q")
+            return await asyncio.to_thread(service.semantic_search, q, agent, since, until, limit)
+        return await asyncio.to_thread(service.search, q, agent, since, until, limit, cursor)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,6 +1,14 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from app.services.rag_service import RAGService
+from app.services.assist_coordinator import get_assist_coordinator
+from app.core.session_store import get_session_store
+from app.core.metrics import ASSIST_REQUESTS
+from app.core.session_recorder import open_recorder, recording
+from app.core.tracing import span
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -10,14 +18,27 @@ class AssistRequest(BaseModel):
 
 @router.post("/assist")
 async def assist_agent(request: AssistRequest):
-    print(f"Assist request received for session: {request.session_id} (Trigger: {request.trigger_word})")
+    logger.info(f"Assist request received for session: {request.session_id} (Trigger: {request.trigger_word})")
     service = RAGService()
     try:
-        result = await service.process_assist_request(request.session_id, request.trigger_word)
-        print(f"RAG Result: {result}")
+        with span("assist", session_id=request.session_id, trigger_word=request.trigger_word), \
+                recording(open_recorder(request.session_id, create=False)) as recorder:
+            if recorder is not None:
+                # The transcript so far anchors the replayed request to the same point in the call
+                lines = await get_session_store().get_transcript_lines(request.session_id)
+                recorder.write("assist", {"trigger_word": request.trigger_word, "transcript_lines": len(lines)})
+            # Repeated requests for the call share, supersede or reuse one pipeline run
+            result, fresh = await get_assist_coordinator().assist(
+                request.session_id, request.trigger_word,
+                lambda lines: service.process_assist_request(request.session_id, request.trigger_word, lines),
+            )
+        ASSIST_REQUESTS.labels(status=result.get("status", "error")).inc()
+        logger.debug(f"RAG Result: {result}")
+        # Also deliver to the dashboard over the call's socket, on whichever worker holds it
+        if fresh:
+            await get_session_store().push(request.session_id, {"type": "assist", **result})
         return result
     except Exception as e:
-        print(f"RAG Error: {e}")
-        import traceback
-        traceback.print_exc()
+        ASSIST_REQUESTS.labels(status="exception").inc()
+        logger.exception(f"RAG Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,16 +1,37 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
-from app.services.deepgram_service import DeepgramService
-from app.core.state import transcript_store
+from app.services.stt_service import get_stt_service
+from app.core.config import settings
+from app.core.session_store import get_session_store
+import asyncio
 import logging
-import json
 import datetime
+import time
+from contextlib import ExitStack
 from app.services.summary_service import SummaryService
 from app.services.agent_service import AgentService
 from app.services.analytics_service import AnalyticsService
+from app.services.vad_service import SpeechGate
+from app.services.audio_codec import MAX_CHANNELS, MAX_SAMPLE_RATE, MIN_SAMPLE_RATE, AudioFormat, DecodedSource, decoder_available, negotiate_format
+from app.services.resampler import TARGET_RATE, AudioNormalizer
+from app.services.client_protocol import get_encoder, negotiate_protocol
+from app.services.speculative_retrieval import get_speculative_retriever, session_stats
+from app.services.lead_context import LeadContextService
+from app.services.performance_rollups import get_rollup_store
+from app.services.call_index import get_call_index
+from app.core.session_recorder import open_recorder, recording
+from app.core.metrics import ACTIVE_SESSIONS, AUDIO_BUFFER_BYTES, AUDIO_BYTES, DOWNSTREAM_BYTES, STT_FIRST_TRANSCRIPT_SECONDS, TRANSCRIPTS
+from app.core.tracing import span
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+async def bootstrap_lead_context(session_id: str, lead_id: str | None, lead_name: str | None):
+    try:
+        await LeadContextService().bootstrap(session_id, lead_id, lead_name)
+    except Exception as e:
+        # Assists still work without it, just less personalized
+        logger.error(f"Lead context bootstrap failed for {session_id}: {e}")
+
 @router.websocket("/ws/audio")
 async def websocket_endpoint(
     websocket: WebSocket, 
@@ -18,41 +39,114 @@ async def websocket_endpoint(
     agent_name: str = Query("Agent"),
     lead_name: str = Query("Lead"),
     lead_id: str = Query(None),
-    language: str = Query("en")
+    language: str = Query("en"),
+    codec: str = Query(None, description="pcm (default), webm/opus, ogg, wav or mp3; or send an init message"),
+    sample_rate: int = Query(None, ge=MIN_SAMPLE_RATE, le=MAX_SAMPLE_RATE, description="PCM sample rate, default 16000"),
+    channels: int = Query(None, ge=1, le=MAX_CHANNELS, description="PCM channel count, default 1"),
+    protocol: str = Query(None, description="json (default) or binary; or offer the copilot.binary.v1 subprotocol")
 ):
-    print(f"New WebSocket connection request: {session_id} (Agent: {agent_name}, Lead: {lead_name}, Language: {language})")
-    await websocket.accept()
-    print(f"WebSocket accepted: {session_id}")
-    deepgram_service = DeepgramService()
+    logger.info(f"New WebSocket connection request: {session_id} (Agent: {agent_name}, Lead: {lead_name}, Language: {language})")
+    protocol, subprotocol = negotiate_protocol(protocol, websocket.scope.get("subprotocols") or [])
+    await websocket.accept(subprotocol=subprotocol)
+    logger.info(f"WebSocket accepted: {session_id} ({protocol} protocol)")
+    call_started_at = time.monotonic()
+    ACTIVE_SESSIONS.inc()
+    # One trace span for the whole call; STT, summary and DB spans nest under it. The
+    # recording (when SESSION_RECORD_DIR is set) likewise covers everything the call triggers.
+    session_scope = ExitStack()
+    session_scope.enter_context(span("call.session", session_id=session_id, agent=agent_name, language=language))
+    recorder = session_scope.enter_context(recording(open_recorder(session_id)))
+    stt_service = get_stt_service()
+    session_store = get_session_store()
+    speculative = get_speculative_retriever()
     
-    # Initialize transcript store for this session
-    if session_id not in transcript_store:
-        transcript_store[session_id] = []
+    # Claim the session for this worker; /assist results from any worker come back on push_queue
+    push_queue = await session_store.register_socket(session_id, {
+        "agent_name": agent_name,
+        "lead_name": lead_name,
+        "lead_id": lead_id,
+        "language": language
+    })
+    send_lock = asyncio.Lock()
+    encoder = get_encoder(protocol)
+    sent_bytes = DOWNSTREAM_BYTES.labels(protocol=protocol)
+
+    async def send(message: dict):
+        """Every message to the client goes through here, encoded once for its protocol."""
+        async with send_lock:
+            # Encoded under the lock: binary deltas depend on the order frames go out
+            for frame in encoder.encode(message):
+                if isinstance(frame, bytes):
+                    await websocket.send_bytes(frame)
+                else:
+                    await websocket.send_text(frame)
+                sent_bytes.inc(len(frame))
+
+    # Load the Lead's profile and fund shortlist while the call gets going
+    bootstrap_task = asyncio.create_task(bootstrap_lead_context(session_id, lead_id, lead_name))
+
+    async def forward_pushes():
+        while True:
+            await send(await push_queue.get())
+
+    push_task = asyncio.create_task(forward_pushes())
         
     audio_buffer = bytearray()
+    audio_format = client_format = None
+    normalizer = None
+    speech_gate = None
+    # Per-session audio volume: from the client, and handed to the STT provider
+    bytes_in = bytes_out = 0
+    first_audio_at = None
+    first_transcript_seen = False
 
     try:
-        # We need to intercept the message to store it
-        original_send_text = websocket.send_text
-        
-        async def intercepted_send_text(data: str):
-            # Parse the data to extract transcript
-            try:
-                # print(f"Sending to client: {data[:50]}...") # Verbose
-                msg = json.loads(data)
-                if msg.get("type") == "transcript" and msg.get("is_final"):
-                    print(f"Received final transcript: {msg.get('data')}")
-                    transcript_store[session_id].append(msg.get("data"))
-            except:
-                pass
-            await original_send_text(data)
-            
+        try:
+            client_format, pending_audio, from_init = await negotiate_format(websocket, codec, sample_rate, channels)
+        except ValueError as e:
+            await send({"type": "error", "message": str(e)})
+            return
+        logger.info(f"Audio format for {session_id}: {client_format.describe()}")
+        if recorder is not None:
+            recorder.write("start", {
+                "session_id": session_id,
+                "agent_name": agent_name,
+                "lead_name": lead_name,
+                "lead_id": lead_id,
+                "language": language,
+                **client_format.describe(),
+            })
+        if from_init:
+            await send({"type": "init_ack", **client_format.describe()})
+
+        # PCM at other rates or channel counts becomes 16 kHz mono for STT, VAD and the recording
+        audio_format = client_format
+        if client_format.is_pcm and (client_format.sample_rate != TARGET_RATE or client_format.channels != 1):
+            normalizer = AudioNormalizer(client_format.sample_rate, client_format.channels)
+            audio_format = AudioFormat()
+
+        # Optional VAD stage: keep silence from going upstream and/or into the recording.
+        # It needs PCM; compressed audio is passed through untouched.
+        if settings.VAD_GATE_ENABLED or settings.VAD_TRIM_RECORDING:
+            if audio_format.is_pcm:
+                speech_gate = SpeechGate()
+            else:
+                logger.info(f"VAD skipped for {session_id}: needs PCM, got {audio_format.describe()}")
+
         class WebSocketWrapper:
             def __init__(self, ws):
                 self.ws = ws
-            async def send_text(self, data: str):
+            async def send_message(self, msg: dict):
+                nonlocal first_transcript_seen
+                if recorder is not None:
+                    # Upstream bytes so far let the replay emit it at the same point in the audio
+                    recorder.write("transcript", {"message": msg, "upstream_bytes": bytes_out})
                 try:
-                    msg = json.loads(data)
+                    if msg.get("type") == "transcript":
+                        TRANSCRIPTS.labels(final=str(bool(msg.get("is_final")))).inc()
+                        if not first_transcript_seen and first_audio_at is not None:
+                            first_transcript_seen = True
+                            STT_FIRST_TRANSCRIPT_SECONDS.labels(provider=settings.STT_PROVIDER).observe(time.perf_counter() - first_audio_at)
                     if msg.get("type") == "transcript" and msg.get("is_final"):
                         # Map Speaker ID to Name
                         speaker_id = msg.get("speaker")
@@ -63,63 +157,124 @@ async def websocket_endpoint(
                             speaker_name = agent_name
                         elif speaker_id == 1:
                             speaker_name = lead_name
-                        else:
+                        elif speaker_id is not None:
                             speaker_name = f"Speaker {speaker_id}"
                             
                         msg["speaker_name"] = speaker_name
                         
                         # Store in transcript store (optional: store with name)
-                        transcript_store[session_id].append(f"{speaker_name}: {msg.get('data')}")
-                        
-                        # Send modified JSON
-                        await self.ws.send_text(json.dumps(msg))
-                        return
+                        await session_store.append_transcript(session_id, f"{speaker_name}: {msg.get('data')}")
+                        # Prefetch context for the Lead's (or an unlabelled speaker's) words ahead of any assist
+                        if speaker_id != 0:
+                            speculative.on_final_utterance(session_id, msg.get("data") or "")
                 except Exception as e:
-                    print(f"Error mapping speaker: {e}")
-                    pass
-                await self.ws.send_text(data)
+                    logger.error(f"Error mapping speaker: {e}")
+                await send(msg)
             async def receive_bytes(self):
-                data = await self.ws.receive_bytes()
-                # print(f"Received {len(data)} bytes from client") # Verbose
-                audio_buffer.extend(data)
+                nonlocal bytes_out
+                data = await self._receive()
+                bytes_out += len(data)
                 return data
+            async def _receive(self):
+                nonlocal first_audio_at, pending_audio, bytes_in
+                while True:
+                    if pending_audio:
+                        raw, pending_audio = pending_audio, b""
+                    else:
+                        raw = await self.ws.receive_bytes()
+                    bytes_in += len(raw)
+                    if recorder is not None:
+                        recorder.write("audio", raw)
+                    AUDIO_BYTES.labels(direction="client").inc(len(raw))
+                    data = normalizer.process(raw) if normalizer is not None else raw
+                    if raw and not data:
+                        continue  # a partial frame, held until the rest arrives
+                    if first_audio_at is None and data:
+                        first_audio_at = time.perf_counter()
+                    if not data or speech_gate is None:
+                        audio_buffer.extend(data)
+                        AUDIO_BUFFER_BYTES.inc(len(data))
+                        return data
+                    speech = speech_gate.process(data)
+                    recorded = speech if settings.VAD_TRIM_RECORDING else data
+                    audio_buffer.extend(recorded)
+                    AUDIO_BUFFER_BYTES.inc(len(recorded))
+                    if not settings.VAD_GATE_ENABLED:
+                        return data
+                    if speech:
+                        return speech
+                    # Silence: nothing goes upstream, the STT provider keeps its stream alive
 
         wrapper = WebSocketWrapper(websocket)
+        source = wrapper
+        if not audio_format.is_pcm and not stt_service.accepts_compressed:
+            # Only providers that need samples pay for decoding
+            if not decoder_available():
+                logger.error(f"{settings.STT_PROVIDER} STT needs PCM and ffmpeg is not installed to decode {audio_format.codec}")
+                await send({"type": "error", "message": f"{audio_format.codec} audio can't be decoded on this server; stream 16-bit PCM instead"})
+                return
+            source = DecodedSource(wrapper, audio_format)
         
-        print("Starting Deepgram transcription...")
+        logger.info("Starting transcription...")
         # The new start_transcription handles the loop internally
-        await deepgram_service.start_transcription(wrapper, language)
-        print("Deepgram transcription finished.")
+        with span("call.stt", provider=settings.STT_PROVIDER):
+            await stt_service.start_transcription(source, language, audio_format)
+        logger.info("Transcription finished.")
 
     except WebSocketDisconnect:
         logger.info(f"Client disconnected: {session_id}")
     except Exception as e:
         logger.error(f"WebSocket Error: {e}")
     finally:
+        call_seconds = time.monotonic() - call_started_at
+        push_task.cancel()
+        bootstrap_task.cancel()
+        await session_store.unregister_socket(session_id)
+        ACTIVE_SESSIONS.dec()
+
+        if speech_gate is not None and speech_gate.bytes_in:
+            logger.info(f"VAD kept {speech_gate.bytes_out}/{speech_gate.bytes_in} bytes for session {session_id}")
+
         # Save audio to file
         import wave
         
         try:
-            if len(audio_buffer) > 0:
-                filename = f"audio_{session_id}.wav"
-                with wave.open(filename, "wb") as wf:
-                    wf.setnchannels(1)
-                    wf.setsampwidth(2) # 16-bit
-                    wf.setframerate(16000)
-                    wf.writeframes(audio_buffer)
+            if len(audio_buffer) > 0 and audio_format is not None:
+                filename = f"audio_{session_id}.{audio_format.extension}"
+                if audio_format.is_pcm:
+                    with wave.open(filename, "wb") as wf:
+                        wf.setnchannels(audio_format.channels)
+                        wf.setsampwidth(2) # 16-bit
+                        wf.setframerate(audio_format.sample_rate)
+                        wf.writeframes(audio_buffer)
+                else:
+                    # Compressed streams are saved as received; no decode needed
+                    with open(filename, "wb") as f:
+                        f.write(audio_buffer)
                 logger.info(f"Saved audio to {filename}")
                 
             # Generate Summary and Analytics
-            full_transcript = " ".join(transcript_store.get(session_id, []))
+            transcript_lines = await session_store.get_transcript_lines(session_id)
+            full_transcript = " ".join(transcript_lines)
             if full_transcript:
-                print(f"Generating summary for session {session_id}...")
+                logger.info(f"Generating summary for session {session_id}...")
                 summary_service = SummaryService()
-                summary = await summary_service.generate_summary(full_transcript, lead_name=lead_name, agent_name=agent_name)
+                summary = await summary_service.generate_summary("\n".join(transcript_lines), lead_name=lead_name, agent_name=agent_name)
                 
                 # Mock Analytics (or use real if available)
                 analytics_service = AnalyticsService()
                 # analytics = analytics_service.generate_report(full_transcript) # This might be slow/expensive
                 analytics = {"sentiment": "Positive", "duration": "Unknown"} # Placeholder
+                analytics["duration_seconds"] = round(call_seconds, 1)
+                analytics["audio"] = {
+                    **(client_format.describe() if client_format else {}),
+                    "normalized": normalizer is not None,
+                    "bytes_in": bytes_in,
+                    "bytes_out": bytes_out,
+                    "kbps_in": round(bytes_in * 8 / 1000 / call_seconds, 1) if call_seconds else None,
+                }
+                analytics["speculation"] = session_stats(await session_store.get_session(session_id))
+                logger.info(f"Speculative retrieval for {session_id}: {analytics['speculation']}")
                 
                 history_entry = {
                     "timestamp": datetime.datetime.now().isoformat(),
@@ -130,19 +285,33 @@ async def websocket_endpoint(
                     "session_id": session_id
                 }
                 
-                print(f"Call Summary: {summary}")
-                print(f"History Entry to Save: {history_entry}")
+                logger.info(f"Call Summary: {summary}")
+                logger.debug(f"History Entry to Save: {history_entry}")
+                try:
+                    await get_rollup_store().record_call(agent_name, history_entry)
+                except Exception as e:
+                    logger.error(f"Failed to record call {session_id} in the rollups: {e}")
+                try:
+                    profile = ((await session_store.get_session(session_id)).get("lead_context") or {}).get("profile") or {}
+                    await get_call_index().index_call(history_entry, lead_name, agent_name, profile.get("investor_id"))
+                except Exception as e:
+                    logger.error(f"Failed to index call {session_id}: {e}")
                 
                 if lead_id or lead_name:
-                    print(f"Updating chat history for lead {lead_id} (Name: {lead_name})...")
+                    logger.info(f"Updating chat history for lead {lead_id} (Name: {lead_name})...")
                     agent_service = AgentService()
                     success = await agent_service.update_chat_history(lead_id, history_entry, lead_name=lead_name)
                     if success:
-                        print(f"Successfully updated chat history for lead {lead_id}")
+                        logger.info(f"Successfully updated chat history for lead {lead_id}")
                     else:
-                        print(f"Failed to update chat history for lead {lead_id}")
+                        logger.warning(f"Failed to update chat history for lead {lead_id}")
                 else:
-                    print("No lead_id or lead_name provided, skipping history update.")
+                    logger.info("No lead_id or lead_name provided, skipping history update.")
                 
         except Exception as e:
             logger.error(f"Failed to save audio/summary: {e}")
+        finally:
+            AUDIO_BUFFER_BYTES.dec(len(audio_buffer))
+            if recorder is not None:
+                recorder.write("end", {"duration_seconds": round(call_seconds, 3), "bytes_in": bytes_in, "bytes_out": bytes_out})
+            session_scope.close()
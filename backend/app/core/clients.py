@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import threading
+import time
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Per-dependency timeout for the startup connection probes
+PROBE_TIMEOUT = 5.0
+EMBEDDING_MODEL = "models/text-embedding-004"
+
+# Clients are shared by every request on this worker and built on first use, so importing
+# the app doesn't load the SDKs. Keyed by their settings, so a changed URL gets a new client.
+_supabase = {}
+_embeddings = {}
+# The warm-up probes and the first requests ask for clients from several threads at once
+_clients_lock = threading.Lock()
+
+def get_supabase():
+    key = (settings.SUPABASE_URL, settings.SUPABASE_KEY)
+    if key not in _supabase:
+        with _clients_lock:
+            if key not in _supabase:
+                from supabase import create_client
+                client = create_client(*key)
+                if settings.SESSION_RECORD_DIR:
+                    from app.core.session_recorder import record_http
+                    record_http(client.postgrest.session)
+                # Published only once hooked, so no caller gets an unrecorded client
+                _supabase[key] = client
+    return _supabase[key]
+
+def get_embeddings():
+    key = (settings.GOOGLE_API_KEY, settings.GOOGLE_API_BASE_URL)
+    if key not in _embeddings:
+        with _clients_lock:
+            if key not in _embeddings:
+                from langchain_google_genai import GoogleGenerativeAIEmbeddings
+                _embeddings[key] = GoogleGenerativeAIEmbeddings(
+                    model=EMBEDDING_MODEL,
+                    google_api_key=settings.GOOGLE_API_KEY,
+                    base_url=settings.GOOGLE_API_BASE_URL
+                )
+    return _embeddings[key]
+
+# Startup progress for /ready: "starting" until warm_up() finishes, then "ready" or "degraded"
+readiness = {"status": "starting", "checks": {}, "warmup_seconds": None}
+
+def _probe_supabase():
+    get_supabase().table("agents").select("agent_id").limit(1).execute()
+
+def _load_llm_clients():
+    from app.services.llm_gateway import get_llm_gateway
+    get_llm_gateway()
+
+def _load_tokenizer():
+    from app.services.prompt_builder import count_tokens
+    count_tokens("warm up")
+
+def _load_fund_snapshot():
+    from app.services.fund_snapshot import get_fund_snapshot
+    if get_fund_snapshot() is None:
+        raise RuntimeError(f"No fund snapshot in {settings.FUND_SNAPSHOT_DIR}")
+
+async def _probe_redis():
+    from app.core.session_store import RedisSessionStore, get_session_store
+    store = get_session_store()
+    if isinstance(store, RedisSessionStore):
+        await store.redis.ping()
+
+async def _check(name: str, probe):
+    start = time.perf_counter()
+    try:
+        if asyncio.iscoroutinefunction(probe):
+            await asyncio.wait_for(probe(), PROBE_TIMEOUT)
+        else:
+            await asyncio.wait_for(asyncio.to_thread(probe), PROBE_TIMEOUT)
+        readiness["checks"][name] = {"ok": True, "ms": round((time.perf_counter() - start) * 1000, 1)}
+    except Exception as e:
+        logger.warning(f"Warm-up check {name} failed: {e!r}")
+        readiness["checks"][name] = {"ok": False, "error": repr(e)}
+
+async def warm_up():
+    """
+    Builds the shared clients and opens their connections (a one-row Supabase query,
+    a Redis ping) so the first call doesn't pay for SDK imports and TLS handshakes.
+    """
+    start = time.perf_counter()
+    checks = [
+        _check("supabase", _probe_supabase),
+        _check("embeddings", get_embeddings),
+        _check("llm", _load_llm_clients),
+        _check("tokenizer", _load_tokenizer),
+        _check("redis", _probe_redis),
+    ]
+    if settings.FUND_SNAPSHOT_DIR:
+        checks.append(_check("fund_snapshot", _load_fund_snapshot))
+    await asyncio.gather(*checks)
+    readiness["warmup_seconds"] = round(time.perf_counter() - start, 3)
+    readiness["status"] = "ready" if all(c["ok"] for c in readiness["checks"].values()) else "degraded"
+    logger.info(f"Warm-up {readiness['status']} in {readiness['warmup_seconds']}s: {readiness['checks']}")
@@ -3,13 +3,85 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_KEY: str
-    DEEPGRAM_API_KEY: str
+    DEEPGRAM_API_KEY: str = ""
     GROQ_API_KEY: str
     OPENROUTER_EMBEDDING_KEY: str
     GOOGLE_API_KEY: str
 
+    # Upstream endpoints (overridable so the benchmark can point at local fakes)
+    DEEPGRAM_URL: str = "wss://api.deepgram.com/v1/listen"
+    GROQ_BASE_URL: str = "https://api.groq.com"
+    GOOGLE_API_BASE_URL: str | None = None
+
+    # LLM gateway: Groq first, then an OpenAI-compatible fallback (OpenRouter unless overridden)
+    LLM_MODEL: str = "llama-3.1-8b-instant"
+    LLM_FALLBACK_BASE_URL: str | None = "https://openrouter.ai/api/v1"  # empty to disable
+    LLM_FALLBACK_API_KEY: str | None = None  # defaults to OPENROUTER_EMBEDDING_KEY
+    LLM_FALLBACK_MODEL: str = "meta-llama/llama-3.1-8b-instruct"
+    LLM_HEDGE: bool = True
+    LLM_BREAKER_FAILURES: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+    # Per-process LLM admission (0 = unlimited); set the quotas to your Groq plan's limits.
+    # Hedged and fail-over requests count against them too, whichever provider they go to.
+    LLM_RATE_LIMIT_RPM: int = 1000
+    LLM_RATE_LIMIT_TPM: int = 250000
+    LLM_MAX_CONCURRENCY: int = 16
+
+    # Speech-to-text: "deepgram" (cloud) or "local" (on-prem, see LocalSTTService)
+    STT_PROVIDER: str = "deepgram"
+    LOCAL_STT_ENGINE: str = "faster-whisper"  # or "vosk"
+    LOCAL_STT_MODEL: str = "base"  # faster-whisper model size, or path to a Vosk model
+    LOCAL_STT_COMPUTE_TYPE: str = "int8"
+    LOCAL_STT_WORKERS: int = 2
+    LOCAL_STT_CPU_THREADS: int = 2
+    LOCAL_STT_INTERIM_MS: int = 1000
+    LOCAL_STT_MAX_SEGMENT_MS: int = 15000
+
+    # Server-side VAD on /ws/audio (16-bit mono PCM input)
+    VAD_GATE_ENABLED: bool = False  # only send speech upstream; KeepAlive covers the gaps
+    VAD_TRIM_RECORDING: bool = False  # save only speech to audio_{session_id}.wav
+
+    # Shared session state across workers/nodes; in-process only when unset
+    REDIS_URL: str | None = None
+
+    # Fund data from a local snapshot (build_fund_snapshot.py) instead of Supabase when set;
+    # the server picks up a newly built version within FUND_SNAPSHOT_RELOAD_SECONDS
+    FUND_SNAPSHOT_DIR: str | None = None
+    FUND_SNAPSHOT_RELOAD_SECONDS: float = 10.0
+
+    # Record each /ws/audio call (audio, transcripts, LLM and Supabase responses) to
+    # <dir>/<session_id>.rec for benchmarks/replay_session.py; off when unset
+    SESSION_RECORD_DIR: str | None = None
+
+    # Build clients and probe upstreams in the background at startup (see /ready)
+    WARMUP_ON_STARTUP: bool = True
+
+    # Logging: level for the app loggers, and 1-in-N sampling for per-chunk/per-transcript lines
+    LOG_LEVEL: str = "INFO"
+    LOG_SAMPLE_EVERY: int = 100
+
     class Config:
         env_file = [".env", "../.env"]
         extra = "ignore"
 
-settings = Settings()
+class LazySettings:
+    """
+    Builds Settings() on first attribute access rather than at import, so importing the
+    app (or a single module) doesn't read the environment or fail on missing keys.
+    """
+
+    def __init__(self):
+        object.__setattr__(self, "_settings", None)
+
+    def _load(self) -> Settings:
+        if self._settings is None:
+            object.__setattr__(self, "_settings", Settings())
+        return self._settings
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._load(), name, value)
+
+settings = LazySettings()
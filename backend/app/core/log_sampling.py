@@ -0,0 +1,29 @@
+import logging
+from typing import Optional
+from app.core.config import settings
+
+class SampledLog:
+    """
+    Hot-path logging (per audio chunk, per transcript): emits only every `every`-th call
+    and formats lazily, so a disabled level costs a counter increment. Without `every`,
+    settings.LOG_SAMPLE_EVERY is read when logging, so module-level instances don't load
+    settings at import.
+    """
+
+    def __init__(self, logger: logging.Logger, every: Optional[int] = None, level: int = logging.DEBUG):
+        self.logger = logger
+        self._every = every
+        self.level = level
+        self.count = 0
+
+    @property
+    def every(self) -> int:
+        return max(1, self._every if self._every is not None else settings.LOG_SAMPLE_EVERY)
+
+    def __call__(self, msg: str, *args):
+        self.count += 1
+        if not self.logger.isEnabledFor(self.level):
+            return
+        every = self.every
+        if (self.count - 1) % every == 0:
+            self.logger.log(self.level, msg + " [%d seen, 1/%d logged]", *args, self.count, every)
@@ -0,0 +1,101 @@
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from app.core.tracing import span
+
+# Latency buckets (seconds) sized for network calls: 10ms .. 30s
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (100, 250, 500, 750, 1000, 1500, 2000, 3000, 4000, 6000, 8000)
+
+ACTIVE_SESSIONS = Gauge(
+    "copilot_active_sessions", "Open /ws/audio sessions", multiprocess_mode="livesum"
+)
+AUDIO_BUFFER_BYTES = Gauge(
+    "copilot_audio_buffer_bytes", "Call audio held in memory until hang-up", multiprocess_mode="livesum"
+)
+AUDIO_BYTES = Counter(
+    "copilot_audio_bytes", "Audio bytes received from clients and forwarded to STT", ["direction"]
+)
+DOWNSTREAM_BYTES = Counter(
+    "copilot_downstream_bytes", "Bytes of messages sent to dashboard sockets", ["protocol"]
+)
+STT_FIRST_TRANSCRIPT_SECONDS = Histogram(
+    "copilot_stt_first_transcript_seconds", "First audio byte to first transcript, per session",
+    ["provider"], buckets=LATENCY_BUCKETS
+)
+TRANSCRIPTS = Counter(
+    "copilot_transcripts", "Transcript messages sent to clients", ["final"]
+)
+RAG_STAGE_SECONDS = Histogram(
+    "copilot_rag_stage_seconds", "Time per assist pipeline stage",
+    ["stage"], buckets=LATENCY_BUCKETS
+)
+SPECULATIVE_LOOKUPS = Counter(
+    "copilot_speculative_lookups", "Assist lookups in the speculative warm cache", ["result"]
+)
+SPECULATIVE_SAVED_SECONDS = Histogram(
+    "copilot_speculative_saved_seconds", "Retrieval time skipped by a warm-cache hit", buckets=LATENCY_BUCKETS
+)
+ASSIST_REQUESTS = Counter(
+    "copilot_assist_requests", "Assist requests by outcome", ["status"]
+)
+ASSIST_DEDUP = Counter(
+    "copilot_assist_dedup", "Assist requests answered without running the pipeline themselves", ["outcome"]
+)
+SUMMARY_SECONDS = Histogram(
+    "copilot_summary_seconds", "Post-call summary generation time", buckets=LATENCY_BUCKETS
+)
+LLM_REQUESTS = Counter(
+    "copilot_llm_requests", "LLM gateway requests by provider and outcome", ["provider", "outcome"]
+)
+LLM_SECONDS = Histogram(
+    "copilot_llm_seconds", "Successful LLM request latency", ["provider", "stage"], buckets=LATENCY_BUCKETS
+)
+LLM_HEDGES = Counter(
+    "copilot_llm_hedges", "Hedged second requests sent after the p95 delay", ["stage"]
+)
+LLM_QUEUE_SECONDS = Histogram(
+    "copilot_llm_queue_seconds", "Wait for an LLM admission slot", ["priority"], buckets=LATENCY_BUCKETS
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "copilot_llm_queue_depth", "LLM calls waiting for admission", ["priority"], multiprocess_mode="livesum"
+)
+PROMPT_TOKENS = Histogram(
+    "copilot_prompt_tokens", "Prompt size per LLM stage", ["stage"], buckets=TOKEN_BUCKETS
+)
+DB_WRITE_SECONDS = Histogram(
+    "copilot_db_write_seconds", "Supabase write latency", ["table"], buckets=LATENCY_BUCKETS
+)
+
+@contextmanager
+def timed(histogram, span_name: str | None = None, **labels):
+    """Observes the block's wall time on `histogram` (and wraps it in a trace span if named)."""
+    start = time.perf_counter()
+    with span(span_name, **labels) if span_name else _null():
+        try:
+            yield
+        finally:
+            target = histogram.labels(**labels) if labels else histogram
+            target.observe(time.perf_counter() - start)
+
+@contextmanager
+def rag_stage(stage: str):
+    with timed(RAG_STAGE_SECONDS, f"rag.{stage}", stage=stage):
+        yield
+
+@contextmanager
+def _null():
+    yield
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Prometheus exposition for /metrics. With PROMETHEUS_MULTIPROC_DIR set (several uvicorn
+    workers), samples from every worker are merged.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,136 @@
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import re
+import struct
+import time
+from contextlib import contextmanager
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+RECORD_SUFFIX = ".rec"
+# Every record: kind, wall-clock time (seconds), payload length; then the payload
+HEADER = struct.Struct("<BdI")
+KINDS = {"start": 1, "audio": 2, "transcript": 3, "assist": 4, "llm": 5, "db": 6, "end_call": 7, "end": 8}
+KIND_NAMES = {code: name for name, code in KINDS.items()}
+
+# The recorder of the call this request or task belongs to; set by /ws/audio, /assist and /end-call
+_current = contextvars.ContextVar("session_recorder", default=None)
+
+def record_path(directory: str, session_id: str) -> str:
+    return os.path.join(directory, re.sub(r"[^\w.-]", "_", session_id) + RECORD_SUFFIX)
+
+def prompt_key(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode()).hexdigest()[:16]
+
+def template_key(prompt: str) -> str:
+    """Identifies the prompt template (its first line) when the filled-in prompt differs."""
+    first = next((line.strip() for line in prompt.splitlines() if line.strip()), "")
+    return prompt_key(first)
+
+class SessionRecorder:
+    """
+    Append-only log of one call for deterministic replay (benchmarks/replay_session.py):
+    the client's audio chunks as received, the STT provider's transcript events, /assist
+    and /end-call requests, and the LLM and Supabase responses they got, each with its
+    wall-clock time. Audio is stored raw; everything else is a JSON payload.
+
+    Each record is a single write on an O_APPEND descriptor, so the worker holding the
+    socket and an /assist served by another worker can append to the same file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def write(self, kind: str, payload: bytes | dict):
+        if self.fd is None:
+            return
+        if not isinstance(payload, bytes):
+            payload = json.dumps(payload, ensure_ascii=False).encode()
+        try:
+            os.write(self.fd, HEADER.pack(KINDS[kind], time.time(), len(payload)) + payload)
+        except OSError as e:
+            # A full disk stops the recording, not the call
+            logger.error(f"Recording {self.path} stopped: {e}")
+            self.close()
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+def open_recorder(session_id: str, create: bool = True) -> SessionRecorder | None:
+    """
+    Recorder for a session when SESSION_RECORD_DIR is set. With `create=False` (the HTTP
+    endpoints) only a call whose socket started recording is appended to.
+    """
+    if not settings.SESSION_RECORD_DIR:
+        return None
+    path = record_path(settings.SESSION_RECORD_DIR, session_id)
+    if not create and not os.path.exists(path):
+        return None
+    try:
+        os.makedirs(settings.SESSION_RECORD_DIR, exist_ok=True)
+        return SessionRecorder(path)
+    except OSError as e:
+        logger.error(f"Cannot record session {session_id}: {e}")
+        return None
+
+@contextmanager
+def recording(recorder: SessionRecorder | None):
+    """Makes `recorder` the current one for this context (and the tasks it starts), closing it on exit."""
+    token = _current.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+        if recorder is not None:
+            recorder.close()
+
+def record(kind: str, payload: bytes | dict):
+    """Appends to the current call's recording; a no-op outside a recorded call."""
+    recorder = _current.get()
+    if recorder is not None:
+        recorder.write(kind, payload)
+
+def read_records(path: str):
+    """Yields (kind, time, payload) from a recording: bytes for audio, a dict otherwise."""
+    with open(path, "rb") as f:
+        data = f.read()
+    offset = 0
+    while offset + HEADER.size <= len(data):
+        code, at, length = HEADER.unpack_from(data, offset)
+        offset += HEADER.size
+        payload = data[offset:offset + length]
+        if len(payload) < length:
+            break  # torn last record of a crashed worker
+        offset += length
+        kind = KIND_NAMES.get(code)
+        if kind is None:
+            continue
+        yield kind, at, payload if kind == "audio" else json.loads(payload)
+
+def _mark_request(request):
+    request.extensions["recorded_from"] = time.perf_counter()
+
+def _record_response(response):
+    if _current.get() is None:
+        return
+    response.read()
+    request = response.request
+    record("db", {
+        "method": request.method,
+        "path": request.url.raw_path.decode(),
+        "status": response.status_code,
+        "body": response.text,
+        "seconds": round(time.perf_counter() - request.extensions.get("recorded_from", time.perf_counter()), 4),
+    })
+
+def record_http(client):
+    """Records the responses an httpx.Client gets inside a recorded call (the Supabase REST session)."""
+    client.event_hooks["request"].append(_mark_request)
+    client.event_hooks["response"].append(_record_response)
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from app.core.config import settings
+from app.core.state import transcript_store
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process in the session registry
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+# Transcripts and metadata outlive the socket so /assist and /end-call still work after hang-up
+SESSION_TTL = 24 * 3600
+
+class SessionStore:
+    """
+    Per-call state: transcript lines, session metadata and a push channel to the
+    worker holding the call's /ws/audio socket.
+
+    This base implementation is single-process: transcripts live in
+    `app.core.state.transcript_store` and pushes only reach sockets on this worker.
+    """
+
+    def __init__(self, worker_id: str = WORKER_ID):
+        self.worker_id = worker_id
+        self._meta = {}
+        self._sockets = {}
+        self._ended = {}  # hung-up session -> time.monotonic(), oldest first
+
+    async def register_socket(self, session_id: str, metadata: dict | None = None) -> asyncio.Queue:
+        """Claims the session for this worker; messages pushed to it arrive on the returned queue."""
+        queue = asyncio.Queue()
+        self._sockets[session_id] = queue
+        self._ended.pop(session_id, None)
+        transcript_store.setdefault(session_id, [])
+        await self.update_session(session_id, {**(metadata or {}), "worker": self.worker_id})
+        return queue
+
+    async def unregister_socket(self, session_id: str):
+        self._sockets.pop(session_id, None)
+        self._meta.get(session_id, {}).pop("worker", None)
+        self._ended.pop(session_id, None)
+        self._ended[session_id] = now = time.monotonic()
+        # Like the Redis keys' TTL: sessions hung up for SESSION_TTL are dropped
+        for ended in list(self._ended):
+            if now - self._ended[ended] < SESSION_TTL:
+                break
+            del self._ended[ended]
+            self._meta.pop(ended, None)
+            transcript_store.pop(ended, None)
+
+    async def append_transcript(self, session_id: str, line: str):
+        transcript_store.setdefault(session_id, []).append(line)
+
+    async def get_transcript_lines(self, session_id: str) -> list:
+        return list(transcript_store.get(session_id, []))
+
+    async def get_transcript(self, session_id: str) -> str:
+        return " ".join(await self.get_transcript_lines(session_id))
+
+    async def get_session(self, session_id: str) -> dict:
+        return dict(self._meta.get(session_id, {}))
+
+    async def update_session(self, session_id: str, fields: dict):
+        self._meta.setdefault(session_id, {}).update(fields)
+
+    async def incr_session(self, session_id: str, field: str, amount: float = 1):
+        """Atomically adds `amount` to a numeric metadata field (missing counts as 0)."""
+        meta = self._meta.setdefault(session_id, {})
+        meta[field] = meta.get(field, 0) + amount
+
+    async def push(self, session_id: str, message: dict) -> bool:
+        """Sends a message down the session's socket, wherever it is. Returns False if nobody owns it."""
+        return self._deliver(session_id, message)
+
+    def _deliver(self, session_id: str, message: dict) -> bool:
+        queue = self._sockets.get(session_id)
+        if queue is None:
+            return False
+        queue.put_nowait(message)
+        return True
+
+class RedisSessionStore(SessionStore):
+    """
+    Shares sessions across uvicorn workers and nodes.
+
+    Keys:
+      session:{id}:transcript  list of transcript lines
+      session:{id}:meta        hash of JSON-encoded metadata; "worker" names the socket owner
+    Pushes are published on the owner's `worker:{worker_id}` channel; each worker runs
+    one subscriber that hands messages to its local sockets.
+    """
+
+    def __init__(self, client, worker_id: str = WORKER_ID):
+        super().__init__(worker_id)
+        self.redis = client
+        self._listener = None
+        self._listener_lock = asyncio.Lock()
+
+    @staticmethod
+    def _key(session_id: str, kind: str) -> str:
+        return f"session:{session_id}:{kind}"
+
+    async def register_socket(self, session_id: str, metadata: dict | None = None) -> asyncio.Queue:
+        await self._ensure_listener()
+        queue = asyncio.Queue()
+        self._sockets[session_id] = queue
+        await self.update_session(session_id, {**(metadata or {}), "worker": self.worker_id})
+        return queue
+
+    async def unregister_socket(self, session_id: str):
+        self._sockets.pop(session_id, None)
+        from redis.exceptions import WatchError
+        key = self._key(session_id, "meta")
+        # Only release ownership if a reconnect hasn't claimed it on another worker; WATCH
+        # makes the delete fail (and the check rerun) if one does so in between
+        async with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    await pipe.watch(key)
+                    if await pipe.hget(key, "worker") != json.dumps(self.worker_id).encode():
+                        return
+                    pipe.multi()
+                    pipe.hdel(key, "worker")
+                    await pipe.execute()
+                    return
+                except WatchError:
+                    continue
+
+    async def append_transcript(self, session_id: str, line: str):
+        key = self._key(session_id, "transcript")
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.rpush(key, line)
+            pipe.expire(key, SESSION_TTL)
+            await pipe.execute()
+
+    async def get_transcript_lines(self, session_id: str) -> list:
+        lines = await self.redis.lrange(self._key(session_id, "transcript"), 0, -1)
+        return [line.decode() for line in lines]
+
+    async def get_session(self, session_id: str) -> dict:
+        raw = await self.redis.hgetall(self._key(session_id, "meta"))
+        return {k.decode(): json.loads(v) for k, v in raw.items()}
+
+    async def update_session(self, session_id: str, fields: dict):
+        key = self._key(session_id, "meta")
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping={k: json.dumps(v) for k, v in fields.items()})
+            pipe.expire(key, SESSION_TTL)
+            await pipe.execute()
+
+    async def incr_session(self, session_id: str, field: str, amount: float = 1):
+        # A bare number is valid JSON, so counters stay readable through get_session
+        key = self._key(session_id, "meta")
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hincrbyfloat(key, field, amount)
+            pipe.expire(key, SESSION_TTL)
+            await pipe.execute()
+
+    async def push(self, session_id: str, message: dict) -> bool:
+        if self._deliver(session_id, message):
+            return True
+        owner = await self.redis.hget(self._key(session_id, "meta"), "worker")
+        if owner is None:
+            return False
+        payload = json.dumps({"session_id": session_id, "message": message})
+        return await self.redis.publish(f"worker:{json.loads(owner)}", payload) > 0
+
+    async def _ensure_listener(self):
+        # Subscribe before the socket is advertised so no push can be published into the void
+        async with self._listener_lock:
+            if self._listener is None or self._listener.done():
+                pubsub = self.redis.pubsub()
+                await pubsub.subscribe(f"worker:{self.worker_id}")
+                self._listener = asyncio.create_task(self._listen(pubsub))
+
+    async def _listen(self, pubsub):
+        try:
+            while True:
+                msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if msg is None:
+                    continue
+                try:
+                    data = json.loads(msg["data"])
+                    if not self._deliver(data["session_id"], data["message"]):
+                        logger.warning(f"Push for {data['session_id']} arrived after its socket closed")
+                except Exception as e:
+                    logger.error(f"Bad session push: {e}")
+        finally:
+            await pubsub.aclose()
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+        await self.redis.aclose()
+
+_store = None
+
+def get_session_store() -> SessionStore:
+    """Process-wide store: Redis-backed when REDIS_URL is set, in-memory otherwise."""
+    global _store
+    if _store is None:
+        if settings.REDIS_URL:
+            import redis.asyncio as redis
+            _store = RedisSessionStore(redis.from_url(settings.REDIS_URL))
+        else:
+            _store = SessionStore()
+    return _store
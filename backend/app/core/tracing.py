@@ -0,0 +1,22 @@
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# OpenTelemetry is optional. With only the API installed spans are no-ops; install the SDK and
+# run under `opentelemetry-instrument` (or configure a TracerProvider) to export them.
+try:
+    from opentelemetry import trace
+    _tracer = trace.get_tracer("sales-copilot")
+except ImportError:
+    _tracer = None
+
+@contextmanager
+def span(name: str, **attributes):
+    """Starts a span as a child of the current one; yields None when tracing is unavailable."""
+    if _tracer is None:
+        yield None
+        return
+    attrs = {k: v for k, v in attributes.items() if v is not None}
+    with _tracer.start_as_current_span(name, attributes=attrs) as current:
+        yield current
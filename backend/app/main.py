@@ -1,8 +1,27 @@
-from fastapi import FastAPI
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.clients import readiness, warm_up
 from app.core.config import settings
+from app.core.metrics import render_metrics
 
-app = FastAPI(title="Sales Copilot API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Settings are read here rather than at import, which keeps `import app.main` cheap
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    # Serve / and /ready right away; /ready flips once the clients are warm
+    if settings.WARMUP_ON_STARTUP:
+        warmup_task = asyncio.create_task(warm_up())
+    else:
+        readiness["status"], warmup_task = "ready", None
+    yield
+    if warmup_task is not None:
+        warmup_task.cancel()
+
+app = FastAPI(title="Sales Copilot API", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,12 +35,24 @@ app.add_middleware(
 async def root():
     return {"message": "Sales Copilot Backend Running"}
 
+@app.get("/ready")
+async def ready():
+    status_code = 503 if readiness["status"] == "starting" else 200
+    return Response(content=json.dumps(readiness), status_code=status_code, media_type="application/json")
+
+@app.get("/metrics")
+async def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 from app.api.websocket import router as websocket_router
 from app.api.rag import router as rag_router
 from app.api.analytics import router as analytics_router
 from app.api.agents import router as agents_router
+from app.api.calls import router as calls_router
 
 app.include_router(websocket_router)
 app.include_router(rag_router)
 app.include_router(analytics_router)
 app.include_router(agents_router)
+app.include_router(calls_router)
@@ -1,12 +1,12 @@
-from supabase import create_client, Client
-from app.core.config import settings
+from app.core.clients import get_supabase
+from app.core.metrics import DB_WRITE_SECONDS, timed
 import logging
 
 logger = logging.getLogger(__name__)
 
 class AgentService:
     def __init__(self):
-        self.supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+        self.supabase = get_supabase()
 
     async def get_all_agents(self):
         try:
@@ -69,10 +69,11 @@ class AgentService:
                     current_history = investor.get("chat_history", []) or []
                     current_history.append(history_entry)
                     
-                    self.supabase.table("investors")\
-                        .update({"chat_history": current_history})\
-                        .eq("investor_id", investor_id)\
-                        .execute()
+                    with timed(DB_WRITE_SECONDS, "db.write", table="investors"):
+                        self.supabase.table("investors")\
+                            .update({"chat_history": current_history})\
+                            .eq("investor_id", investor_id)\
+                            .execute()
                     logger.info(f"Updated chat history for investor {lead_name} in investors table.")
                     investors_updated = True
                 else:
@@ -91,10 +92,11 @@ class AgentService:
                 
                 current_history.append(history_entry)
                 
-                self.supabase.table("ai_dispatch_logs")\
-                    .update({"chat_history": current_history})\
-                    .eq("id", lead_id)\
-                    .execute()
+                with timed(DB_WRITE_SECONDS, "db.write", table="ai_dispatch_logs"):
+                    self.supabase.table("ai_dispatch_logs")\
+                        .update({"chat_history": current_history})\
+                        .eq("id", lead_id)\
+                        .execute()
                 logger.info(f"Updated chat history for lead {lead_id} in ai_dispatch_logs.")
                 logs_updated = True
             else:
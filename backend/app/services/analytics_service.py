@@ -1,47 +1,50 @@
-from openai import OpenAI
-from app.core.config import settings
-from app.core.state import transcript_store
+from app.core.session_store import get_session_store
+from app.services.prompt_builder import STAGE_BUDGETS, compact_lines, log_prompt_tokens
+from app.services.llm_gateway import get_llm_gateway
 import logging
-import os
+import glob
 import json
 
 logger = logging.getLogger(__name__)
 
 class AnalyticsService:
-    def __init__(self):
-        self.llm_client = OpenAI(
-            base_url="https://api.groq.com/openai/v1",
-            api_key=settings.GROQ_API_KEY
-        )
+    def __init__(self, llm=None):
+        self.llm = llm or get_llm_gateway()
 
     async def diarize_audio(self, session_id: str):
         """
         Mock Pyannote Diarization.
         Real implementation would load the pipeline and process 'audio_{session_id}.wav'.
         """
-        filename = f"audio_{session_id}.wav"
-        if not os.path.exists(filename):
-            logger.warning(f"Audio file {filename} not found.")
+        # WAV for PCM calls; compressed calls are saved in their own container (.webm, .ogg, ...)
+        recordings = glob.glob(f"audio_{session_id}.*")
+        if not recordings:
+            logger.warning(f"Audio file audio_{session_id}.* not found.")
             # Fallback to stored transcript without speaker labels
-            return transcript_store.get(session_id, [])
+            return await get_session_store().get_transcript_lines(session_id)
 
         # Placeholder for Pyannote logic
         # try:
         #     from pyannote.audio import Pipeline
         #     pipeline = Pipeline.from_pretrained("pyannote/speaker-diarization-3.1", use_auth_token="HF_TOKEN")
-        #     diarization = pipeline(filename)
+        #     diarization = pipeline(recordings[0])
         #     # Convert diarization to text segments...
         # except: ...
         
         logger.info("Simulating Pyannote Diarization...")
         # For now, return the raw transcript as a single block or mock speakers
         # In a real app, we'd align the text with the diarization timestamps.
-        raw_transcript = transcript_store.get(session_id, [])
+        raw_transcript = await get_session_store().get_transcript_lines(session_id)
         return raw_transcript
 
     async def generate_report(self, session_id: str):
         diarized_data = await self.diarize_audio(session_id)
-        transcript_text = "\n".join(diarized_data)
+        session = await get_session_store().get_session(session_id)
+        return await self.report_from_lines(diarized_data, agent=session.get("agent_name"))
+
+    async def report_from_lines(self, lines: list, agent: str | None = None) -> dict:
+        """Report for a call's transcript lines (also used when reprocessing recordings offline)."""
+        transcript_text = compact_lines(lines, STAGE_BUDGETS["report"]["history"])
         
         if not transcript_text:
             return {"error": "No transcript available"}
@@ -59,12 +62,8 @@ class AnalyticsService:
         
         Return ONLY valid JSON.
         """
+        log_prompt_tokens("report", prompt, history=transcript_text)
         
-        response = self.llm_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"}
-        )
-        
-        report = json.loads(response.choices[0].message.content)
+        raw = await self.llm.complete(prompt, "report", json_mode=True, agent=agent)
+        report = json.loads(raw)
         return report
@@ -0,0 +1,215 @@
+import json
+import logging
+import os
+import re
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+ANSWERS_FILE = "answers.json"
+LANGUAGES = ("en", "hinglish")
+TOPICS = ("returns", "risk", "expense_ratio", "min_sip", "category_comparison")
+MIN_FUND_CONFIDENCE = 0.85
+# Intents a banked answer can serve; recommendations depend on the Lead and stay generated
+SERVED_INTENTS = ("information", "comparison", "objection")
+
+# What the Lead asks about, matched on the listening agent's query (English and Hinglish)
+TOPIC_PATTERNS = {
+    "expense_ratio": r"expense|ratio|fees?\b|charges?|commission|kharcha",
+    "min_sip": r"minimum|min\.?\s*sip|sip amount|kitne se|shuru|start with|lumpsum",
+    "risk": r"risk|safe|volatil|jokhim|surakshit|dar\b|loss|nuksaan",
+    "returns": r"return|perform|kitna (?:diya|mila)|munafa|profit|cagr",
+}
+COMPARISON_PATTERN = r"compar|vs\.?\b|versus|better than|category|peers|similar|baaki"
+
+RISK_LABELS = {
+    "en": {1: "low", 2: "low to moderate", 3: "moderate", 4: "moderately high", 5: "high", 6: "very high"},
+    "hinglish": {1: "kam", 2: "kam se moderate", 3: "moderate", 4: "thoda high", 5: "high", 6: "bahut high"},
+}
+DISCLAIMER = {
+    "en": "Past returns don't guarantee future returns.",
+    "hinglish": "Past returns future ki guarantee nahi hain.",
+}
+
+# What /ws/audio calls a Lead it wasn't told the name of; answered like no name at all
+PLACEHOLDER_LEAD_NAME = "Lead"
+
+# Vetted wording; {lead} is filled with the Lead's name when the answer is served
+TEMPLATES = {
+    ("returns", "en"): "{lead}, {fund} has returned {returns}. {disclaimer}",
+    ("returns", "hinglish"): "{lead} ji, {fund} ne {returns} return diya hai. {disclaimer}",
+    ("risk", "en"): "{lead}, {fund} is a {sub_category} fund with a {risk_label} risk level ({risk_level} on a scale of 6){volatility}.",
+    ("risk", "hinglish"): "{lead} ji, {fund} ek {sub_category} fund hai aur iska risk level {risk_label} hai (6 mein se {risk_level}){volatility}.",
+    ("expense_ratio", "en"): "{lead}, the expense ratio of {fund} is {expense_ratio}% a year, against a median of {median_expense}% for {sub_category} funds.",
+    ("expense_ratio", "hinglish"): "{lead} ji, {fund} ka expense ratio {expense_ratio}% saalana hai, jabki {sub_category} funds ka median {median_expense}% hai.",
+    ("min_sip", "en"): "{lead}, you can start a SIP in {fund} with just ₹{min_sip} a month{lumpsum}.",
+    ("min_sip", "hinglish"): "{lead} ji, {fund} mein aap sirf ₹{min_sip} mahine se SIP shuru kar sakte hain{lumpsum}.",
+    ("category_comparison", "en"): "{lead}, among {peers} {sub_category} funds, {fund} ranks #{rank} on 1-year returns ({returns_1yr}% against a median of {median_returns}%), with an expense ratio of {expense_ratio}% (median {median_expense}%). {disclaimer}",
+    ("category_comparison", "hinglish"): "{lead} ji, {peers} {sub_category} funds mein {fund} 1 saal ke returns mein {rank} number par hai ({returns_1yr}%, median {median_returns}%), aur expense ratio {expense_ratio}% hai (median {median_expense}%). {disclaimer}",
+}
+PERIOD_LABELS = {
+    "en": {"returns_1yr": "{}% over 1 year", "returns_3yr": "{}% a year over 3 years", "returns_5yr": "{}% a year over 5 years"},
+    "hinglish": {"returns_1yr": "1 saal mein {}%", "returns_3yr": "3 saal mein {}% saalana", "returns_5yr": "5 saal mein {}% saalana"},
+}
+
+def _fmt(value: float) -> str:
+    return f"{value:,.2f}".rstrip("0").rstrip(".")
+
+def _join(parts: list, language: str) -> str:
+    if len(parts) <= 1:
+        return "".join(parts)
+    return ", ".join(parts[:-1]) + (" and " if language == "en" else " aur ") + parts[-1]
+
+def _median(values: np.ndarray) -> float | None:
+    values = values[~np.isnan(values)]
+    return float(np.median(values)) if len(values) else None
+
+def build_answers(snapshot) -> dict:
+    """
+    Fills TEMPLATES from a FundSnapshot: one answer per fund, topic and language, keyed
+    "<fund id>:<topic>:<language>". Topics whose facts are missing for a fund are
+    skipped, so a banked answer never says "unknown". Peer statistics are per sub-category.
+    """
+    answers = {}
+    sub_codes = np.asarray(snapshot.codes["sub_category"])
+    numbers = {column: np.asarray(values) for column, values in snapshot.numbers.items()}
+    for i in range(snapshot.rows):
+        row = snapshot.row(i)
+        meta = row["metadata"]
+        peers = np.flatnonzero(sub_codes == sub_codes[i])
+        r1 = numbers["returns_1yr"][peers]
+        facts = {
+            "fund": meta["scheme_name"],
+            "sub_category": meta["sub_category"] or meta["category"],
+            "risk_level": meta["risk_level"],
+            "expense_ratio": meta["expense_ratio"],
+            "min_sip": f"{meta['min_sip']:,.0f}" if meta["min_sip"] is not None else None,
+            "returns_1yr": meta["returns_1yr"],
+            "peers": len(peers),
+            "median_expense": _median(numbers["expense_ratio"][peers]),
+            "median_returns": _median(r1),
+            "rank": int((r1 > numbers["returns_1yr"][i]).sum()) + 1 if meta["returns_1yr"] is not None else None,
+        }
+        for language in LANGUAGES:
+            filled = dict(facts, lead="{lead}", disclaimer=DISCLAIMER[language])
+            filled["risk_label"] = RISK_LABELS[language].get(meta["risk_level"])
+            filled["returns"] = _join([
+                label.format(_fmt(meta[column])) for column, label in PERIOD_LABELS[language].items() if meta[column] is not None
+            ], language) or None
+            filled["volatility"] = ""
+            if meta["sd"] is not None:
+                filled["volatility"] = f", with a standard deviation of {_fmt(meta['sd'])}" if language == "en" \
+                    else f", standard deviation {_fmt(meta['sd'])}"
+            filled["lumpsum"] = ""
+            if meta["min_lumpsum"] is not None:
+                filled["lumpsum"] = f", or a lump sum from ₹{meta['min_lumpsum']:,.0f}" if language == "en" \
+                    else f", ya ₹{meta['min_lumpsum']:,.0f} se lumpsum"
+            for key in ("expense_ratio", "median_expense", "median_returns", "returns_1yr"):
+                if isinstance(filled[key], float):
+                    filled[key] = _fmt(filled[key])
+            if filled["peers"] < 3:
+                filled["peers"] = None  # too few to compare against
+            for topic in TOPICS:
+                template = TEMPLATES[(topic, language)]
+                needed = re.findall(r"\{(\w+)\}", template)
+                if any(filled.get(name) is None for name in needed):
+                    continue
+                answers[f"{row['id']}:{topic}:{language}"] = template.format(**filled)
+    return answers
+
+def save_answers(directory: str, answers: dict):
+    with open(os.path.join(directory, ANSWERS_FILE), "w") as f:
+        json.dump(answers, f, ensure_ascii=False)
+
+def load_answers(directory: str) -> dict:
+    try:
+        with open(os.path.join(directory, ANSWERS_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def answer_language(language: str | None) -> str:
+    """Bank language for a call's STT language: Hindi and multilingual calls get Hinglish."""
+    language = (language or "en").lower()
+    return "hinglish" if language.startswith("hi") or language == "multi" else "en"
+
+def _tokens(text: str) -> set:
+    return set(re.findall(r"[a-z0-9]+", text.lower())) - {"fund", "funds", "mutual", "the", "plan", "direct", "dir", "growth", "g"}
+
+def classify_topic(query: str, intent_type: str) -> str | None:
+    if intent_type not in SERVED_INTENTS or not query:
+        return None
+    if intent_type == "comparison" or re.search(COMPARISON_PATTERN, query, re.IGNORECASE):
+        return "category_comparison"
+    matched = [topic for topic, pattern in TOPIC_PATTERNS.items() if re.search(pattern, query, re.IGNORECASE)]
+    return matched[0] if len(matched) == 1 else None
+
+class AnswerBank:
+    """
+    The precomputed answers of one FundSnapshot version (answers.json, written by
+    build_snapshot), with the fund-name index used to resolve what the Lead named.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.answers = load_answers(snapshot.path)
+        codes = np.asarray(snapshot.codes["scheme_name"])
+        # Row of each distinct scheme name (the first, if a name repeats)
+        self.rows = {code: int(np.flatnonzero(codes == code)[0]) for code in range(len(snapshot.values["scheme_name"]))}
+        self.exact = {name.lower(): code for code, name in enumerate(snapshot.values["scheme_name"])}
+        self.tokens = [_tokens(name) for name in snapshot.values["scheme_name"]]
+
+    def __len__(self) -> int:
+        return len(self.answers)
+
+    def resolve_fund(self, names: list) -> tuple[int | None, float]:
+        """
+        Snapshot row of the single fund the Lead named, and how sure the match is: 1.0 for
+        an exact name, otherwise the share of the spoken name's words found in the best
+        candidate, halved when another fund matches as well.
+        """
+        if len(names) != 1:
+            return None, 0.0
+        spoken = " ".join(names[0].lower().split())
+        if spoken in self.exact:
+            return self.rows[self.exact[spoken]], 1.0
+        words = _tokens(spoken)
+        if not words or not self.tokens:
+            return None, 0.0
+        scores = sorted(((len(words & name) / len(words), code) for code, name in enumerate(self.tokens)), reverse=True)
+        best, code = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else 0.0
+        return self.rows[code], best if best > runner_up else best * 0.5
+
+    def lookup(self, listening, language: str | None, lead_name: str | None) -> dict | None:
+        """
+        The banked answer for an assist when the question's topic and the one fund it is
+        about are both resolved with high confidence; None sends the assist to the LLM.
+        """
+        if not self.answers or not listening.has_intent:
+            return None
+        # Fund names ("... Growth", "... Safe Money") must not read as the topic
+        query = listening.search_query
+        for name in listening.mentioned_funds:
+            query = re.sub(re.escape(name), " ", query, flags=re.IGNORECASE)
+        topic = classify_topic(query, listening.intent_type)
+        if topic is None:
+            return None
+        row, confidence = self.resolve_fund(listening.mentioned_funds)
+        if row is None or confidence < MIN_FUND_CONFIDENCE:
+            return None
+        text = self.answers.get(f"{row + 1}:{topic}:{answer_language(language)}")
+        if text is None:
+            return None
+        lead = next(iter((lead_name or "").split()), "")
+        if lead.lower() == PLACEHOLDER_LEAD_NAME.lower():
+            lead = ""
+        for prefix in ("{lead} ji, ", "{lead}, "):
+            if text.startswith(prefix):
+                text = prefix.replace("{lead}", lead) + text[len(prefix):] if lead else text[len(prefix):]
+        return {
+            "answer": text[0].upper() + text[1:],
+            "fund": self.snapshot.row(row),
+            "topic": topic,
+            "confidence": round(confidence, 2),
+        }
@@ -0,0 +1,96 @@
+import asyncio
+import hashlib
+import logging
+from app.core.metrics import ASSIST_DEDUP
+from app.core.session_store import get_session_store
+
+logger = logging.getLogger(__name__)
+
+# Outcomes worth answering again from cache; a degraded answer is retried instead
+CACHEABLE_STATUSES = ("success", "ignored", "no_intent_detected", "no_context")
+SUPERSEDED = {"status": "superseded", "message": "A newer assist request for this call replaced this one."}
+
+def window_key(lines: list, trigger_word: str | None) -> str:
+    """Identifies the transcript an assist sees (line count and last line) and its trigger."""
+    last = hashlib.sha256(lines[-1].encode()).hexdigest()[:12] if lines else ""
+    return f"{len(lines)}:{last}:{trigger_word or ''}"
+
+class AssistCoordinator:
+    """
+    Collapses repeated /assist requests for a call (e.g. the agent saying "let me check"
+    twice). Per session, at most one assist pipeline runs on this worker:
+
+    - a request for the same transcript window and trigger as the running one waits for
+      its result instead of starting another;
+    - a request with a longer window cancels the running one, whose callers get
+      SUPERSEDED; a request with a shorter window than the running one gets SUPERSEDED;
+    - a request whose window hasn't changed since the last answer gets that answer back
+      (kept in session metadata, so any worker can serve it).
+
+    Only the request that ran the pipeline gets `fresh=True`, so the dashboard is sent
+    each answer once.
+    """
+
+    def __init__(self):
+        self._running = {}  # session_id -> {"key", "lines", "task", "superseded"}
+
+    async def assist(self, session_id: str, trigger_word: str | None, run) -> tuple[dict, bool]:
+        """
+        (result, fresh) for an assist request; `run(lines)` returns the pipeline's
+        coroutine for the transcript lines it should answer from.
+        """
+        store = get_session_store()
+        lines = await store.get_transcript_lines(session_id)
+        key = window_key(lines, trigger_word)
+
+        cached = (await store.get_session(session_id)).get("last_assist")
+        if cached and cached.get("key") == key:
+            ASSIST_DEDUP.labels(outcome="cached").inc()
+            return cached["result"], False
+
+        current = self._running.get(session_id)
+        if current is not None:
+            if current["key"] == key:
+                ASSIST_DEDUP.labels(outcome="joined").inc()
+                return await self._wait(current), False
+            if len(lines) < current["lines"]:
+                ASSIST_DEDUP.labels(outcome="superseded").inc()
+                return SUPERSEDED, False
+            logger.info(f"Assist for {session_id} superseded at {len(lines)} transcript lines")
+            current["superseded"] = True
+            current["task"].cancel()
+
+        entry = {"key": key, "lines": len(lines), "superseded": False}
+        entry["task"] = asyncio.create_task(self._run(session_id, key, lines, run))
+        entry["task"].add_done_callback(lambda _: self._finished(session_id, entry))
+        self._running[session_id] = entry
+        result = await self._wait(entry)
+        return result, result is not SUPERSEDED
+
+    async def _run(self, session_id: str, key: str, lines: list, run) -> dict:
+        result = await run(lines)
+        if result.get("status") in CACHEABLE_STATUSES:
+            await get_session_store().update_session(session_id, {"last_assist": {"key": key, "result": result}})
+        return result
+
+    async def _wait(self, entry: dict) -> dict:
+        # Shielded: a caller that goes away doesn't cancel the run for the others
+        try:
+            return await asyncio.shield(entry["task"])
+        except asyncio.CancelledError:
+            if entry["superseded"] and entry["task"].cancelled():
+                ASSIST_DEDUP.labels(outcome="superseded").inc()
+                return SUPERSEDED
+            raise
+
+    def _finished(self, session_id: str, entry: dict):
+        if self._running.get(session_id) is entry:
+            del self._running[session_id]
+
+_coordinator = None
+
+def get_assist_coordinator() -> AssistCoordinator:
+    global _coordinator
+    if _coordinator is None:
+        _coordinator = AssistCoordinator()
+    return _coordinator
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import logging
+import shutil
+
+logger = logging.getLogger(__name__)
+
+PCM_SAMPLE_RATE = 16000  # what the server assumes when a client declares nothing
+# What a client may declare for PCM (narrowband telephony up to 48 kHz, mono or stereo)
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 48000
+MAX_CHANNELS = 2
+
+# Container formats the STT upstream can take as-is; ffmpeg demuxer name for each
+CONTAINERS = {
+    "webm": "matroska",
+    "ogg": "ogg",
+    "wav": "wav",
+    "mp3": "mp3",
+}
+
+CODEC_ALIASES = {
+    "pcm": "linear16",
+    "linear16": "linear16",
+    "s16le": "linear16",
+    "webm": "webm",
+    "opus": "webm",  # what MediaRecorder produces for audio/webm;codecs=opus
+    "webm-opus": "webm",
+    "ogg": "ogg",
+    "ogg-opus": "ogg",
+    "wav": "wav",
+    "mp3": "mp3",
+}
+
+class AudioFormat:
+    """
+    What a /ws/audio client streams: raw 16-bit PCM ("linear16", at `sample_rate` with
+    `channels`) or a container (webm/ogg Opus, wav, mp3) that carries its own parameters.
+    """
+
+    def __init__(self, codec: str = "linear16", sample_rate: int = PCM_SAMPLE_RATE, channels: int = 1):
+        self.codec = codec
+        self.sample_rate = sample_rate
+        self.channels = channels
+
+    @property
+    def is_pcm(self) -> bool:
+        return self.codec == "linear16"
+
+    @property
+    def extension(self) -> str:
+        return "wav" if self.is_pcm else self.codec
+
+    def describe(self) -> dict:
+        if self.is_pcm:
+            return {"codec": self.codec, "sample_rate": self.sample_rate, "channels": self.channels}
+        return {"codec": self.codec}
+
+def parse_format(codec: str | None, sample_rate: int | None = None, channels: int | None = None) -> AudioFormat:
+    """AudioFormat for a declared codec name; raises ValueError for one we can't take."""
+    name = CODEC_ALIASES.get((codec or "pcm").strip().lower())
+    if name is None:
+        raise ValueError(f"Unsupported codec '{codec}' (expected one of: {', '.join(sorted(CODEC_ALIASES))})")
+    sample_rate, channels = sample_rate or PCM_SAMPLE_RATE, channels or 1
+    if not isinstance(sample_rate, int) or not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE:
+        raise ValueError(f"Unsupported sample_rate {sample_rate!r} (expected {MIN_SAMPLE_RATE}-{MAX_SAMPLE_RATE} Hz)")
+    if not isinstance(channels, int) or not 1 <= channels <= MAX_CHANNELS:
+        raise ValueError(f"Unsupported channels {channels!r} (expected 1-{MAX_CHANNELS})")
+    return AudioFormat(name, sample_rate, channels)
+
+def sniff_format(chunk: bytes) -> AudioFormat:
+    """Recognizes a container from the stream's first bytes; anything else is legacy 16 kHz PCM."""
+    if chunk.startswith(b"\x1a\x45\xdf\xa3"):
+        return AudioFormat("webm")
+    if chunk.startswith(b"OggS"):
+        return AudioFormat("ogg")
+    if chunk.startswith(b"RIFF") and chunk[8:12] == b"WAVE":
+        return AudioFormat("wav")
+    if chunk.startswith(b"ID3"):
+        return AudioFormat("mp3")
+    return AudioFormat()
+
+async def negotiate_format(websocket, codec: str | None = None, sample_rate: int | None = None,
+                           channels: int | None = None) -> tuple[AudioFormat, bytes, bool]:
+    """
+    Settles the session's audio format before any audio goes upstream: from the query
+    params if given, else from an init message ({"type": "init", "codec": ..., "sample_rate": ...,
+    "channels": ...}) sent first, else by sniffing the first audio chunk.
+
+    Returns (format, first audio chunk to replay or b"", whether an init message was used).
+    """
+    if codec:
+        return parse_format(codec, sample_rate, channels), b"", False
+    message = await websocket.receive()
+    if message.get("type") == "websocket.disconnect":
+        return AudioFormat(), b"", False
+    if message.get("text") is not None:
+        init = json.loads(message["text"])
+        if init.get("type") != "init":
+            raise ValueError(f"Expected an init message or audio, got {init.get('type')!r}")
+        return parse_format(init.get("codec"), init.get("sample_rate"), init.get("channels")), b"", True
+    chunk = message.get("bytes") or b""
+    return sniff_format(chunk), chunk, False
+
+def deepgram_params(fmt: AudioFormat) -> str:
+    """Query string telling Deepgram how the stream is encoded (containers are detected by Deepgram)."""
+    if fmt.is_pcm:
+        return f"encoding=linear16&sample_rate={fmt.sample_rate}&channels={fmt.channels}"
+    return ""
+
+def decoder_available() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+class StreamDecoder:
+    """
+    Decodes a compressed stream to 16-bit mono PCM incrementally with an ffmpeg
+    subprocess, for the consumers that need samples (local STT). Compressed audio
+    that only goes upstream or to disk is never decoded.
+    """
+
+    def __init__(self, fmt: AudioFormat, sample_rate: int = PCM_SAMPLE_RATE):
+        self.fmt = fmt
+        self.sample_rate = sample_rate
+        self.proc = None
+
+    async def start(self):
+        self.proc = await asyncio.create_subprocess_exec(
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", CONTAINERS[self.fmt.codec], "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-ar", str(self.sample_rate), "pipe:1",
+            stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+        )
+
+    async def feed(self, data: bytes):
+        self.proc.stdin.write(data)
+        await self.proc.stdin.drain()
+
+    async def end(self):
+        if self.proc.stdin and not self.proc.stdin.is_closing():
+            self.proc.stdin.close()
+
+    async def read(self, size: int = 65536) -> bytes:
+        """Next decoded PCM, b"" once the stream has ended and been flushed."""
+        return await self.proc.stdout.read(size)
+
+    async def close(self):
+        if self.proc and self.proc.returncode is None:
+            self.proc.kill()
+            await self.proc.wait()
+
+class DecodedSource:
+    """
+    Wraps a compressed audio source (anything with receive_bytes) so that
+    receive_bytes() yields decoded PCM instead, ending with b"".
+    """
+
+    def __init__(self, source, fmt: AudioFormat, sample_rate: int = PCM_SAMPLE_RATE):
+        self.source = source
+        self.decoder = StreamDecoder(fmt, sample_rate)
+        self._feeder = None
+
+    async def _feed(self):
+        try:
+            while True:
+                data = await self.source.receive_bytes()
+                if not data:
+                    break
+                await self.decoder.feed(data)
+        except Exception as e:
+            logger.info(f"Decoder input closed: {e}")
+        finally:
+            await self.decoder.end()
+
+    async def receive_bytes(self) -> bytes:
+        if self._feeder is None:
+            await self.decoder.start()
+            self._feeder = asyncio.create_task(self._feed())
+        data = await self.decoder.read()
+        if not data:
+            await self.close()
+        return data
+
+    async def send_message(self, message: dict):
+        await self.source.send_message(message)
+
+    async def close(self):
+        if self._feeder is not None:
+            self._feeder.cancel()
+        await self.decoder.close()
@@ -0,0 +1,256 @@
+import asyncio
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import re
+import subprocess
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from app.services import local_stt_service
+from app.services.analytics_service import AnalyticsService
+from app.services.audio_codec import CONTAINERS, PCM_SAMPLE_RATE
+from app.services.llm_gateway import DEFAULT_COMPLETION_TOKENS
+from app.services.llm_scheduler import LLMScheduler
+from app.services.prompt_builder import count_tokens
+from app.services.resampler import AudioNormalizer
+from app.services.summary_service import SUMMARY_FAILED, SummaryService
+from app.services.vad_service import EnergyVAD
+
+logger = logging.getLogger(__name__)
+
+RECORDING_PATTERN = re.compile(r"^audio_(?P<session_id>.+)\.(?P<ext>wav|webm|ogg|mp3)$")
+DRY_RUN_ENGINE = "segments"  # no model: each speech segment becomes a placeholder line
+MIN_SEGMENT_MS = 200
+STAGES = ("summary", "report")  # LLM stages after transcription
+
+def find_recordings(directory: str) -> list:
+    """(session_id, path) for every saved call recording in `directory`, oldest first."""
+    found = []
+    for name in os.listdir(directory):
+        match = RECORDING_PATTERN.match(name)
+        if match:
+            path = os.path.join(directory, name)
+            found.append((os.path.getmtime(path), match["session_id"], path))
+    return [(session_id, path) for _, session_id, path in sorted(found)]
+
+# --- Worker process side -------------------------------------------------------------
+# Each pool process loads the STT model once (see local_stt_service) and decodes,
+# segments and transcribes whole recordings.
+
+_engine = None
+
+def _init_worker(engine: str, model_name: str, compute_type: str, cpu_threads: int):
+    global _engine
+    _engine = engine
+    if engine != DRY_RUN_ENGINE:
+        local_stt_service._init_worker(engine, model_name, compute_type, cpu_threads)
+
+def load_pcm(path: str) -> bytes:
+    """A recording as 16 kHz mono 16-bit PCM; containers are decoded with ffmpeg."""
+    ext = path.rsplit(".", 1)[-1]
+    if ext == "wav":
+        with wave.open(path, "rb") as wf:
+            if wf.getsampwidth() != 2:
+                raise ValueError(f"{path}: expected 16-bit PCM, got {wf.getsampwidth() * 8}-bit")
+            frames = wf.readframes(wf.getnframes())
+            return AudioNormalizer(wf.getframerate(), wf.getnchannels()).process(frames)
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-f", CONTAINERS[ext], "-i", path,
+         "-f", "s16le", "-ac", "1", "-ar", str(PCM_SAMPLE_RATE), "pipe:1"],
+        capture_output=True, check=True,
+    )
+    return result.stdout
+
+def speech_segments(pcm: bytes, max_segment_ms: int, sample_rate: int = PCM_SAMPLE_RATE) -> list:
+    """(start seconds, PCM) for each utterance EnergyVAD finds, split at `max_segment_ms`."""
+    vad = EnergyVAD(sample_rate=sample_rate)
+    frames, active = vad.process(pcm)
+    if not active.any():
+        return []
+    max_frames = max(1, max_segment_ms // vad.frame_ms)
+    min_frames = MIN_SEGMENT_MS // vad.frame_ms
+    segments = []
+    bounds = np.flatnonzero(np.diff(active.astype(np.int8))) + 1
+    for run in np.split(np.arange(len(active)), bounds):
+        if not active[run[0]] or len(run) < min_frames:
+            continue
+        for start in range(run[0], run[-1] + 1, max_frames):
+            stop = min(start + max_frames, run[-1] + 1)
+            segments.append((start * vad.frame_ms / 1000, frames[start:stop].tobytes()))
+    return segments
+
+def transcribe_recording(path: str, language: str, max_segment_ms: int) -> dict:
+    """Runs in a pool worker: decode, segment and transcribe one recording."""
+    started = time.perf_counter()
+    pcm = load_pcm(path)
+    lines, speech_bytes = [], 0
+    for _, segment in speech_segments(pcm, max_segment_ms):
+        speech_bytes += len(segment)
+        if _engine == DRY_RUN_ENGINE:
+            text = f"[speech {len(segment) / (PCM_SAMPLE_RATE * 2):.1f}s]"
+        else:
+            text = local_stt_service.transcribe_pcm(segment, language)
+        # No diarization offline; "Unknown" is what live calls use without a speaker id
+        if text:
+            lines.append(f"Unknown: {text}")
+    return {
+        "lines": lines,
+        "duration_seconds": round(len(pcm) / (PCM_SAMPLE_RATE * 2), 1),
+        "speech_seconds": round(speech_bytes / (PCM_SAMPLE_RATE * 2), 1),
+        "stt_seconds": round(time.perf_counter() - started, 3),
+    }
+
+# --- Job side ------------------------------------------------------------------------
+
+def load_checkpoint(path: str, tag: str) -> set:
+    """Session ids already finished under `tag`."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut short by a crash
+            if record.get("tag") == tag:
+                done.add(record["session_id"])
+    return done
+
+def interaction_update(result: dict, stages: tuple = STAGES) -> dict:
+    """
+    interactions columns a reprocessed call rewrites: the transcript, and the columns of
+    the `stages` that ran. The rest of its row (e.g. another stage's output) is left alone.
+    """
+    row = {
+        "interaction_id": result["session_id"],
+        "session_id": result["session_id"],
+        "transcript": " ".join(result["lines"]),
+        "duration_sec": int(result["duration_seconds"]),
+    }
+    if "summary" in stages:
+        row["summary"] = result.get("summary")
+    if "report" in stages:
+        report = result.get("report") or {}
+        row.update({
+            "sentiment": report.get("sentiment"),
+            "objections_raised": report.get("objections") or [],
+            "report_summary": report or None,
+        })
+    return row
+
+class ReprocessJob:
+    """
+    Re-runs the post-call pipeline over an archive of recordings: transcription in a
+    process pool (one STT model per core), then summary and report through `llm`.
+    Each LLM stage first takes a `scheduler` slot, which holds the job to its rate
+    budget; the wait happens outside the gateway so it doesn't eat the stage deadline.
+
+    Finished calls are appended to a JSONL checkpoint under `tag` once they have been
+    written back, so a rerun with the same tag only picks up what is missing or
+    failed. Results are written back in batches of `write_batch` through
+    `call_index.upsert_calls` (skipped when no call index is given).
+    """
+
+    def __init__(self, recordings_dir: str, checkpoint_path: str, tag: str, llm=None,
+                 scheduler: LLMScheduler | None = None, call_index=None,
+                 engine: str = "faster-whisper", model: str = "base", compute_type: str = "int8",
+                 cpu_threads: int = 1, workers: int | None = None, language: str = "en",
+                 stages: tuple = STAGES, max_segment_ms: int = 15000, write_batch: int = 50):
+        self.recordings_dir = recordings_dir
+        self.checkpoint_path = checkpoint_path
+        self.tag = tag
+        self.llm = llm
+        self.scheduler = scheduler
+        self.call_index = call_index
+        self.worker_args = (engine, model, compute_type, cpu_threads)
+        self.workers = workers or os.cpu_count() or 1
+        self.language = language
+        self.stages = stages
+        self.max_segment_ms = max_segment_ms
+        self.write_batch = write_batch
+        self._buffer = []
+        self.stats = {"found": 0, "skipped": 0, "done": 0, "failed": 0}
+
+    async def run(self, force: bool = False) -> dict:
+        recordings = find_recordings(self.recordings_dir)
+        done = set() if force else load_checkpoint(self.checkpoint_path, self.tag)
+        pending = [(session_id, path) for session_id, path in recordings if session_id not in done]
+        self.stats.update(found=len(recordings), skipped=len(recordings) - len(pending))
+        logger.info(f"Reprocessing {len(pending)} of {len(recordings)} recordings (tag {self.tag}, {self.workers} workers)")
+        if not pending:
+            return self.stats
+
+        started = time.perf_counter()
+        pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            # spawn: don't fork the event loop and open sockets into the workers
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=self.worker_args,
+        )
+        try:
+            await asyncio.gather(*(self._process(pool, session_id, path) for session_id, path in pending))
+            await self._flush()
+            if self.call_index is not None:
+                await self.call_index.flush()
+        finally:
+            pool.shutdown(cancel_futures=True)
+        self.stats["seconds"] = round(time.perf_counter() - started, 2)
+        return self.stats
+
+    async def _process(self, pool: ProcessPoolExecutor, session_id: str, path: str):
+        loop = asyncio.get_running_loop()
+        try:
+            transcript = await loop.run_in_executor(pool, transcribe_recording, path, self.language, self.max_segment_ms)
+            result = {"session_id": session_id, "tag": self.tag, "path": path, **transcript}
+            result["summary"], result["report"] = await asyncio.gather(
+                self._summary(transcript["lines"]), self._report(transcript["lines"]),
+            )
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Reprocessing {session_id} failed: {e}")
+            return
+        result["processed_at"] = datetime.datetime.now().isoformat()
+        self._buffer.append(result)
+        self.stats["done"] += 1
+        if len(self._buffer) >= self.write_batch:
+            await self._flush()
+
+    async def _admitted(self, stage: str, lines: list, call):
+        if self.scheduler is None:
+            return await call()
+        async with self.scheduler.slot(stage, None, count_tokens("\n".join(lines)) + DEFAULT_COMPLETION_TOKENS):
+            return await call()
+
+    async def _summary(self, lines: list):
+        if "summary" not in self.stages or not lines:
+            return None
+        service = SummaryService(self.llm)
+        summary = await self._admitted("summary", lines, lambda: service.generate_summary("\n".join(lines)))
+        # SummaryService keeps live calls going with a placeholder; here it must not be saved
+        if summary == SUMMARY_FAILED:
+            raise RuntimeError("summary generation failed")
+        return summary
+
+    async def _report(self, lines: list):
+        if "report" not in self.stages or not lines:
+            return None
+        service = AnalyticsService(self.llm)
+        return await self._admitted("report", lines, lambda: service.report_from_lines(lines))
+
+    async def _flush(self):
+        batch, self._buffer = self._buffer, []
+        if not batch:
+            return
+        if self.call_index is not None:
+            await self.call_index.upsert_calls([interaction_update(result, self.stages) for result in batch])
+        # Checkpoint only after the write-back, so a crash redoes the batch instead of losing it
+        with open(self.checkpoint_path, "a") as f:
+            for result in batch:
+                f.write(json.dumps(result) + "\n")
+        logger.info(f"Saved {len(batch)} reprocessed calls{'' if self.call_index is None else ' and wrote them back'}")
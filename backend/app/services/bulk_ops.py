@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import time
+from app.core.clients import get_supabase
+from app.core.metrics import DB_WRITE_SECONDS, timed
+
+logger = logging.getLogger(__name__)
+
+# Rows per upsert request (sent in the body), and keys per in.(...) filter (sent in the URL,
+# which proxies in front of PostgREST cap at a few KB: 200 UUIDs is about 8 KB)
+CHUNK_SIZE = 500
+KEY_CHUNK_SIZE = 200
+# PostgREST's default max-rows
+PAGE_SIZE = 1000
+CONCURRENCY = 4
+RETRIES = 3
+BACKOFF_SECONDS = 0.5
+PROGRESS_SECONDS = 1.0
+
+def chunked(items: list, size: int) -> list:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+class BulkTable:
+    """
+    Chunked reads and writes on one Supabase table for the maintenance scripts: upserts
+    and deletes go out CHUNK_SIZE rows (or KEY_CHUNK_SIZE keys) per request, `concurrency`
+    requests at a time on worker threads. A failed chunk is retried with exponential
+    backoff; one that still fails is counted in the report and the rest carry on.
+
+    With `dry_run`, writes only compare against what is stored and report what they would
+    insert, update or delete.
+    """
+
+    def __init__(self, table: str, key: str = "id", supabase=None, chunk_size: int = CHUNK_SIZE,
+                 concurrency: int = CONCURRENCY, retries: int = RETRIES, backoff: float = BACKOFF_SECONDS,
+                 dry_run: bool = False):
+        self.table = table
+        self.key = key
+        self.supabase = supabase or get_supabase()
+        self.chunk_size = chunk_size
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.dry_run = dry_run
+
+    async def _attempt(self, fn, chunk: list):
+        for attempt in range(self.retries + 1):
+            try:
+                return await asyncio.to_thread(fn, chunk)
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+                logger.warning(f"{self.table}: chunk of {len(chunk)} failed ({e}), retry in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _run(self, op: str, chunks: list, fn) -> tuple[dict, list]:
+        """Runs `fn` over every chunk, `concurrency` at a time, logging progress. Returns the report and the rows read."""
+        total = sum(len(chunk) for chunk in chunks)
+        report = {"table": self.table, "op": op, "rows": 0, "requests": len(chunks), "failed": 0, "errors": []}
+        results = []
+        semaphore = asyncio.Semaphore(self.concurrency)
+        start = last_logged = time.perf_counter()
+
+        async def run_chunk(chunk):
+            nonlocal last_logged
+            async with semaphore:
+                try:
+                    results.append(await self._attempt(fn, chunk))
+                    report["rows"] += len(chunk)
+                except Exception as e:
+                    report["failed"] += len(chunk)
+                    report["errors"].append(str(e))
+                    logger.error(f"{self.table}: {op} of {len(chunk)} rows failed after {self.retries} retries: {e}")
+            now = time.perf_counter()
+            if now - last_logged >= PROGRESS_SECONDS:
+                last_logged = now
+                done = report["rows"] + report["failed"]
+                logger.info(f"{self.table}: {op} {done}/{total} rows ({done / (now - start):,.0f} rows/s)")
+
+        await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+        report["seconds"] = round(time.perf_counter() - start, 3)
+        report["rows_per_second"] = round(report["rows"] / report["seconds"]) if report["seconds"] else None
+        return report, [row for rows in results if rows for row in rows]
+
+    async def fetch(self, values: list, columns: str = "*", column: str | None = None) -> list:
+        """Rows whose `column` (the key by default) is one of `values`."""
+        column = column or self.key
+        def select(chunk):
+            return self.supabase.table(self.table).select(columns).in_(column, chunk).execute().data
+        report, rows = await self._run("fetch", chunked(list(dict.fromkeys(values)), KEY_CHUNK_SIZE), select)
+        if report["failed"]:
+            raise RuntimeError(f"{self.table}: could not read {report['failed']} keys: {report['errors'][0]}")
+        return rows
+
+    async def fetch_all(self, columns: str = "*") -> list:
+        """Every row, PAGE_SIZE per request in key order."""
+        rows, start = [], 0
+        while True:
+            page = await asyncio.to_thread(
+                lambda: self.supabase.table(self.table).select(columns)
+                .order(self.key).range(start, start + PAGE_SIZE - 1).execute().data
+            )
+            rows.extend(page)
+            if len(page) < PAGE_SIZE:
+                return rows
+            start += PAGE_SIZE
+
+    async def diff(self, rows: list) -> dict:
+        """
+        Splits `rows` into those not stored yet, those whose given columns differ from the
+        stored row, and the number already stored as given.
+        """
+        stored = {row[self.key]: row for row in await self.fetch([row[self.key] for row in rows])}
+        changes = {"insert": [], "update": [], "unchanged": 0}
+        for row in rows:
+            current = stored.get(row[self.key])
+            if current is None:
+                changes["insert"].append(row)
+            elif any(current.get(column) != value for column, value in row.items()):
+                changes["update"].append(row)
+            else:
+                changes["unchanged"] += 1
+        return changes
+
+    async def upsert(self, rows: list, skip_unchanged: bool = False) -> dict:
+        """
+        Inserts or merges `rows` by key; columns a row leaves out keep their stored value.
+        With `skip_unchanged` (implied by dry_run) rows already stored as given aren't sent.
+        """
+        changes = None
+        if skip_unchanged or self.dry_run:
+            changes = await self.diff(rows)
+            rows = changes["insert"] + changes["update"]
+        if self.dry_run:
+            return self._dry_report("upsert", rows, changes)
+
+        def write(chunk):
+            with timed(DB_WRITE_SECONDS, "db.write", table=self.table):
+                self.supabase.table(self.table).upsert(
+                    chunk, on_conflict=self.key, returning="minimal", default_to_null=False
+                ).execute()
+        report, _ = await self._run("upsert", chunked(rows, self.chunk_size), write)
+        if changes is not None:
+            report.update(inserted=len(changes["insert"]), updated=len(changes["update"]), unchanged=changes["unchanged"])
+        return report
+
+    async def delete(self, values: list) -> dict:
+        """Deletes the rows whose key is one of `values`."""
+        values = list(dict.fromkeys(values))
+        if self.dry_run:
+            stored = await self.fetch(values, columns=self.key)
+            return self._dry_report("delete", stored, None)
+
+        def remove(chunk):
+            with timed(DB_WRITE_SECONDS, "db.write", table=self.table):
+                self.supabase.table(self.table).delete(returning="minimal").in_(self.key, chunk).execute()
+        report, _ = await self._run("delete", chunked(values, KEY_CHUNK_SIZE), remove)
+        return report
+
+    def _dry_report(self, op: str, rows: list, changes: dict | None) -> dict:
+        report = {"table": self.table, "op": op, "dry_run": True, "rows": len(rows), "requests": 0, "failed": 0}
+        if changes is not None:
+            report.update(inserted=len(changes["insert"]), updated=len(changes["update"]), unchanged=changes["unchanged"])
+        report["keys"] = [row[self.key] for row in rows]
+        return report
+
+def add_bulk_arguments(parser):
+    """The options every bulk maintenance script takes."""
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows per upsert request")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Requests in flight")
+    parser.add_argument("--retries", type=int, default=RETRIES, help="Retries per failed chunk")
+
+def table_from_args(table: str, args, key: str = "id") -> BulkTable:
+    return BulkTable(table, key, chunk_size=args.chunk_size, concurrency=args.concurrency,
+                     retries=args.retries, dry_run=args.dry_run)
+
+def format_report(report: dict) -> str:
+    counts = ", ".join(f"{report[k]} {k}" for k in ("inserted", "updated", "unchanged") if k in report)
+    if report.get("dry_run"):
+        return f"[dry run] {report['table']}: would {report['op']} {report['rows']} rows" + (f" ({counts})" if counts else "")
+    line = f"{report['table']}: {report['op']} {report['rows']} rows in {report['requests']} requests, {report['seconds']}s"
+    if report["rows_per_second"]:
+        line += f" ({report['rows_per_second']:,} rows/s)"
+    if counts:
+        line += f"; {counts}"
+    if report["failed"]:
+        line += f"; {report['failed']} rows FAILED: {report['errors'][0]}"
+    return line
@@ -0,0 +1,218 @@
+import asyncio
+import base64
+import datetime
+import json
+import logging
+import re
+from app.core.clients import get_embeddings, get_supabase
+from app.core.metrics import DB_WRITE_SECONDS, timed
+from app.services.prompt_builder import count_tokens
+
+logger = logging.getLogger(__name__)
+
+CHUNK_TOKENS = 120
+EMBED_BATCH_SIZE = 32
+EMBED_LINGER_SECONDS = 0.5  # how long a chunk waits for others to share its embedding request
+MATCH_THRESHOLD = 0.3
+# Everything but the transcript, so result pages stay small
+RESULT_COLUMNS = (
+    "interaction_id, session_id, investor_id, lead_name, agent_name, date, created_at, "
+    "duration_sec, sentiment, objections_raised, summary"
+)
+# Interaction ids are the calls' session ids
+INTERACTION_ID = re.compile(r"[\w.:/-]{1,128}")
+
+def chunk_text(text: str, max_tokens: int = CHUNK_TOKENS) -> list:
+    """Packs whole sentences into chunks of at most `max_tokens` (a longer sentence is its own chunk)."""
+    chunks, current, used = [], [], 0
+    for sentence in re.split(r"(?<=[.!?])\s+|\n+", (text or "").strip()):
+        if not sentence.strip():
+            continue
+        cost = count_tokens(sentence)
+        if current and used + cost > max_tokens:
+            chunks.append(" ".join(current))
+            current, used = [], 0
+        current.append(sentence.strip())
+        used += cost
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+def encode_cursor(row: dict) -> str:
+    raw = json.dumps([row["created_at"], row["interaction_id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """
+    (created_at, interaction_id) from a next_cursor. Both end up in a PostgREST filter,
+    so anything that isn't a timestamp and an id raises ValueError.
+    """
+    try:
+        created_at, interaction_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        created_at = datetime.datetime.fromisoformat(created_at).isoformat()
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {e}") from None
+    if not isinstance(interaction_id, str) or not INTERACTION_ID.fullmatch(interaction_id):
+        raise ValueError("Invalid cursor: bad interaction id")
+    return created_at, interaction_id
+
+def interaction_row(entry: dict, lead_name: str | None, agent_name: str | None, investor_id: str | None = None) -> dict:
+    """interactions row for a post-call history entry (keyed by the call's session id)."""
+    analytics = entry.get("call_analytics") or {}
+    timestamp = entry.get("timestamp") or datetime.datetime.now().isoformat()
+    duration = analytics.get("duration_seconds")
+    summary = entry.get("summary")
+    return {
+        "interaction_id": entry["session_id"],
+        "session_id": entry["session_id"],
+        "investor_id": investor_id,
+        "lead_name": lead_name,
+        "agent_name": agent_name or entry.get("handling_agent"),
+        "date": timestamp[:10],
+        "created_at": timestamp,
+        "duration_sec": int(duration) if isinstance(duration, (int, float)) else None,
+        "transcript": entry.get("conversation"),
+        "summary": summary if isinstance(summary, str) else json.dumps(summary),
+    }
+
+class CallIndexService:
+    """
+    Search over past calls. Each finished call becomes an `interactions` row (full-text
+    indexed via its generated `search` column) and its summary is split into chunks that
+    are embedded into `interaction_chunks` for semantic search. Chunks from calls ending
+    close together share one batch embedding request. See call_index.sql for the schema.
+    """
+
+    def __init__(self):
+        self.supabase = get_supabase()
+        self.embeddings = get_embeddings()
+        self._pending = []  # (interaction_id, chunk_index, content) awaiting embedding
+        self._flush_task = None
+
+    def _upsert(self, table: str, rows: list, on_conflict: str):
+        with timed(DB_WRITE_SECONDS, "db.write", table=table):
+            self.supabase.table(table).upsert(rows, on_conflict=on_conflict).execute()
+
+    async def index_call(self, entry: dict, lead_name: str | None, agent_name: str | None, investor_id: str | None = None) -> str:
+        row = interaction_row(entry, lead_name, agent_name, investor_id)
+        await asyncio.to_thread(self._upsert, "interactions", [row], "interaction_id")
+        chunks = self.queue_chunks(row["interaction_id"], row["summary"])
+        logger.info(f"Indexed call {row['interaction_id']} ({chunks} summary chunks queued)")
+        return row["interaction_id"]
+
+    async def upsert_calls(self, rows: list):
+        """
+        Writes many interactions rows in one request and queues their summaries for
+        embedding. Rows may carry a subset of columns; the others keep their values.
+        """
+        if not rows:
+            return
+        await asyncio.to_thread(self._upsert, "interactions", rows, "interaction_id")
+        # A new summary may split into fewer chunks than the old one
+        ids = [row["interaction_id"] for row in rows if row.get("summary")]
+        if ids:
+            def delete():
+                with timed(DB_WRITE_SECONDS, "db.write", table="interaction_chunks"):
+                    self.supabase.table("interaction_chunks").delete().in_("interaction_id", ids).execute()
+            await asyncio.to_thread(delete)
+        for row in rows:
+            if row.get("summary"):
+                self.queue_chunks(row["interaction_id"], row["summary"])
+
+    def queue_chunks(self, interaction_id: str, summary: str) -> int:
+        chunks = chunk_text(summary)
+        self._pending.extend((interaction_id, i, chunk) for i, chunk in enumerate(chunks))
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+        return len(chunks)
+
+    async def _flush_later(self):
+        if len(self._pending) < EMBED_BATCH_SIZE:
+            await asyncio.sleep(EMBED_LINGER_SECONDS)
+        await self.flush()
+
+    async def flush(self):
+        """Embeds and stores every queued chunk, EMBED_BATCH_SIZE per request."""
+        while self._pending:
+            batch, self._pending = self._pending[:EMBED_BATCH_SIZE], self._pending[EMBED_BATCH_SIZE:]
+            try:
+                vectors = await asyncio.to_thread(self.embeddings.embed_documents, [content for _, _, content in batch])
+                rows = [
+                    {"interaction_id": interaction_id, "chunk_index": index, "content": content, "embedding": vector}
+                    for (interaction_id, index, content), vector in zip(batch, vectors)
+                ]
+                await asyncio.to_thread(self._upsert, "interaction_chunks", rows, "interaction_id,chunk_index")
+            except Exception as e:
+                # The calls stay searchable by text; backfill_call_index.py can re-embed them
+                logger.error(f"Failed to embed {len(batch)} call summary chunks: {e}")
+
+    async def record_report(self, session_id: str, report: dict):
+        """Adds an /end-call report's sentiment and objections to the call's row."""
+        fields = {
+            "sentiment": report.get("sentiment"),
+            "objections_raised": report.get("objections") or [],
+            "report_summary": report,
+        }
+        def update():
+            with timed(DB_WRITE_SECONDS, "db.write", table="interactions"):
+                self.supabase.table("interactions").update(fields).eq("session_id", session_id).execute()
+        await asyncio.to_thread(update)
+
+    def search(self, q: str | None = None, agent: str | None = None, since: str | None = None,
+               until: str | None = None, limit: int = 20, cursor: str | None = None) -> dict:
+        """Full-text search, newest first, paged by keyset cursor."""
+        query = self.supabase.table("interactions").select(RESULT_COLUMNS)
+        if q:
+            query = query.text_search("search", q, options={"type": "websearch", "config": "english"})
+        if agent:
+            query = query.eq("agent_name", agent)
+        if since:
+            query = query.gte("created_at", since)
+        if until:
+            query = query.lt("created_at", until)
+        if cursor:
+            created_at, interaction_id = decode_cursor(cursor)
+            query = query.or_(
+                f'created_at.lt."{created_at}",'
+                f'and(created_at.eq."{created_at}",interaction_id.lt."{interaction_id}")'
+            )
+        rows = query.order("created_at", desc=True).order("interaction_id", desc=True).limit(limit).execute().data
+        return {"results": rows, "next_cursor": encode_cursor(rows[-1]) if len(rows) == limit else None}
+
+    def semantic_search(self, q: str, agent: str | None = None, since: str | None = None,
+                        until: str | None = None, limit: int = 20) -> dict:
+        """
+        Calls whose summaries are closest in meaning to `q`, each with its best-matching
+        passage. Ranked by similarity, so there is no next page (next_cursor is always None).
+        """
+        matches = self.supabase.rpc(
+            "match_call_chunks",
+            {
+                "query_embedding": self.embeddings.embed_query(q),
+                "match_threshold": MATCH_THRESHOLD,
+                "match_count": limit,
+                "filter_agent": agent,
+                "since": since,
+                "until": until,
+            }
+        ).execute().data
+        if not matches:
+            return {"results": [], "next_cursor": None}
+        rows = self.supabase.table("interactions")\
+            .select(RESULT_COLUMNS)\
+            .in_("interaction_id", [m["interaction_id"] for m in matches])\
+            .execute().data
+        by_id = {row["interaction_id"]: row for row in rows}
+        results = [
+            {**by_id[m["interaction_id"]], "match": m["content"], "similarity": m["similarity"]}
+            for m in matches if m["interaction_id"] in by_id
+        ]
+        return {"results": results, "next_cursor": None}
+
+_call_index = None
+
+def get_call_index() -> CallIndexService:
+    global _call_index
+    if _call_index is None:
+        _call_index = CallIndexService()
+    return _call_index
@@ -0,0 +1,139 @@
+import json
+import logging
+import struct
+
+logger = logging.getLogger(__name__)
+
+# Downstream (server -> dashboard) encodings on /ws/audio. The client picks one with the
+# WebSocket subprotocol header or ?protocol=; anything else gets JSON text frames.
+SUBPROTOCOLS = {"copilot.binary.v1": "binary", "copilot.json": "json"}
+PROTOCOLS = ("json", "binary")
+
+# Binary frames: one per WebSocket message, type byte first.
+#   TRANSCRIPT  type, flags, speaker (int8, -1 = none), [kept words (uint16) if DELTA], UTF-8 text
+#   SPEAKER     type, speaker (int8), UTF-8 name; sent before a speaker's first labelled final
+#   MESSAGE     type, UTF-8 JSON; everything else (assist results, init_ack, errors)
+# A DELTA transcript keeps the first `kept` words of the previous interim and appends its text.
+FRAME_TRANSCRIPT = 1
+FRAME_SPEAKER = 2
+FRAME_MESSAGE = 3
+FLAG_FINAL = 1
+FLAG_DELTA = 2
+NO_SPEAKER = -1
+MAX_KEPT = 0xFFFF
+
+TRANSCRIPT_HEADER = struct.Struct("<BBb")
+DELTA_HEADER = struct.Struct("<BBbH")
+SPEAKER_HEADER = struct.Struct("<Bb")
+
+def negotiate_protocol(requested: str | None, offered: list) -> tuple[str, str | None]:
+    """
+    (protocol, subprotocol to accept with) for a connection: the first subprotocol the client
+    offered that we speak, else the ?protocol= value, else JSON.
+    """
+    for name in offered:
+        if name in SUBPROTOCOLS:
+            return SUBPROTOCOLS[name], name
+    if requested:
+        protocol = requested.strip().lower()
+        if protocol in PROTOCOLS:
+            return protocol, None
+        logger.warning(f"Unknown protocol '{requested}', falling back to JSON")
+    return "json", None
+
+class JSONEncoder:
+    """The original protocol: one JSON text frame per message."""
+
+    protocol = "json"
+
+    def encode(self, message: dict) -> list:
+        return [json.dumps(message)]
+
+class BinaryEncoder:
+    """
+    Encodes one connection's messages as binary frames. Per-connection state: the words of
+    the utterance being transcribed (for delta interims) and the speakers already named.
+    """
+
+    protocol = "binary"
+
+    def __init__(self):
+        self.words = []
+        self.speaker = None
+        self.named = {}
+
+    def _message(self, message: dict) -> bytes:
+        return bytes((FRAME_MESSAGE,)) + json.dumps(message, separators=(",", ":")).encode()
+
+    def encode(self, message: dict) -> list:
+        if message.get("type") != "transcript":
+            return [self._message(message)]
+        speaker = message.get("speaker")
+        if speaker is None:
+            speaker = NO_SPEAKER
+        elif not isinstance(speaker, int) or not 0 <= speaker <= 127:
+            return [self._message(message)]
+        text = message.get("data") or ""
+        is_final = bool(message.get("is_final"))
+        frames = []
+        name = message.get("speaker_name")
+        if name is not None and self.named.get(speaker) != name:
+            self.named[speaker] = name
+            frames.append(SPEAKER_HEADER.pack(FRAME_SPEAKER, speaker) + name.encode())
+
+        words = text.split()
+        kept = 0
+        # Deltas only continue the same speaker's utterance, and only when rejoining the words is lossless
+        if speaker == self.speaker and self.words and " ".join(words) == text:
+            for old, new in zip(self.words, words):
+                if old != new:
+                    break
+                kept += 1
+        flags = FLAG_FINAL if is_final else 0
+        if kept:
+            appended = " ".join(words[min(kept, MAX_KEPT):])
+            frame = DELTA_HEADER.pack(FRAME_TRANSCRIPT, flags | FLAG_DELTA, speaker, min(kept, MAX_KEPT)) + appended.encode()
+        else:
+            frame = TRANSCRIPT_HEADER.pack(FRAME_TRANSCRIPT, flags, speaker) + text.encode()
+        frames.append(frame)
+        # A final ends the utterance; the next interim starts from scratch
+        self.words, self.speaker = ([], None) if is_final else (words, speaker)
+        return frames
+
+def get_encoder(protocol: str):
+    return BinaryEncoder() if protocol == "binary" else JSONEncoder()
+
+class BinaryDecoder:
+    """
+    Reference decoder (the dashboard's side): turns binary frames back into the JSON
+    protocol's messages. SPEAKER frames only update state and yield None.
+    """
+
+    def __init__(self):
+        self.words = []
+        self.names = {}
+
+    def decode(self, frame: bytes) -> dict | None:
+        kind = frame[0]
+        if kind == FRAME_MESSAGE:
+            return json.loads(frame[1:])
+        if kind == FRAME_SPEAKER:
+            _, speaker = SPEAKER_HEADER.unpack_from(frame)
+            self.names[speaker] = frame[SPEAKER_HEADER.size:].decode()
+            return None
+        if kind != FRAME_TRANSCRIPT:
+            raise ValueError(f"Unknown frame type {kind}")
+        _, flags, speaker = TRANSCRIPT_HEADER.unpack_from(frame)
+        if flags & FLAG_DELTA:
+            _, _, _, kept = DELTA_HEADER.unpack_from(frame)
+            words = self.words[:kept] + frame[DELTA_HEADER.size:].decode().split()
+            text = " ".join(words)
+        else:
+            text = frame[TRANSCRIPT_HEADER.size:].decode()
+            words = text.split()
+        is_final = bool(flags & FLAG_FINAL)
+        self.words = [] if is_final else words
+        message = {"type": "transcript", "data": text, "speaker": None if speaker == NO_SPEAKER else speaker, "is_final": is_final}
+        if is_final and speaker in self.names:
+            message["speaker_name"] = self.names[speaker]
+        return message
@@ -2,15 +2,30 @@ import logging
 import json
 from websockets.asyncio.client import connect
 from app.core.config import settings
+from app.core.log_sampling import SampledLog
+from app.core.metrics import AUDIO_BYTES
+from app.services.audio_codec import AudioFormat, deepgram_params
+from app.services.stt_service import STTProvider, transcript_message
 import asyncio
+import time
 
 logger = logging.getLogger(__name__)
 
-class DeepgramService:
+# Deepgram closes a stream after ~10s without audio; KeepAlive covers gaps (e.g. VAD-gated silence)
+KEEPALIVE_INTERVAL = 5.0
+
+# Per-chunk / per-message debug lines are sampled; they were a measurable cost on the hot path
+log_forward = SampledLog(logger)
+log_transcript = SampledLog(logger)
+
+class DeepgramService(STTProvider):
+    # Deepgram decodes WebM/Ogg Opus itself, so compressed audio is passed through
+    accepts_compressed = True
+
     def __init__(self):
         self.api_key = settings.DEEPGRAM_API_KEY
 
-    async def start_transcription(self, websocket_client, language="en"):
+    async def start_transcription(self, websocket_client, language="en", audio_format: AudioFormat | None = None):
         """
         Manages the connection between the client WebSocket and Deepgram using raw websockets.
         """
@@ -24,41 +39,65 @@ class DeepgramService:
         if language == "mr":
             model = "whisper-medium"
         
-        # Using channels=1 (Downmix) for robust diarization
-        url = f"wss://api.deepgram.com/v1/listen?model={model}&language={language}&smart_format=true&channels=1&interim_results=true&utterance_end_ms=1500&vad_events=true&diarize=true"
+        # Raw PCM needs its encoding spelled out; containers (WebM/Opus etc.) are detected upstream
+        encoding = deepgram_params(audio_format or AudioFormat())
+        url = f"{settings.DEEPGRAM_URL}?model={model}&language={language}&smart_format=true&interim_results=true&utterance_end_ms=1500&vad_events=true&diarize=true"
+        if encoding:
+            url += f"&{encoding}"
 
-        print(f"Connecting to Deepgram: {url}", flush=True)
+        logger.info(f"Connecting to Deepgram: {url}")
         if not self.api_key:
-            print("ERROR: Deepgram API Key is missing!", flush=True)
+            logger.error("Deepgram API Key is missing!")
             return
 
         try:
             # Increase timeout and disable ping_interval to avoid handshake timeouts
             async with connect(url, additional_headers=extra_headers, ping_interval=None, open_timeout=20) as dg_socket:
-                print("Connected to Deepgram WebSocket", flush=True)
+                logger.info("Connected to Deepgram WebSocket")
                 
+                last_sent = time.monotonic()
+
+                async def keepalive():
+                    """Keeps the stream open while no audio is being forwarded"""
+                    nonlocal last_sent
+                    while True:
+                        await asyncio.sleep(1.0)
+                        if time.monotonic() - last_sent >= KEEPALIVE_INTERVAL:
+                            await dg_socket.send(json.dumps({"type": "KeepAlive"}))
+                            last_sent = time.monotonic()
+
                 async def sender():
                     """Forwards audio from client to Deepgram"""
-                    print("Starting sender task")
+                    nonlocal last_sent
+                    logger.debug("Starting sender task")
+                    keepalive_task = asyncio.create_task(keepalive())
                     try:
                         while True:
                             data = await websocket_client.receive_bytes()
-                            print(f"Forwarding {len(data)} bytes to Deepgram")
+                            log_forward("Forwarding %d bytes to Deepgram", len(data))
                             await dg_socket.send(data)
+                            AUDIO_BYTES.labels(direction="upstream").inc(len(data))
+                            last_sent = time.monotonic()
                     except Exception as e:
                         logger.info(f"Sender closed: {e}")
-                        print(f"Sender closed: {e}")
+                    finally:
+                        keepalive_task.cancel()
+                        # Ask Deepgram to flush and close so the receiver finishes promptly
+                        try:
+                            await dg_socket.send(json.dumps({"type": "CloseStream"}))
+                        except Exception:
+                            pass
 
                 async def receiver():
                     """Forwards transcripts from Deepgram to client"""
-                    print("Starting receiver task")
+                    logger.debug("Starting receiver task")
                     try:
                         async for msg in dg_socket:
                             # print(f"Received message from Deepgram: {msg[:100]}")
                             try:
                                 res = json.loads(msg)
                             except json.JSONDecodeError:
-                                print(f"Failed to decode JSON: {msg}")
+                                logger.warning(f"Failed to decode JSON: {msg}")
                                 continue
 
                             if not isinstance(res, dict):
@@ -88,27 +127,18 @@ class DeepgramService:
                                             if words and len(words) > 0:
                                                 # Take the speaker of the first word as the speaker for this segment
                                                 speaker = words[0].get("speaker")
-                                                # Debug logging for diarization
-                                                print(f"Diarization Debug: Extracted Speaker={speaker}, Words List Length={len(words)}")
-                                            else:
-                                                print(f"Diarization Debug: No words found. Transcript: '{transcript}'")
                                                 
                                             if transcript:
-                                                print(f"Transcript: {transcript} (Speaker: {speaker})")
-                                                await websocket_client.send_text(json.dumps({
-                                                    "type": "transcript",
-                                                    "data": transcript,
-                                                    "speaker": speaker,
-                                                    "is_final": res.get("is_final", False)
-                                                }))
+                                                log_transcript("Transcript: %s (Speaker: %s, words: %d)", transcript, speaker, len(words))
+                                                await websocket_client.send_message(transcript_message(
+                                                    transcript, speaker, res.get("is_final", False)
+                                                ))
                     except Exception as e:
                         logger.info(f"Receiver closed: {e}")
-                        print(f"Receiver closed: {e}")
 
                 # Run both tasks
                 await asyncio.gather(sender(), receiver())
 
         except Exception as e:
             logger.error(f"Deepgram Connection Error: {e}")
-            print(f"Deepgram Connection Error: {e}")
             # Don't raise, just log/return to allow cleanup
@@ -0,0 +1,205 @@
+import json
+import logging
+import math
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SIMILARITY_WEIGHT = 0.8
+PERFORMANCE_WEIGHT = 0.2
+CAPACITY_SLACK = 1.2  # default per-agent capacity: 20% above an even split
+OPTIMAL_MAX_CELLS = 25_000_000  # lead x agent-slot matrix size beyond which "optimal" falls back to greedy
+
+def parse_embeddings(values: list, dim: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Stacks pgvector values (lists, or PostgREST's "[0.1,...]" text) into a float32 matrix.
+    Rows without an embedding are zero; the second array flags which rows had one.
+    """
+    parsed = [json.loads(v) if isinstance(v, str) else v for v in values]
+    dim = dim or next((len(v) for v in parsed if v), 1)
+    matrix = np.zeros((len(parsed), dim), dtype=np.float32)
+    present = np.zeros(len(parsed), dtype=bool)
+    for i, v in enumerate(parsed):
+        if v and len(v) == dim:
+            matrix[i] = v
+            present[i] = True
+    return matrix, present
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+def language_mask(lead_languages: list, agent_languages: list) -> np.ndarray:
+    """
+    bool[n_leads, n_agents]: the agent speaks the lead's preferred language. Leads without a
+    preference match every agent; leads whose language no agent speaks match none.
+    """
+    vocab = {}
+    for langs in agent_languages:
+        for lang in langs or []:
+            vocab.setdefault(lang.strip().lower(), len(vocab))
+    any_language, unspoken = len(vocab), len(vocab) + 1
+    speaks = np.zeros((len(vocab) + 2, len(agent_languages)), dtype=bool)
+    for j, langs in enumerate(agent_languages):
+        for lang in langs or []:
+            speaks[vocab[lang.strip().lower()], j] = True
+    speaks[any_language] = True
+    index = np.array([
+        vocab.get(lang.strip().lower(), unspoken) if lang and lang.strip() else any_language
+        for lang in lead_languages
+    ], dtype=np.int64)
+    return speaks[index]
+
+class DispatchResult:
+    """Per-lead outcome arrays of DispatchEngine.run (agent indices are -1 when unassigned)."""
+
+    def __init__(self, assigned, assigned_score, top_agent, top_score, second_score, language_ok, similarity):
+        self.assigned = assigned
+        self.assigned_score = assigned_score
+        self.top_agent = top_agent
+        self.top_score = top_score
+        self.second_score = second_score
+        self.language_ok = language_ok
+        self.similarity = similarity
+
+class DispatchEngine:
+    """
+    Batch lead -> agent matching.
+
+    All pairs are scored at once: cosine similarity of investor and agent embeddings
+    (one matrix multiply) blended with the agents' normalized performance_score. Agents
+    who do not speak the lead's preferred language are ineligible, unless no agent
+    speaks it. Each agent takes at most `capacity` leads.
+
+    Assignment is "greedy" (default: rounds in which every open lead proposes to its best
+    agent with room and agents keep their highest-scoring proposers; vectorized, so tens of
+    thousands of leads per second) or "optimal" (maximum total score via
+    scipy.optimize.linear_sum_assignment over capacity-replicated agents; needs the
+    `dispatch` extra and suits batches up to a few thousand leads).
+    """
+
+    def __init__(self, similarity_weight: float = SIMILARITY_WEIGHT, performance_weight: float = PERFORMANCE_WEIGHT):
+        self.similarity_weight = similarity_weight
+        self.performance_weight = performance_weight
+
+    def score(self, lead_embeddings: np.ndarray, agent_embeddings: np.ndarray, performance: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        similarity = normalize_rows(lead_embeddings) @ normalize_rows(agent_embeddings).T
+        performance = np.nan_to_num(np.asarray(performance, dtype=np.float32))
+        spread = performance.max() - performance.min() if performance.size else 0
+        perf_norm = (performance - performance.min()) / spread if spread > 0 else np.ones_like(performance)
+        return self.similarity_weight * similarity + self.performance_weight * perf_norm[None, :], similarity
+
+    def run(self, lead_embeddings: np.ndarray, agent_embeddings: np.ndarray, performance: np.ndarray,
+            lead_languages: list, agent_languages: list, capacity: int | np.ndarray | None = None,
+            method: str = "greedy") -> DispatchResult:
+        n_leads, n_agents = len(lead_embeddings), len(agent_embeddings)
+        if capacity is None:
+            capacity = math.ceil(n_leads / max(n_agents, 1) * CAPACITY_SLACK)
+        capacity = np.broadcast_to(np.asarray(capacity, dtype=np.int64), (n_agents,)).copy()
+
+        scores, similarity = self.score(lead_embeddings, agent_embeddings, performance)
+        eligible = language_mask(lead_languages, agent_languages)
+        # Leads whose language nobody speaks are matched on the other criteria alone
+        language_ok = eligible.any(axis=1)
+        eligible[~language_ok] = True
+        masked = np.where(eligible, scores, -np.inf).astype(np.float32)
+
+        if method == "optimal":
+            assigned = self._assign_optimal(masked, capacity)
+        else:
+            assigned = self._assign_greedy(masked, capacity)
+
+        rows = np.arange(n_leads)
+        top_agent = masked.argmax(axis=1)
+        top_score = masked[rows, top_agent]
+        if n_agents > 1:
+            second_score = -np.partition(-masked, 1, axis=1)[:, 1]
+        else:
+            second_score = np.full(n_leads, -np.inf, dtype=np.float32)
+        assigned_score = np.where(assigned >= 0, scores[rows, np.maximum(assigned, 0)], -np.inf)
+        return DispatchResult(assigned, assigned_score, top_agent, top_score, second_score, language_ok,
+                              similarity[rows, np.maximum(assigned, 0)])
+
+    @staticmethod
+    def _assign_greedy(masked: np.ndarray, capacity: np.ndarray) -> np.ndarray:
+        n_leads, n_agents = masked.shape
+        available = masked.copy()
+        remaining = capacity.copy()
+        available[:, remaining <= 0] = -np.inf
+        assigned = np.full(n_leads, -1, dtype=np.int64)
+        pending = np.arange(n_leads)
+
+        # Each round fills at least one agent or places every pending lead, so at most n_agents + 1 rounds
+        while pending.size:
+            choice = available[pending].argmax(axis=1)
+            best = available[pending, choice]
+            viable = np.isfinite(best)
+            pending, choice, best = pending[viable], choice[viable], best[viable]
+            if not pending.size:
+                break
+            # Group proposals by agent, best first; each agent keeps as many as it has room for
+            order = np.lexsort((-best, choice))
+            grouped = choice[order]
+            starts = np.searchsorted(grouped, grouped, side="left")
+            rank = np.arange(len(order)) - starts
+            accepted = order[rank < remaining[grouped]]
+            assigned[pending[accepted]] = choice[accepted]
+            remaining -= np.bincount(choice[accepted], minlength=n_agents)
+            available[:, remaining <= 0] = -np.inf
+            rejected = np.ones(len(pending), dtype=bool)
+            rejected[accepted] = False
+            pending = pending[rejected]
+        return assigned
+
+    def _assign_optimal(self, masked: np.ndarray, capacity: np.ndarray) -> np.ndarray:
+        try:
+            from scipy.optimize import linear_sum_assignment
+        except ImportError:
+            logger.warning("scipy is not installed (pip install '.[dispatch]'); using greedy matching")
+            return self._assign_greedy(masked, capacity)
+        slots = np.repeat(np.arange(masked.shape[1]), capacity)
+        if masked.shape[0] * len(slots) > OPTIMAL_MAX_CELLS:
+            logger.warning(f"{masked.shape[0]} leads x {len(slots)} agent slots is too large for optimal matching; using greedy")
+            return self._assign_greedy(masked, capacity)
+        cost = -masked[:, slots]
+        # Ineligible pairs get a cost no real assignment would choose
+        cost[~np.isfinite(cost)] = 1e6
+        rows, cols = linear_sum_assignment(cost)
+        assigned = np.full(masked.shape[0], -1, dtype=np.int64)
+        ok = cost[rows, cols] < 1e6
+        assigned[rows[ok]] = slots[cols[ok]]
+        return assigned
+
+def _percent(score: float) -> int:
+    return int(round(max(float(score), 0.0) * 100)) if np.isfinite(score) else 0
+
+def build_dispatch_logs(leads: list, agents: list, result: DispatchResult) -> list:
+    """ai_dispatch_logs rows for a DispatchEngine.run result; `assigned_agent` holds the agent's name."""
+    rows = []
+    for i, lead in enumerate(leads):
+        agent_index = int(result.assigned[i])
+        if agent_index < 0:
+            continue
+        agent, top = agents[agent_index], agents[int(result.top_agent[i])]
+        language = lead.get("preferred_language")
+        reasons = [f"profile similarity {result.similarity[i]:.2f}",
+                   f"performance score {agent.get('performance_score') or 0:g}"]
+        if language:
+            reasons.insert(0, f"speaks {language}" if result.language_ok[i] else f"no agent speaks {language}")
+        is_override = agent_index != int(result.top_agent[i])
+        if is_override:
+            reasons.append(f"{top.get('name')} scored higher but was at capacity")
+        persona = ", ".join(str(v) for v in (lead.get("occupation"), f"Age {lead['age']}" if lead.get("age") else None) if v)
+        reasoning = "; ".join(reasons)
+        rows.append({
+            "lead_name": lead.get("name"),
+            "lead_persona": persona or None,
+            "top_candidate": top.get("name"),
+            "math_score": _percent(result.assigned_score[i]),
+            "second_score": _percent(result.second_score[i]),
+            "is_override": is_override,
+            "reasoning": reasoning[0].upper() + reasoning[1:] + ".",
+            "admin_corrected": False,
+            "assigned_agent": agent.get("name"),
+        })
+    return rows
@@ -0,0 +1,309 @@
+import datetime
+import hashlib
+import json
+import logging
+import math
+import os
+import shutil
+import threading
+import time
+import numpy as np
+from app.core.config import settings
+from app.services.answer_bank import AnswerBank, build_answers, save_answers
+from app.services.listening_agent import FundFilters
+from app.services.quantized_index import QuantizedIndex, save_index
+
+logger = logging.getLogger(__name__)
+
+# Typed columns of comprehensive_mutual_funds_data.csv. Numbers are float32 with NaN for
+# missing or unparseable values ("-", ""); strings are dictionary-encoded (int32 codes
+# plus a JSON table of values).
+NUMERIC_COLUMNS = (
+    "min_sip", "min_lumpsum", "expense_ratio", "fund_size_cr", "fund_age_yr",
+    "sortino", "alpha", "sd", "beta", "sharpe", "risk_level", "rating",
+    "returns_1yr", "returns_3yr", "returns_5yr",
+)
+STRING_COLUMNS = ("scheme_name", "fund_manager", "amc_name", "category", "sub_category")
+INTEGER_COLUMNS = ("risk_level", "rating")  # stored as float32, returned as int
+MISSING = {"", "-", "na", "n/a", "nan", "null", "none"}
+CURRENT_FILE = "CURRENT"
+KEEP_VERSIONS = 3
+
+def parse_number(value) -> float:
+    """Float for a CSV cell, NaN when it is empty, a placeholder or not a number."""
+    if value is None:
+        return math.nan
+    text = str(value).strip().replace(",", "").rstrip("%")
+    if text.lower() in MISSING:
+        return math.nan
+    try:
+        return float(text)
+    except ValueError:
+        return math.nan
+
+def fund_text(row: dict) -> str:
+    """What a fund's embedding is computed from."""
+    return f"""
+        Fund Name: {row['scheme_name']}
+        Category: {row['category']} ({row['sub_category']})
+        Risk Level: {row['risk_level']}
+        AMC: {row['amc_name']}
+        Returns: 1Y: {row['returns_1yr']}%, 3Y: {row['returns_3yr']}%, 5Y: {row['returns_5yr']}%
+        Expense Ratio: {row['expense_ratio']}%
+        Min SIP: {row['min_sip']}
+        Rating: {row['rating']}
+        """
+
+def text_hash(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+
+def build_snapshot(rows: list, root: str, embed_documents, embedding_model: str, source: str = "",
+                   batch_size: int = 100, keep: int = KEEP_VERSIONS) -> str:
+    """
+    Compiles CSV rows into a new snapshot version under `root` and makes it current.
+    Embeddings of rows whose text is unchanged are copied from the current version, so
+    `embed_documents` (texts -> vectors) is only called for new or edited funds.
+
+    The version is written to a temporary directory, renamed into place and then
+    published by atomically replacing the CURRENT pointer. Returns the version.
+    """
+    os.makedirs(root, exist_ok=True)
+    texts = [fund_text(row) for row in rows]
+    hashes = np.array([text_hash(t) for t in texts], dtype=np.uint64)
+
+    reused = {}
+    previous = current_version(root)
+    if previous:
+        old = FundSnapshot(os.path.join(root, previous))
+        if old.manifest["embedding_model"] == embedding_model:
+            reused = {int(h): i for i, h in enumerate(old.text_hash)}
+    vectors = [None] * len(rows)
+    missing = []
+    for i, h in enumerate(hashes):
+        if int(h) in reused:
+            vectors[i] = np.asarray(old.embeddings[reused[int(h)]])
+        else:
+            missing.append(i)
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        for i, vector in zip(batch, embed_documents([texts[i] for i in batch])):
+            vectors[i] = np.asarray(vector, dtype=np.float32)
+    embeddings = np.stack(vectors).astype(np.float32) if rows else np.zeros((0, 0), dtype=np.float32)
+
+    digest = hashlib.sha256(embedding_model.encode())
+    digest.update(hashes.tobytes())
+    version = f"{datetime.datetime.now():%Y%m%dT%H%M%S}-{digest.hexdigest()[:10]}"
+    staging = os.path.join(root, f".{version}.tmp")
+    os.makedirs(staging)
+
+    unparsed = {}
+    for column in NUMERIC_COLUMNS:
+        values = np.array([parse_number(row.get(column)) for row in rows], dtype=np.float32)
+        unparsed[column] = int(sum(1 for row, v in zip(rows, values) if math.isnan(v) and str(row.get(column) or "").strip()))
+        np.save(os.path.join(staging, f"{column}.npy"), values)
+    for column in STRING_COLUMNS:
+        table, codes = {}, []
+        for row in rows:
+            codes.append(table.setdefault((row.get(column) or "").strip(), len(table)))
+        np.save(os.path.join(staging, f"{column}.codes.npy"), np.array(codes, dtype=np.int32))
+        with open(os.path.join(staging, f"{column}.values.json"), "w") as f:
+            json.dump(list(table), f)
+    # Unit float32 rows plus their int8 codes (see QuantizedIndex)
+    save_index(staging, "embeddings", embeddings)
+    np.save(os.path.join(staging, "text_hash.npy"), hashes)
+
+    manifest = {
+        "version": version,
+        "created_at": datetime.datetime.now().isoformat(),
+        "source": source,
+        "rows": len(rows),
+        "embedding_model": embedding_model,
+        "embedding_dim": int(embeddings.shape[1]) if rows else 0,
+        "embedded": len(missing),
+        "reused_embeddings": len(rows) - len(missing),
+        "unparsed": {k: v for k, v in unparsed.items() if v},
+    }
+    with open(os.path.join(staging, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    # Answers to the common per-fund questions, built from this version's data
+    answers = build_answers(FundSnapshot(staging))
+    save_answers(staging, answers)
+
+    if os.path.isdir(os.path.join(root, version)):
+        shutil.rmtree(staging)  # the same data was built within the same second
+    else:
+        os.rename(staging, os.path.join(root, version))
+    pointer = os.path.join(root, f".{CURRENT_FILE}.tmp")
+    with open(pointer, "w") as f:
+        f.write(version)
+    os.replace(pointer, os.path.join(root, CURRENT_FILE))
+    logger.info(f"Fund snapshot {version}: {len(rows)} funds, {len(missing)} embedded, "
+                f"{len(rows) - len(missing)} reused, {len(answers)} banked answers")
+
+    # Older versions stay readable by servers that haven't swapped yet; only the oldest go
+    versions = sorted(d for d in os.listdir(root) if not d.startswith(".") and os.path.isdir(os.path.join(root, d)))
+    for stale in versions[:-keep]:
+        shutil.rmtree(os.path.join(root, stale), ignore_errors=True)
+    return version
+
+def current_version(root: str) -> str | None:
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+class FundSnapshot:
+    """
+    One immutable snapshot version, memory-mapped. Searches return rows shaped like the
+    match_mutual_funds RPC (id, scheme_name, category, returns_1yr, metadata, similarity),
+    with `metadata` holding the typed row (None for unknown numbers), so fund_matches
+    and the prompt rendering treat both sources alike. `id` is the fund's 1-based row in
+    the CSV, the order seed_mutual_funds.py inserts them in. Similarity search scans
+    the int8 codes and rescores the best candidates exactly (see QuantizedIndex).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        self.version = self.manifest["version"]
+        self.rows = self.manifest["rows"]
+        load = lambda name: np.load(os.path.join(path, name), mmap_mode="r")
+        self.numbers = {column: load(f"{column}.npy") for column in NUMERIC_COLUMNS}
+        self.codes = {column: load(f"{column}.codes.npy") for column in STRING_COLUMNS}
+        self.values = {}
+        for column in STRING_COLUMNS:
+            with open(os.path.join(path, f"{column}.values.json")) as f:
+                self.values[column] = json.load(f)
+        self.index = QuantizedIndex(path, "embeddings")
+        self.embeddings = self.index.vectors
+        self.text_hash = load("text_hash.npy")
+        self._names_lower = None
+        self._answer_bank = None
+
+    @property
+    def answer_bank(self) -> AnswerBank:
+        if self._answer_bank is None:
+            self._answer_bank = AnswerBank(self)
+        return self._answer_bank
+
+    def string(self, column: str, i: int) -> str:
+        return self.values[column][self.codes[column][i]]
+
+    def row(self, i: int, similarity: float | None = None) -> dict:
+        metadata = {column: self.string(column, i) for column in STRING_COLUMNS}
+        for column in NUMERIC_COLUMNS:
+            value = float(self.numbers[column][i])
+            if math.isnan(value):
+                metadata[column] = None
+            else:
+                metadata[column] = int(value) if column in INTEGER_COLUMNS else round(value, 4)
+        row = {
+            "id": i + 1,
+            "scheme_name": metadata["scheme_name"],
+            "category": metadata["category"],
+            "returns_1yr": metadata["returns_1yr"],
+            "metadata": metadata,
+        }
+        if similarity is not None:
+            row["similarity"] = similarity
+        return row
+
+    def _string_mask(self, column: str, wanted: str) -> np.ndarray:
+        hits = np.array([wanted in value.lower() or not value for value in self.values[column]], dtype=bool)
+        return hits[self.codes[column]] if len(hits) else np.zeros(self.rows, dtype=bool)
+
+    def filter_mask(self, filters: FundFilters | None) -> np.ndarray:
+        """Rows passing `filters`, with the same rules as fund_matches (unknown values never exclude)."""
+        mask = np.ones(self.rows, dtype=bool)
+        if filters is None:
+            return mask
+        if filters.category:
+            mask &= self._string_mask("category", filters.category.lower())
+        if filters.sub_category:
+            wanted = filters.sub_category.lower().replace("mutual funds", "").strip()
+            if wanted:
+                mask &= self._string_mask("sub_category", wanted)
+        checks = (
+            (filters.max_risk_level, "risk_level", np.less_equal),
+            (filters.min_returns_1yr, "returns_1yr", np.greater_equal),
+            (filters.max_expense_ratio, "expense_ratio", np.less_equal),
+            (filters.max_min_sip, "min_sip", np.less_equal),
+        )
+        for limit, column, ok in checks:
+            if limit is not None:
+                values = self.numbers[column]
+                mask &= np.isnan(values) | ok(values, limit)
+        return mask
+
+    def search(self, query_embedding, filters: FundFilters | None = None, threshold: float = 0.3, count: int = 5) -> list:
+        """Top `count` funds by cosine similarity above `threshold`, filtered before ranking."""
+        if not self.rows:
+            return []
+        ids, scores = self.index.search(query_embedding, count, self.filter_mask(filters))
+        return [self.row(int(i), round(float(score), 4)) for i, score in zip(ids, scores) if score > threshold]
+
+    def find_by_name(self, names: list, limit: int = 5) -> list:
+        """Case-insensitive substring match on scheme names, like the ilike lookup it replaces."""
+        if self._names_lower is None:
+            self._names_lower = [name.lower() for name in self.values["scheme_name"]]
+        found = []
+        for pattern in (" ".join(n.lower().split()) for n in names):
+            if not pattern:
+                continue
+            for code, name in enumerate(self._names_lower):
+                if pattern in name:
+                    found.extend(int(i) for i in np.flatnonzero(self.codes["scheme_name"] == code))
+        return [self.row(i) for i in dict.fromkeys(found)][:limit]
+
+class FundSnapshotStore:
+    """
+    The current snapshot under `root`, swapped for a newer one when the CURRENT pointer
+    changes. The pointer is checked at most every `check_seconds` on access; the new
+    version is fully opened before the reference is replaced, and callers that already
+    hold the old FundSnapshot keep using its (still mapped) arrays until they finish.
+    """
+
+    def __init__(self, root: str, check_seconds: float = 10.0):
+        self.root = root
+        self.check_seconds = check_seconds
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self) -> FundSnapshot | None:
+        if time.monotonic() - self._checked_at >= self.check_seconds:
+            self.reload()
+        return self._snapshot
+
+    def reload(self) -> bool:
+        """Swaps to the version CURRENT names if it is new; True when a swap happened."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            version = current_version(self.root)
+            if version is None or (self._snapshot is not None and self._snapshot.version == version):
+                return False
+            try:
+                snapshot = FundSnapshot(os.path.join(self.root, version))
+            except Exception as e:
+                logger.error(f"Fund snapshot {version} could not be loaded, keeping {self.version}: {e}")
+                return False
+            previous, self._snapshot = self.version, snapshot
+        logger.info(f"Fund snapshot swapped {previous} -> {version} ({snapshot.rows} funds)")
+        return True
+
+    @property
+    def version(self) -> str | None:
+        return self._snapshot.version if self._snapshot is not None else None
+
+_fund_snapshots = None
+
+def get_fund_snapshot() -> FundSnapshot | None:
+    """The current snapshot when FUND_SNAPSHOT_DIR is set, else None (funds come from Supabase)."""
+    global _fund_snapshots
+    if not settings.FUND_SNAPSHOT_DIR:
+        return None
+    if _fund_snapshots is None or _fund_snapshots.root != settings.FUND_SNAPSHOT_DIR:
+        _fund_snapshots = FundSnapshotStore(settings.FUND_SNAPSHOT_DIR, settings.FUND_SNAPSHOT_RELOAD_SECONDS)
+    return _fund_snapshots.get()
@@ -0,0 +1,128 @@
+import asyncio
+import json
+import logging
+from app.core.clients import get_supabase
+from app.core.metrics import rag_stage
+from app.core.session_store import get_session_store
+from app.services.fund_snapshot import get_fund_snapshot
+from app.services.listening_agent import FundFilters, fund_matches
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FIELDS = (
+    "investor_id", "name", "age", "city", "occupation", "risk_appetite", "sip_capacity",
+    "preferred_language", "tier", "monthly_income_est", "ai_analysis_cache",
+)
+SHORTLIST_CANDIDATES = 20
+SHORTLIST_SIZE = 8
+PRIOR_CALLS = 3  # summaries of the most recent earlier calls kept on the session
+
+# investors.risk_appetite -> highest fund risk_level (1-6) to suggest
+RISK_CEILINGS = {"low": 3, "conservative": 3, "medium": 5, "moderate": 5, "high": 6, "aggressive": 6}
+
+def profile_filters(profile: dict | None) -> FundFilters:
+    """Retrieval constraints implied by the Lead's profile."""
+    if not profile:
+        return FundFilters()
+    risk = RISK_CEILINGS.get(str(profile.get("risk_appetite") or "").strip().lower())
+    sip = profile.get("sip_capacity")
+    return FundFilters(max_risk_level=risk if risk and risk < 6 else None, max_min_sip=sip or None)
+
+def merge_filters(stated: FundFilters, defaults: FundFilters) -> FundFilters:
+    """The Lead's stated constraints win; the profile fills whatever they left open."""
+    return FundFilters(**{
+        field: value if value is not None else getattr(defaults, field)
+        for field, value in stated.model_dump().items()
+    })
+
+def describe_profile(context: dict | None) -> str:
+    """One or two prompt lines about the Lead, built from the bootstrap context."""
+    profile = (context or {}).get("profile")
+    if not profile:
+        return ""
+    who = ", ".join(str(v) for v in (profile.get("name"), profile.get("age"), profile.get("occupation"), profile.get("city")) if v)
+    traits = [
+        f"risk appetite {profile['risk_appetite']}" if profile.get("risk_appetite") else None,
+        f"SIP capacity Rs {profile['sip_capacity']}/month" if profile.get("sip_capacity") else None,
+        f"tier {profile['tier']}" if profile.get("tier") else None,
+        f"prefers {profile['preferred_language']}" if profile.get("preferred_language") else None,
+    ]
+    text = f"{who}; " + "; ".join(t for t in traits if t)
+    prior = context.get("prior_calls") or []
+    if prior:
+        text += "\nPrevious calls: " + " | ".join(prior)
+    return text
+
+def _parse_vector(value) -> list | None:
+    # PostgREST returns pgvector columns as their text form, "[0.1,0.2,...]"
+    if isinstance(value, str):
+        value = json.loads(value)
+    return value or None
+
+class LeadContextService:
+    """
+    Session bootstrap: when a call connects, loads the Lead's investor profile and dispatch
+    log in parallel, derives a personalized fund shortlist from the investor embedding,
+    and keeps it on the session ("lead_context") for the assist pipeline.
+    """
+
+    def __init__(self):
+        self.supabase = get_supabase()
+
+    def fetch_investor(self, lead_name: str) -> dict | None:
+        response = self.supabase.table("investors")\
+            .select(", ".join(PROFILE_FIELDS + ("embedding", "chat_history")))\
+            .eq("name", lead_name)\
+            .limit(1)\
+            .execute()
+        return response.data[0] if response.data else None
+
+    def fetch_dispatch_log(self, lead_id: str) -> dict | None:
+        response = self.supabase.table("ai_dispatch_logs")\
+            .select("*")\
+            .eq("id", lead_id)\
+            .limit(1)\
+            .execute()
+        return response.data[0] if response.data else None
+
+    def fetch_shortlist(self, embedding: list, filters: FundFilters) -> list:
+        snapshot = get_fund_snapshot()
+        if snapshot is not None:
+            return snapshot.search(embedding, filters, threshold=0.0, count=SHORTLIST_SIZE)
+        response = self.supabase.rpc(
+            "match_mutual_funds",
+            {
+                "query_embedding": embedding,
+                "match_threshold": 0.0,  # ranking, not a relevance cut
+                "match_count": SHORTLIST_CANDIDATES
+            }
+        ).execute()
+        return [fund for fund in response.data if fund_matches(fund, filters)][:SHORTLIST_SIZE]
+
+    async def bootstrap(self, session_id: str, lead_id: str | None, lead_name: str | None) -> dict:
+        with rag_stage("bootstrap"):
+            investor, dispatch = await asyncio.gather(
+                asyncio.to_thread(self.fetch_investor, lead_name) if lead_name else asyncio.sleep(0),
+                asyncio.to_thread(self.fetch_dispatch_log, lead_id) if lead_id else asyncio.sleep(0),
+            )
+            # Dashboards sometimes open a call with only the dispatch id
+            if investor is None and dispatch and dispatch.get("lead_name") and dispatch["lead_name"] != lead_name:
+                investor = await asyncio.to_thread(self.fetch_investor, dispatch["lead_name"])
+
+            profile = {k: investor.get(k) for k in PROFILE_FIELDS} if investor else None
+            shortlist = []
+            embedding = _parse_vector(investor.get("embedding")) if investor else None
+            if embedding:
+                shortlist = await asyncio.to_thread(self.fetch_shortlist, embedding, profile_filters(profile))
+
+        history = (investor or {}).get("chat_history") or (dispatch or {}).get("chat_history") or []
+        context = {
+            "profile": profile,
+            "dispatch": {k: v for k, v in (dispatch or {}).items() if k != "chat_history"} or None,
+            "prior_calls": [h.get("summary") for h in history[-PRIOR_CALLS:] if isinstance(h, dict) and h.get("summary")],
+            "fund_shortlist": shortlist,
+        }
+        await get_session_store().update_session(session_id, {"lead_context": context})
+        logger.info(f"Lead context for {session_id}: profile={'yes' if profile else 'no'}, "
+                    f"{len(shortlist)} shortlisted funds, {len(context['prior_calls'])} prior calls")
+        return context
@@ -0,0 +1,185 @@
+import json
+import logging
+import re
+from typing import Literal
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+logger = logging.getLogger(__name__)
+
+IntentType = Literal["recommendation", "information", "comparison", "objection", "none"]
+
+# Labels the model tends to use instead of ours
+INTENT_ALIASES = {
+    "goal": "recommendation",
+    "need": "recommendation",
+    "goal/need": "recommendation",
+    "suggestion": "recommendation",
+    "info": "information",
+    "details": "information",
+    "compare": "comparison",
+    "concern": "objection",
+    "objection/concern": "objection",
+    "no_intent": "none",
+    "small_talk": "none",
+}
+
+class FundFilters(BaseModel):
+    """Constraints the Lead stated, applied to fund retrieval."""
+    category: str | None = None        # e.g. "Equity", "Debt", "Hybrid"
+    sub_category: str | None = None    # e.g. "Mid Cap Mutual Funds", "ELSS Mutual Funds"
+    max_risk_level: int | None = Field(default=None, ge=1, le=6)
+    min_returns_1yr: float | None = None
+    max_expense_ratio: float | None = None
+    max_min_sip: float | None = None   # Lead's monthly SIP budget
+
+class ListeningResult(BaseModel):
+    """Output of the single "listening agent" call that gates and shapes retrieval."""
+    trigger_valid: bool | None = None  # None when no trigger word was given
+    intent_type: IntentType = "none"
+    search_query: str | None = None
+    mentioned_funds: list[str] = []
+    filters: FundFilters = FundFilters()
+
+    @field_validator("intent_type", mode="before")
+    @classmethod
+    def normalize_intent(cls, value):
+        if not isinstance(value, str):
+            return "none"
+        value = value.strip().lower()
+        value = INTENT_ALIASES.get(value, value)
+        return value if value in ("recommendation", "information", "comparison", "objection", "none") else "information"
+
+    @field_validator("trigger_valid", mode="before")
+    @classmethod
+    def coerce_yes_no(cls, value):
+        if isinstance(value, str):
+            return value.strip().lower() in ("yes", "true", "valid", "1")
+        return value
+
+    @field_validator("search_query", mode="before")
+    @classmethod
+    def blank_query(cls, value):
+        if isinstance(value, str) and (not value.strip() or "NO_INTENT" in value.upper()):
+            return None
+        return value
+
+    @field_validator("mentioned_funds", mode="before")
+    @classmethod
+    def funds_list(cls, value):
+        if value is None:
+            return []
+        if isinstance(value, str):
+            return [v.strip() for v in value.split(",") if v.strip()]
+        return value
+
+    @field_validator("filters", mode="before")
+    @classmethod
+    def filters_object(cls, value):
+        return value if isinstance(value, dict) else {}
+
+    @property
+    def has_intent(self) -> bool:
+        return self.intent_type != "none" and bool(self.search_query)
+
+def build_listening_prompt(history: str, trigger_word: str | None) -> str:
+    trigger_section = f"""
+        The Agent just said the trigger phrase: "{trigger_word}".
+        Set "trigger_valid" to true only if the Agent is using it to look up information for the Lead
+        (e.g. "Let me check that fund for you", "Let me check the returns"), and false otherwise
+        (e.g. "Let me check the time", "Let me check my email").
+        """ if trigger_word else """
+        No trigger phrase was given; set "trigger_valid" to null.
+        """
+
+    return f"""
+        You are a smart "Listening Agent" for a financial sales call.
+        Analyze the transcript and gauge the potential client's (Lead) INTENT from the RECENT turns.
+        {trigger_section}
+        Intent types:
+        - "recommendation": wants a suggestion, or states a goal/need (treat "I want to save for X" as a request for funds for X)
+        - "information": wants details about a specific fund or policy
+        - "comparison": wants to compare options
+        - "objection": expresses a worry that needs addressing (safety, fees, lock-in)
+        - "none": small talk, greetings, acknowledgements
+
+        Return ONLY a JSON object with exactly these keys:
+        {{
+          "trigger_valid": true | false | null,
+          "intent_type": "recommendation" | "information" | "comparison" | "objection" | "none",
+          "search_query": concise search query capturing the core need, or null when intent_type is "none",
+          "mentioned_funds": [fund names exactly as spoken],
+          "filters": {{
+            "category": "Equity" | "Debt" | "Hybrid" | "Other" | null,
+            "sub_category": e.g. "Mid Cap Mutual Funds", "ELSS Mutual Funds" or null,
+            "max_risk_level": 1-6 (1 = lowest risk) or null,
+            "min_returns_1yr": number or null,
+            "max_expense_ratio": number or null,
+            "max_min_sip": the Lead's monthly SIP budget in rupees or null
+          }}
+        }}
+
+        Transcript (most recent turns):
+        {history}
+        """
+
+def parse_listening_result(raw: str, trigger_word: str | None = None) -> ListeningResult:
+    """
+    Validates the model output against ListeningResult. Falls back to the first JSON object
+    embedded in the text, then to reading the old plain-text answers ("YES"/"NO", a bare
+    query or "NO_INTENT"), so a chatty or malformed reply still yields a usable result.
+    """
+    try:
+        return ListeningResult.model_validate_json(raw)
+    except ValidationError:
+        pass
+
+    match = re.search(r"\{.*\}", raw, re.DOTALL)
+    if match:
+        try:
+            return ListeningResult.model_validate(json.loads(match.group(0)))
+        except (ValueError, ValidationError):
+            pass
+
+    logger.warning(f"Listening agent returned non-JSON output, using fallback parser: {raw[:200]!r}")
+    text = raw.strip()
+    upper = text.upper()
+    trigger_valid = None
+    if trigger_word:
+        trigger_valid = bool(re.search(r"\b(YES|TRUE|VALID)\b", upper)) and not re.search(r"\b(NO|FALSE|INVALID)\b", upper)
+    if "NO_INTENT" in upper or not text:
+        return ListeningResult(trigger_valid=trigger_valid)
+
+    query = re.sub(r"^(YES|NO)\b[\s.:,-]*", "", text, flags=re.IGNORECASE).strip().strip('"')
+    if not query:
+        return ListeningResult(trigger_valid=trigger_valid)
+    return ListeningResult(trigger_valid=trigger_valid, intent_type="information", search_query=query.splitlines()[0])
+
+def _number(value) -> float | None:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def fund_matches(fund: dict, filters: FundFilters) -> bool:
+    """
+    Applies FundFilters to a match_mutual_funds row. The RPC only returns a few typed columns,
+    so risk, expense ratio, SIP and sub-category come from the raw CSV row kept in `metadata`.
+    Unknown values never exclude a fund.
+    """
+    meta = fund.get("metadata") or {}
+    category = fund.get("category") or meta.get("category") or ""
+    if filters.category and category and filters.category.lower() not in category.lower():
+        return False
+    sub_category = meta.get("sub_category") or ""
+    if filters.sub_category and sub_category:
+        wanted = filters.sub_category.lower().replace("mutual funds", "").strip()
+        if wanted and wanted not in sub_category.lower():
+            return False
+
+    checks = (
+        (filters.max_risk_level, _number(meta.get("risk_level")), lambda limit, v: v <= limit),
+        (filters.min_returns_1yr, _number(fund.get("returns_1yr", meta.get("returns_1yr"))), lambda limit, v: v >= limit),
+        (filters.max_expense_ratio, _number(meta.get("expense_ratio")), lambda limit, v: v <= limit),
+        (filters.max_min_sip, _number(meta.get("min_sip")), lambda limit, v: v <= limit),
+    )
+    return all(limit is None or value is None or ok(limit, value) for limit, value, ok in checks)
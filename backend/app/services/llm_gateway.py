@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from app.core.config import settings
+from app.core.metrics import LLM_HEDGES, LLM_REQUESTS, LLM_SECONDS
+from app.core.session_recorder import prompt_key, record, template_key
+from app.services.llm_scheduler import LLMScheduler, get_llm_scheduler
+from app.services.prompt_builder import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Whole-call deadline (seconds) per stage, across hedges and fallbacks
+STAGE_DEADLINES = {
+    "listen": 3.0,
+    "answer": 8.0,
+    "rolling_summary": 15.0,
+    "summary": 30.0,
+    "report": 30.0,
+}
+DEFAULT_DEADLINE = 10.0
+
+LATENCY_WINDOW = 200  # recent latencies kept per provider and stage
+HEDGE_MIN_SAMPLES = 20  # below this the hedge fires at HEDGE_DEFAULT_FRACTION of the deadline
+HEDGE_DEFAULT_FRACTION = 0.5
+DEFAULT_COMPLETION_TOKENS = 300  # completion size charged to the scheduler when max_tokens is unset
+
+class LLMUnavailable(Exception):
+    """No provider produced a completion before the stage deadline."""
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls for
+    `reset_timeout` seconds, then lets a single probe through (half-open): its success
+    closes the breaker, its failure re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+
+    def release(self):
+        """A call was abandoned (lost a hedge race) without an outcome."""
+        self._probing = False
+
+class LLMProvider:
+    """An OpenAI-compatible chat endpoint with its own breaker and latency history."""
+
+    def __init__(self, name: str, base_url: str, api_key: str, model: str, breaker: CircuitBreaker | None = None):
+        self.name = name
+        self.model = model
+        from openai import AsyncOpenAI
+        # The gateway owns deadlines and retries
+        self.client = AsyncOpenAI(base_url=base_url, api_key=api_key, max_retries=0, timeout=max(STAGE_DEADLINES.values()))
+        self.breaker = breaker or CircuitBreaker(settings.LLM_BREAKER_FAILURES, settings.LLM_BREAKER_RESET_SECONDS)
+        self.latencies = {}
+
+    def observe(self, stage: str, seconds: float):
+        self.latencies.setdefault(stage, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def p95(self, stage: str) -> float | None:
+        samples = self.latencies.get(stage)
+        if not samples or len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+class LLMGateway:
+    """
+    Chat completions across providers in priority order, with:
+    - a deadline per call (STAGE_DEADLINES), raising LLMUnavailable when it passes
+    - a hedged second request once the first has run longer than that provider's p95,
+      sent to the next provider (or the same one when it is the only one available)
+    - immediate fail-over to the next provider when a request errors
+    - per-provider circuit breakers so a failing provider is skipped until it recovers
+    Calls first wait for an LLMScheduler slot (when one is given); queueing counts against the deadline.
+    Every request sent, hedges and fail-overs included, is charged to the scheduler's quotas.
+    """
+
+    def __init__(self, providers: list, hedge: bool = True, scheduler: LLMScheduler | None = None):
+        self.providers = providers
+        self.hedge = hedge
+        self.scheduler = scheduler
+
+    def hedge_delay(self, provider: LLMProvider, stage: str, deadline: float) -> float:
+        p95 = provider.p95(stage)
+        delay = p95 if p95 is not None else deadline * HEDGE_DEFAULT_FRACTION
+        return min(max(delay, 0.05), deadline * 0.8)
+
+    def _pick(self, tried: list, hedge: bool = False) -> LLMProvider | None:
+        for provider in self.providers:
+            if provider not in tried and provider.breaker.allow():
+                return provider
+        # A hedge may duplicate a request on a healthy provider
+        if hedge and tried and tried[0].breaker.state == "closed":
+            return tried[0]
+        return None
+
+    async def _call(self, provider: LLMProvider, stage: str, request: dict) -> str:
+        start = time.perf_counter()
+        try:
+            response = await provider.client.chat.completions.create(model=provider.model, **request)
+        except asyncio.CancelledError:
+            provider.breaker.release()
+            raise
+        except Exception as e:
+            provider.breaker.record_failure()
+            LLM_REQUESTS.labels(provider=provider.name, outcome="error").inc()
+            logger.warning(f"LLM {provider.name} failed for {stage}: {e}")
+            raise
+        elapsed = time.perf_counter() - start
+        provider.breaker.record_success()
+        provider.observe(stage, elapsed)
+        LLM_REQUESTS.labels(provider=provider.name, outcome="success").inc()
+        LLM_SECONDS.labels(provider=provider.name, stage=stage).observe(elapsed)
+        return (response.choices[0].message.content or "").strip()
+
+    async def complete(self, prompt: str, stage: str, temperature: float = 0.0, max_tokens: int | None = None,
+                       json_mode: bool = False, deadline: float | None = None, agent: str | None = None) -> str:
+        """`agent` keys fair queueing in the scheduler (the call's agent name)."""
+        deadline = deadline or STAGE_DEADLINES.get(stage, DEFAULT_DEADLINE)
+        request = {"messages": [{"role": "user", "content": prompt}], "temperature": temperature}
+        if max_tokens:
+            request["max_tokens"] = max_tokens
+        if json_mode:
+            request["response_format"] = {"type": "json_object"}
+
+        cost = count_tokens(prompt) + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+        loop = asyncio.get_running_loop()
+        tried, running, errors = [], {}, []
+        timed_out = False
+
+        def launch(hedge: bool = False) -> bool:
+            provider = self._pick(tried, hedge)
+            if provider is None:
+                return False
+            if tried and self.scheduler is not None:
+                # The slot paid for the first request; each hedge or fail-over is charged too
+                self.scheduler.charge(cost)
+            tried.append(provider)
+            running[asyncio.create_task(self._call(provider, stage, request))] = provider
+            return True
+
+        try:
+            async with asyncio.timeout(deadline), self._admit(stage, agent, cost):
+                started = loop.time()
+                if not launch():
+                    raise LLMUnavailable(f"No LLM provider available for {stage} (all circuits open)")
+                hedge_at = started + self.hedge_delay(tried[0], stage, deadline)
+                hedged = not self.hedge
+                while running:
+                    wait = None if hedged else max(0.0, hedge_at - loop.time())
+                    done, _ = await asyncio.wait(running, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        hedged = True
+                        if launch(hedge=True):
+                            LLM_HEDGES.labels(stage=stage).inc()
+                        continue
+                    for task in done:
+                        running.pop(task)
+                        if task.exception() is None:
+                            record("llm", {"stage": stage, "prompt": prompt_key(prompt), "template": template_key(prompt),
+                                           "response": task.result(), "seconds": round(loop.time() - started, 4)})
+                            return task.result()
+                        errors.append(task.exception())
+                    if not running:
+                        # Fail over; a fallback launched this way replaces the hedge
+                        hedged = True
+                        launch()
+        except TimeoutError:
+            timed_out = True
+        finally:
+            for task, provider in running.items():
+                task.cancel()
+                if timed_out:
+                    provider.breaker.record_failure()
+                    LLM_REQUESTS.labels(provider=provider.name, outcome="timeout").inc()
+
+        if timed_out:
+            raise LLMUnavailable(f"LLM {stage} exceeded its {deadline}s deadline{'' if tried else ' waiting for a slot'}")
+        raise LLMUnavailable(f"All LLM providers failed for {stage}: {errors[-1] if errors else 'none available'}")
+
+    @asynccontextmanager
+    async def _admit(self, stage: str, agent: str | None, tokens: int):
+        if self.scheduler is None:
+            yield
+            return
+        # One slot (one unit of concurrency) covers the call, including any hedge or fail-over
+        async with self.scheduler.slot(stage, agent, tokens):
+            yield
+
+def build_providers() -> list:
+    providers = [LLMProvider("groq", f"{settings.GROQ_BASE_URL}/openai/v1", settings.GROQ_API_KEY, settings.LLM_MODEL)]
+    if settings.LLM_FALLBACK_BASE_URL:
+        providers.append(LLMProvider(
+            "fallback",
+            settings.LLM_FALLBACK_BASE_URL,
+            settings.LLM_FALLBACK_API_KEY or settings.OPENROUTER_EMBEDDING_KEY,
+            settings.LLM_FALLBACK_MODEL,
+        ))
+    return providers
+
+_gateway = None
+
+def get_llm_gateway() -> LLMGateway:
+    """Process-wide gateway, so breakers and latency history are shared by every request."""
+    global _gateway
+    if _gateway is None:
+        _gateway = LLMGateway(build_providers(), hedge=settings.LLM_HEDGE, scheduler=get_llm_scheduler())
+    return _gateway
@@ -0,0 +1,183 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from app.core.config import settings
+from app.core.metrics import LLM_QUEUE_DEPTH, LLM_QUEUE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first. Live assists must not wait behind hang-up work.
+LIVE, BACKGROUND, BATCH = 0, 1, 2
+PRIORITY_NAMES = ("live", "background", "batch")
+STAGE_PRIORITY = {
+    "listen": LIVE,
+    "answer": LIVE,
+    "rolling_summary": BACKGROUND,
+    "summary": BATCH,
+    "report": BATCH,
+}
+
+class TokenBucket:
+    """`rate_per_minute` units refilled continuously, bursting up to one minute's worth."""
+
+    def __init__(self, rate_per_minute: float, clock=time.monotonic):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.clock = clock
+        self.level = rate_per_minute
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 if it is now). Oversized requests wait for a full bucket."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+class _Waiter:
+    __slots__ = ("future", "tokens", "priority", "enqueued")
+
+    def __init__(self, future: asyncio.Future, tokens: int, priority: int):
+        self.future = future
+        self.tokens = tokens
+        self.priority = priority
+        self.enqueued = time.perf_counter()
+
+class LLMScheduler:
+    """
+    Admission control for LLM calls in this process.
+
+    A call waits for a slot: at most `max_concurrency` in flight, and both the
+    requests-per-minute and tokens-per-minute buckets must cover it. Waiting calls are
+    served by priority class (STAGE_PRIORITY), and within a class round-robin across
+    agents, so one agent's burst of hang-ups cannot monopolise the quota.
+    A limit of 0 disables that check.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, max_concurrency: int = 0, clock=time.monotonic):
+        self.requests = TokenBucket(rpm, clock) if rpm else None
+        self.tokens = TokenBucket(tpm, clock) if tpm else None
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        # Per priority: agent -> FIFO of waiters, and the agents' round-robin order
+        self._queues = [{} for _ in PRIORITY_NAMES]
+        self._rotation = [deque() for _ in PRIORITY_NAMES]
+        self._timer = None
+
+    def queued(self, priority: int | None = None) -> int:
+        classes = range(len(PRIORITY_NAMES)) if priority is None else [priority]
+        return sum(len(q) for p in classes for q in self._queues[p].values())
+
+    @asynccontextmanager
+    async def slot(self, stage: str, agent: str | None = None, tokens: int = 0):
+        """Holds an admission slot for one LLM call; `tokens` is its estimated prompt + completion size."""
+        priority = STAGE_PRIORITY.get(stage, BATCH)
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), tokens, priority)
+        key = agent or "_anonymous"
+        queue = self._queues[priority].setdefault(key, deque())
+        if not queue:
+            self._rotation[priority].append(key)
+        queue.append(waiter)
+        LLM_QUEUE_DEPTH.labels(priority=PRIORITY_NAMES[priority]).inc()
+        self._dispatch()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            # Deadline hit while queued; hand back a slot granted in the meantime
+            if waiter.future.done() and not waiter.future.cancelled():
+                self._release()
+            raise
+        finally:
+            LLM_QUEUE_SECONDS.labels(priority=PRIORITY_NAMES[priority]).observe(time.perf_counter() - waiter.enqueued)
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    def charge(self, tokens: int = 0):
+        """
+        Counts a further request sent under a held slot (a hedge or fail-over) against the
+        quotas. It goes out at once; the buckets run into debt and later waiters pay for it.
+        """
+        if self.requests:
+            self.requests.take(1)
+        if self.tokens:
+            self.tokens.take(tokens)
+
+    def _release(self):
+        self.in_flight -= 1
+        self._dispatch()
+
+    def _next_waiter(self) -> _Waiter | None:
+        """Head of the queue that is served next, dropping abandoned waiters."""
+        for priority, rotation in enumerate(self._rotation):
+            queues = self._queues[priority]
+            while rotation:
+                key = rotation[0]
+                queue = queues[key]
+                while queue and queue[0].future.done():
+                    queue.popleft()
+                    LLM_QUEUE_DEPTH.labels(priority=PRIORITY_NAMES[priority]).dec()
+                if queue:
+                    return queue[0]
+                rotation.popleft()
+                del queues[key]
+        return None
+
+    def _pop(self, waiter: _Waiter):
+        rotation = self._rotation[waiter.priority]
+        key = rotation.popleft()
+        queue = self._queues[waiter.priority][key]
+        queue.popleft()
+        LLM_QUEUE_DEPTH.labels(priority=PRIORITY_NAMES[waiter.priority]).dec()
+        # The agent goes to the back of its class
+        if queue:
+            rotation.append(key)
+        else:
+            del self._queues[waiter.priority][key]
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while True:
+            if self.max_concurrency and self.in_flight >= self.max_concurrency:
+                return  # the next release dispatches
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            wait = max(
+                self.requests.wait_time(1) if self.requests else 0.0,
+                self.tokens.wait_time(waiter.tokens) if self.tokens else 0.0,
+            )
+            if wait > 0:
+                # Strict priority: lower classes do not jump ahead while the head is rate-limited
+                self._timer = asyncio.get_running_loop().call_later(wait, self._dispatch)
+                return
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(waiter.tokens)
+            self._pop(waiter)
+            self.in_flight += 1
+            waiter.future.set_result(None)
+
+_scheduler = None
+
+def get_llm_scheduler() -> LLMScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler(settings.LLM_RATE_LIMIT_RPM, settings.LLM_RATE_LIMIT_TPM, settings.LLM_MAX_CONCURRENCY)
+    return _scheduler
@@ -0,0 +1,179 @@
+import asyncio
+import importlib.util
+import json
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from app.core.config import settings
+from app.services.stt_service import STTProvider, transcript_message
+from app.services.vad_service import EnergyVAD
+
+logger = logging.getLogger(__name__)
+
+# Python package each engine needs; both are optional installs (see the "local-stt" extra)
+ENGINE_PACKAGES = {
+    "faster-whisper": "faster_whisper",
+    "vosk": "vosk",
+}
+
+# --- Worker process side -------------------------------------------------------------
+# The model is loaded once per pool process by the initializer and reused for every segment.
+
+_engine = None
+_model = None
+
+def _init_worker(engine: str, model_name: str, compute_type: str, cpu_threads: int):
+    global _engine, _model
+    _engine = engine
+    if engine == "faster-whisper":
+        from faster_whisper import WhisperModel
+        _model = WhisperModel(model_name, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+    elif engine == "vosk":
+        from vosk import Model, SetLogLevel
+        SetLogLevel(-1)
+        _model = Model(model_name)
+    else:
+        raise ValueError(f"Unknown local STT engine: {engine}")
+
+def transcribe_pcm(pcm: bytes, language: str, sample_rate: int = 16000) -> str:
+    """Transcribes one 16-bit mono PCM segment inside a pool worker."""
+    if _engine == "vosk":
+        from vosk import KaldiRecognizer
+        recognizer = KaldiRecognizer(_model, sample_rate)
+        recognizer.AcceptWaveform(pcm)
+        return json.loads(recognizer.FinalResult()).get("text", "")
+
+    audio = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+    segments, _ = _model.transcribe(
+        audio,
+        language=language,
+        beam_size=1,
+        vad_filter=False,  # segments are already cut by EnergyVAD
+        condition_on_previous_text=False
+    )
+    return " ".join(segment.text.strip() for segment in segments).strip()
+
+# --- Server side ------------------------------------------------------------------
+
+_pool = None
+
+def get_pool() -> ProcessPoolExecutor:
+    """Process-wide pool shared by every session; created on first use."""
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.LOCAL_STT_WORKERS,
+            # spawn: don't fork the event loop and open sockets into the workers
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(settings.LOCAL_STT_ENGINE, settings.LOCAL_STT_MODEL, settings.LOCAL_STT_COMPUTE_TYPE, settings.LOCAL_STT_CPU_THREADS)
+        )
+    return _pool
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+class LocalSTTService(STTProvider):
+    """
+    On-prem streaming transcription. EnergyVAD cuts the incoming PCM into utterances;
+    each finished utterance is transcribed in the process pool and sent as a final
+    result, and utterances still in progress get an interim result every
+    LOCAL_STT_INTERIM_MS. There is no diarization, so `speaker` is always None.
+    """
+
+    def __init__(self, sample_rate: int = 16000):
+        self.sample_rate = sample_rate
+        self.vad = EnergyVAD(sample_rate=sample_rate)
+        self.interim_bytes = sample_rate * 2 * settings.LOCAL_STT_INTERIM_MS // 1000
+        self.max_segment_bytes = sample_rate * 2 * settings.LOCAL_STT_MAX_SEGMENT_MS // 1000
+        self.min_segment_bytes = sample_rate * 2 * 200 // 1000
+
+    async def _transcribe(self, pcm: bytes, language: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_pool(), transcribe_pcm, pcm, language, self.sample_rate)
+
+    async def start_transcription(self, websocket_client, language="en", audio_format=None):
+        engine = settings.LOCAL_STT_ENGINE
+        package = ENGINE_PACKAGES.get(engine)
+        if package is None or importlib.util.find_spec(package) is None:
+            logger.error(f"Local STT engine '{engine}' is not installed (pip install 'mumbaihacks[local-stt]')")
+            return
+
+        finals = asyncio.Queue()
+        segment = bytearray()
+        segment_id = 0
+        last_interim_at = 0
+        continued = False  # the current segment follows one cut at the max length
+        interim_task = None
+
+        async def final_worker():
+            """Transcribes finished segments strictly in order."""
+            while True:
+                item = await finals.get()
+                if item is None:
+                    return
+                try:
+                    text = await self._transcribe(item, language)
+                    if text:
+                        await websocket_client.send_message(transcript_message(text, None, True))
+                except Exception as e:
+                    logger.error(f"Local STT error: {e}")
+
+        async def interim(pcm: bytes, for_segment: int):
+            try:
+                text = await self._transcribe(pcm, language)
+                # Drop stale interims once the segment has been finalized
+                if text and for_segment == segment_id:
+                    await websocket_client.send_message(transcript_message(text, None, False))
+            except Exception as e:
+                logger.debug(f"Local STT interim error: {e}")
+
+        def close_segment(cut: bool = False):
+            """`cut`: the utterance goes on past LOCAL_STT_MAX_SEGMENT_MS, so its tail is kept however short."""
+            nonlocal segment, segment_id, last_interim_at, continued
+            if len(segment) >= self.min_segment_bytes or (continued and segment):
+                finals.put_nowait(bytes(segment))
+            segment = bytearray()
+            segment_id += 1
+            last_interim_at = 0
+            continued = cut
+
+        worker = asyncio.create_task(final_worker())
+        try:
+            while True:
+                try:
+                    data = await websocket_client.receive_bytes()
+                except Exception as e:
+                    logger.info(f"Local STT input closed: {e}")
+                    break
+                if not data:
+                    break
+
+                frames, active = self.vad.process(data)
+                if not len(active):
+                    continue
+
+                # Split the chunk into runs of speech / non-speech frames
+                bounds = np.flatnonzero(np.diff(active.astype(np.int8))) + 1
+                for run in np.split(np.arange(len(active)), bounds):
+                    if active[run[0]]:
+                        segment.extend(frames[run[0]:run[-1] + 1].tobytes())
+                        if len(segment) >= self.max_segment_bytes:
+                            close_segment(cut=True)
+                    elif segment:
+                        close_segment()
+
+                if segment and len(segment) - last_interim_at >= self.interim_bytes and (interim_task is None or interim_task.done()):
+                    last_interim_at = len(segment)
+                    interim_task = asyncio.create_task(interim(bytes(segment), segment_id))
+        finally:
+            if segment:
+                close_segment()
+            finals.put_nowait(None)
+            await worker
+            if interim_task is not None:
+                interim_task.cancel()
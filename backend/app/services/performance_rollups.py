@@ -0,0 +1,201 @@
+import datetime
+import logging
+import time
+from collections import OrderedDict
+from app.core.session_store import RedisSessionStore, get_session_store
+
+logger = logging.getLogger(__name__)
+
+DAY_TTL = 120 * 24 * 3600  # per-day rollups are kept ~4 months; totals never expire
+SEEN_TTL = 7 * 24 * 3600  # how long a session is remembered to avoid double counting
+SEEN_MAX = 100_000  # in-process sessions remembered at most; the oldest are forgotten first
+TOP_OBJECTIONS = 10
+
+def normalize_objection(text) -> str:
+    return " ".join(str(text).lower().split())[:80]
+
+def call_increments(entry: dict) -> dict:
+    """Counter deltas for a post-call history entry (calls and talk time)."""
+    analytics = entry.get("call_analytics") or {}
+    duration = analytics.get("duration_seconds")
+    deltas = {"calls": 1}
+    if isinstance(duration, (int, float)):
+        deltas["talk_seconds"] = round(float(duration), 1)
+    return deltas
+
+def report_increments(report: dict) -> dict:
+    """Counter deltas for an /end-call report (sentiment and objections)."""
+    deltas = {"reports": 1}
+    sentiment = str(report.get("sentiment") or "").strip().capitalize()
+    if sentiment:
+        deltas[f"sentiment:{sentiment}"] = 1
+    objections = report.get("objections") or []
+    for objection in {normalize_objection(o) for o in objections if o}:
+        deltas[f"objection:{objection}"] = 1
+    return deltas
+
+def summarize(counters: dict) -> dict:
+    calls = int(counters.get("calls", 0))
+    talk = float(counters.get("talk_seconds", 0))
+    reports = int(counters.get("reports", 0))
+    sentiment = {k.split(":", 1)[1]: int(v) for k, v in counters.items() if k.startswith("sentiment:")}
+    objections = sorted(
+        ((k.split(":", 1)[1], int(v)) for k, v in counters.items() if k.startswith("objection:")),
+        key=lambda item: -item[1],
+    )
+    return {
+        "calls": calls,
+        "talk_seconds": round(talk, 1),
+        "avg_call_seconds": round(talk / calls, 1) if calls else None,
+        "reports": reports,
+        "sentiment": sentiment,
+        "positive_share": round(sentiment.get("Positive", 0) / reports, 3) if reports else None,
+        "objections": [{"objection": text, "count": count} for text, count in objections[:TOP_OBJECTIONS]],
+    }
+
+def _day(timestamp: str | None = None) -> str:
+    try:
+        return datetime.datetime.fromisoformat(timestamp).date().isoformat()
+    except (TypeError, ValueError):
+        return datetime.date.today().isoformat()
+
+class RollupStore:
+    """
+    Per-agent performance counters, updated incrementally as calls finish so dashboards
+    read them in O(1) instead of scanning every lead's chat_history.
+
+    Each agent has an all-time counter set and one per day. Calls (count, talk time) are
+    recorded from the post-call history entry; sentiment and objections from the /end-call
+    report, since the socket handler does not run the LLM analysis itself. Both are
+    deduplicated by session id.
+
+    This base implementation is in-process; RedisRollupStore keeps the counters in hashes.
+    """
+
+    def __init__(self):
+        self._counters = {}
+        self._agents = set()
+        self._seen = OrderedDict()  # seen_key -> claimed at (monotonic), oldest first
+        self._day_expiry = OrderedDict()  # day key -> expires at (monotonic), soonest first
+
+    @staticmethod
+    def _key(agent: str, day: str | None = None) -> str:
+        return f"rollup:agent:{agent}" + (f":{day}" if day else "")
+
+    async def record_call(self, agent: str, entry: dict) -> bool:
+        return await self._record(agent, f"call:{entry.get('session_id')}", _day(entry.get("timestamp")), call_increments(entry))
+
+    async def record_report(self, agent: str, session_id: str, report: dict) -> bool:
+        return await self._record(agent, f"report:{session_id}", _day(), report_increments(report))
+
+    async def _record(self, agent: str, seen_key: str, day: str, deltas: dict) -> bool:
+        if not agent:
+            return False
+        if not await self._claim(seen_key):
+            logger.info(f"Rollup for {seen_key} already recorded, skipping")
+            return False
+        try:
+            await self._apply(agent, [self._key(agent), self._key(agent, day)], deltas)
+        except Exception:
+            # Unclaimed, so a retry of the same session still counts
+            await self._release(seen_key)
+            raise
+        return True
+
+    async def _claim(self, seen_key: str) -> bool:
+        now = time.monotonic()
+        while self._seen and (len(self._seen) >= SEEN_MAX or next(iter(self._seen.values())) < now - SEEN_TTL):
+            self._seen.popitem(last=False)
+        if seen_key in self._seen:
+            return False
+        self._seen[seen_key] = now
+        return True
+
+    async def _release(self, seen_key: str):
+        self._seen.pop(seen_key, None)
+
+    async def _apply(self, agent: str, keys: list, deltas: dict):
+        self._agents.add(agent)
+        for key in keys:
+            counters = self._counters.setdefault(key, {})
+            for field, amount in deltas.items():
+                counters[field] = counters.get(field, 0) + amount
+        # Day counters expire DAY_TTL after their last update, as the Redis hashes do
+        now = time.monotonic()
+        self._day_expiry.pop(keys[1], None)
+        self._day_expiry[keys[1]] = now + DAY_TTL
+        while next(iter(self._day_expiry.values())) <= now:
+            expired, _ = self._day_expiry.popitem(last=False)
+            self._counters.pop(expired, None)
+
+    async def _read(self, keys: list) -> list:
+        return [dict(self._counters.get(key, {})) for key in keys]
+
+    async def agents(self) -> list:
+        return sorted(self._agents)
+
+    async def get_agent_stats(self, agent: str, days: int = 7) -> dict:
+        today = datetime.date.today()
+        dates = [(today - datetime.timedelta(days=i)).isoformat() for i in range(days)]
+        total, *daily = await self._read([self._key(agent)] + [self._key(agent, d) for d in dates])
+        return {
+            "agent": agent,
+            "totals": summarize(total),
+            "daily": [{"date": d, **summarize(c)} for d, c in zip(dates, daily)],
+        }
+
+    async def leaderboard(self) -> list:
+        names = await self.agents()
+        totals = await self._read([self._key(name) for name in names])
+        return sorted(
+            ({"agent": name, **summarize(counters)} for name, counters in zip(names, totals)),
+            key=lambda row: -row["calls"],
+        )
+
+class RedisRollupStore(RollupStore):
+    """
+    Keys:
+      rollup:agent:{agent}         hash of all-time counters
+      rollup:agent:{agent}:{date}  hash of that day's counters (expires after DAY_TTL)
+      rollup:agents                set of agent names with counters
+      rollup:seen:{kind}:{session} marks a session as counted
+    """
+
+    def __init__(self, client):
+        super().__init__()
+        self.redis = client
+
+    async def _claim(self, seen_key: str) -> bool:
+        return bool(await self.redis.set(f"rollup:seen:{seen_key}", 1, nx=True, ex=SEEN_TTL))
+
+    async def _release(self, seen_key: str):
+        await self.redis.delete(f"rollup:seen:{seen_key}")
+
+    async def _apply(self, agent: str, keys: list, deltas: dict):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for key in keys:
+                for field, amount in deltas.items():
+                    pipe.hincrbyfloat(key, field, amount)
+            pipe.expire(keys[1], DAY_TTL)
+            pipe.sadd("rollup:agents", agent)
+            await pipe.execute()
+
+    async def _read(self, keys: list) -> list:
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hgetall(key)
+            raw = await pipe.execute()
+        return [{k.decode(): float(v) for k, v in counters.items()} for counters in raw]
+
+    async def agents(self) -> list:
+        return sorted(name.decode() for name in await self.redis.smembers("rollup:agents"))
+
+_rollups = None
+
+def get_rollup_store() -> RollupStore:
+    """Shares the session store's Redis connection when there is one."""
+    global _rollups
+    if _rollups is None:
+        store = get_session_store()
+        _rollups = RedisRollupStore(store.redis) if isinstance(store, RedisSessionStore) else RollupStore()
+    return _rollups
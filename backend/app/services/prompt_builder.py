@@ -0,0 +1,139 @@
+import logging
+from app.core.metrics import PROMPT_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# Token budgets per LLM stage and prompt section. Counts use cl100k_base, which is close
+# enough to the Llama tokenizer for budgeting.
+STAGE_BUDGETS = {
+    "listen": {"history": 600},
+    "answer": {"profile": 150, "summary": 250, "history": 700, "context": 900},
+    "rolling_summary": {"summary": 250, "history": 1500},
+    "summary": {"history": 6000},
+    "report": {"history": 6000},
+}
+
+ENCODING_NAME = "cl100k_base"
+CHARS_PER_TOKEN = 4  # Fallback estimate when the encoding cannot be loaded
+
+_encoding = None
+_encoding_failed = False
+
+def _get_encoding():
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(ENCODING_NAME)
+        except Exception as e:
+            # tiktoken downloads encodings on first use; offline hosts fall back to estimates
+            _encoding_failed = True
+            logger.warning(f"tiktoken encoding unavailable, estimating tokens from length: {e}")
+    return _encoding
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+def truncate_tokens(text: str, max_tokens: int, keep_end: bool = True) -> str:
+    """Cuts `text` to `max_tokens`, keeping its end (recent speech) or its start."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    if encoding is None:
+        limit = max_tokens * CHARS_PER_TOKEN
+        return text[-limit:] if keep_end else text[:limit]
+    tokens = encoding.encode(text, disallowed_special=())
+    return encoding.decode(tokens[-max_tokens:] if keep_end else tokens[:max_tokens])
+
+def split_recent(lines: list, budget: int) -> tuple[list, list]:
+    """
+    Splits transcript lines into (older, recent) where `recent` is the longest suffix of
+    whole turns fitting in `budget` tokens. The last turn is always kept, clipped if needed.
+    """
+    recent, used = [], 0
+    for line in reversed(lines):
+        cost = count_tokens(line) + 1
+        if recent and used + cost > budget:
+            break
+        recent.append(line if used + cost <= budget else truncate_tokens(line, budget))
+        used += cost
+    recent.reverse()
+    return lines[:len(lines) - len(recent)], recent
+
+def compact_lines(lines: list, budget: int, head_share: float = 0.25) -> str:
+    """Whole-call text within `budget`: the opening turns, an omission marker, then the most recent turns."""
+    text = "\n".join(lines)
+    if count_tokens(text) <= budget:
+        return text
+    head, used = [], 0
+    for line in lines:
+        cost = count_tokens(line) + 1
+        if used + cost > budget * head_share:
+            break
+        head.append(line)
+        used += cost
+    _, tail = split_recent(lines[len(head):], budget - used - 10)
+    omitted = len(lines) - len(head) - len(tail)
+    return "\n".join(head + [f"[... {omitted} turns omitted ...]"] + tail)
+
+# Fund fields worth reading aloud, by what the Lead is after
+INTENT_FUND_FIELDS = {
+    "recommendation": ["returns_1yr", "returns_3yr", "returns_5yr", "risk_level", "min_sip", "rating"],
+    "information": ["returns_1yr", "returns_3yr", "returns_5yr", "expense_ratio", "risk_level", "min_sip", "min_lumpsum", "fund_manager", "fund_size_cr"],
+    "comparison": ["returns_1yr", "returns_3yr", "returns_5yr", "expense_ratio", "risk_level", "sharpe", "sd", "rating"],
+    "objection": ["risk_level", "sd", "expense_ratio", "min_sip", "fund_age_yr", "rating"],
+}
+
+FIELD_FORMATS = {
+    "returns_1yr": "1Y {}%",
+    "returns_3yr": "3Y {}%",
+    "returns_5yr": "5Y {}%",
+    "expense_ratio": "expense ratio {}%",
+    "risk_level": "risk {}/6",
+    "min_sip": "min SIP Rs {}",
+    "min_lumpsum": "min lumpsum Rs {}",
+    "fund_manager": "manager {}",
+    "fund_size_cr": "AUM Rs {} cr",
+    "rating": "rating {}/5",
+    "sharpe": "Sharpe {}",
+    "sd": "std dev {}",
+    "fund_age_yr": "{} yrs old",
+}
+
+def render_fund(doc: dict, intent_type: str = "information") -> str:
+    meta = doc.get("metadata") or {}
+    kind = " / ".join(v for v in (doc.get("category") or meta.get("category"), meta.get("sub_category")) if v)
+    parts = []
+    for field in INTENT_FUND_FIELDS.get(intent_type, INTENT_FUND_FIELDS["information"]):
+        value = meta.get(field, doc.get(field))
+        if value not in (None, ""):
+            parts.append(FIELD_FORMATS[field].format(value))
+    return f"- {doc['scheme_name']} ({kind}): " + ", ".join(parts)
+
+def render_context(docs: list, intent_type: str, budget: int) -> str:
+    """Compact fund cards and KB passages, in retrieval order, until `budget` tokens are used."""
+    blocks, used = [], 0
+    for doc in docs:
+        block = render_fund(doc, intent_type) if "scheme_name" in doc else doc.get("content", "").strip()
+        cost = count_tokens(block) + 1
+        if used + cost > budget:
+            if not blocks:
+                blocks.append(truncate_tokens(block, budget, keep_end=False))
+            break
+        blocks.append(block)
+        used += cost
+    return "\n".join(blocks)
+
+def log_prompt_tokens(stage: str, prompt: str, **sections) -> int:
+    """Records the prompt's token count for `stage` and logs the per-section split."""
+    total = count_tokens(prompt)
+    PROMPT_TOKENS.labels(stage=stage).observe(total)
+    if logger.isEnabledFor(logging.DEBUG):
+        split = " ".join(f"{name}={count_tokens(text)}" for name, text in sections.items())
+        logger.debug(f"Prompt tokens stage={stage} total={total} {split}")
+    return total
@@ -0,0 +1,103 @@
+import logging
+import os
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RESCORE_FACTOR = 4  # candidates rescored exactly per result asked for
+MIN_RESCORE = 32
+BLOCK_ROWS = 256  # rows converted from int8 at a time; keeps the float32 scratch in L2
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def quantize_int8(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Per-dimension symmetric int8 codes and the float32 scale that maps them back."""
+    scale = np.abs(vectors).max(axis=0).astype(np.float32) / 127.0 if len(vectors) else np.ones(vectors.shape[1], dtype=np.float32)
+    scale[scale == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+    return codes, scale
+
+def save_index(directory: str, name: str, vectors: np.ndarray):
+    """
+    Writes `name`.npy (unit float32 rows, used for exact rescoring) and its int8 codes
+    (`name`.codes.npy, `name`.scale.npy) next to it, for QuantizedIndex to map.
+    """
+    vectors = normalize(vectors) if len(vectors) else np.asarray(vectors, dtype=np.float32)
+    codes, scale = quantize_int8(vectors)
+    np.save(os.path.join(directory, f"{name}.npy"), vectors)
+    np.save(os.path.join(directory, f"{name}.codes.npy"), codes)
+    np.save(os.path.join(directory, f"{name}.scale.npy"), scale)
+
+class QuantizedIndex:
+    """
+    Cosine search over memory-mapped embeddings, scanning int8 codes instead of float32.
+
+    Every row is scored asymmetrically: the float32 query, pre-multiplied by the
+    per-dimension scale, against the int8 codes (a quarter of the bytes to read).
+    The best `k * RESCORE_FACTOR` candidates are then rescored exactly against the
+    float32 rows, so only those pages of the full-precision file are touched. Both
+    files are opened with mmap, so uvicorn workers on one host share a single copy
+    in the page cache. Without codes on disk the index falls back to an exact scan.
+    """
+
+    def __init__(self, directory: str, name: str = "embeddings"):
+        path = lambda suffix: os.path.join(directory, f"{name}{suffix}")
+        self.vectors = np.load(path(".npy"), mmap_mode="r")
+        self.codes = self.scale = None
+        if os.path.exists(path(".codes.npy")):
+            self.codes = np.load(path(".codes.npy"), mmap_mode="r")
+            self.scale = np.load(path(".scale.npy"))
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    @property
+    def scan_bytes(self) -> int:
+        """Bytes read by one full scan (what has to stay resident for fast queries)."""
+        return (self.codes if self.codes is not None else self.vectors).nbytes
+
+    def approximate(self, query: np.ndarray) -> np.ndarray:
+        """Approximate cosine score of every row for a unit query."""
+        if self.codes is None:
+            return self.exact(query)
+        weighted = (query * self.scale).astype(np.float32)
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        scratch = np.empty((BLOCK_ROWS, self.codes.shape[1]), dtype=np.float32)
+        for start in range(0, len(self.codes), BLOCK_ROWS):
+            block = self.codes[start:start + BLOCK_ROWS]
+            converted = scratch[:len(block)]
+            np.copyto(converted, block, casting="unsafe")
+            np.matmul(converted, weighted, out=scores[start:start + len(block)])
+        return scores
+
+    def exact(self, query: np.ndarray, ids: np.ndarray | None = None) -> np.ndarray:
+        if ids is None:
+            return np.asarray(self.vectors @ query, dtype=np.float32)
+        return np.asarray(self.vectors[ids] @ query, dtype=np.float32)
+
+    def search(self, query, k: int, mask: np.ndarray | None = None, rescore: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Row ids and exact cosine scores of the `k` best rows (restricted to `mask` when
+        given), best first. `rescore` overrides how many candidates are rescored.
+        """
+        query = normalize(query)
+        scores = self.approximate(query)
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+        allowed = len(scores) if mask is None else int(mask.sum())
+        if not allowed or k <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        k = min(k, allowed)
+        if self.codes is None:
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return top, scores[top]
+        width = min(allowed, max(rescore or max(k * RESCORE_FACTOR, MIN_RESCORE), k))
+        # Ascending ids read the float32 file front to back
+        candidates = np.sort(np.argpartition(-scores, width - 1)[:width])
+        exact = self.exact(query, candidates)
+        order = np.argsort(-exact, kind="stable")[:k]
+        return candidates[order], exact[order]
@@ -1,70 +1,122 @@
-from openai import OpenAI
-from supabase import create_client, Client
-from app.core.config import settings
-from app.core.state import transcript_store
+from app.core.clients import get_embeddings, get_supabase
+from app.core.session_store import get_session_store
+from app.core.metrics import rag_stage
+from app.services.listening_agent import FundFilters, ListeningResult, build_listening_prompt, fund_matches, parse_listening_result
+from app.services.prompt_builder import STAGE_BUDGETS, count_tokens, log_prompt_tokens, render_context, split_recent, truncate_tokens
+from app.services.llm_gateway import LLMUnavailable, get_llm_gateway
+from app.services.speculative_retrieval import get_speculative_retriever
+from app.services.fund_snapshot import get_fund_snapshot
+from app.services.lead_context import describe_profile, merge_filters, profile_filters
+import asyncio
 import logging
 import json
+import re
 
 logger = logging.getLogger(__name__)
 
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+# Older turns are folded into the rolling summary once this many have piled up
+SUMMARY_BATCH_LINES = 8
+# In-flight rolling summary updates on this worker, by session
+_rolling_tasks = {}
+
+def personalize(fund_docs: list, shortlist: list, filters: FundFilters, limit: int = 5) -> list:
+    """Funds on the Lead's shortlist first, then the other matches, topped up from the shortlist."""
+    shortlisted = {fund.get("id") for fund in shortlist}
+    ranked = [f for f in fund_docs if f.get("id") in shortlisted] + [f for f in fund_docs if f.get("id") not in shortlisted]
+    seen = {f.get("id") for f in ranked}
+    ranked += [f for f in shortlist if f.get("id") not in seen and fund_matches(f, filters)]
+    return ranked[:limit]
 
 class RAGService:
     def __init__(self):
-        # Groq Client (via OpenAI SDK)
-        self.llm_client = OpenAI(
-            base_url="https://api.groq.com/openai/v1",
-            api_key=settings.GROQ_API_KEY
-        )
+        # Groq with fallback, hedging and deadlines (see LLMGateway)
+        self.llm = get_llm_gateway()
         # Embedding Client (Google Gemini)
-        self.embeddings = GoogleGenerativeAIEmbeddings(
-            model="models/text-embedding-004",
-            google_api_key=settings.GOOGLE_API_KEY
-        )
+        self.embeddings = get_embeddings()
         
-        self.supabase: Client = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+        self.supabase = get_supabase()
 
-    def get_transcript(self, session_id: str) -> str:
-        return " ".join(transcript_store.get(session_id, []))
+    async def get_transcript(self, session_id: str) -> str:
+        return await get_session_store().get_transcript(session_id)
 
-    def assess_user_intent(self, transcript: str) -> str:
-        if not transcript:
-            return None
-            
+    async def get_history(self, session_id: str, stage: str, lines: list = None) -> tuple[str, str]:
+        """
+        Conversation history for `stage` within its token budget: (summary, recent), where
+        `recent` is whole recent turns and `summary` covers everything before them.
+        """
+        budget = STAGE_BUDGETS[stage]
+        store = get_session_store()
+        if lines is None:
+            lines = await store.get_transcript_lines(session_id)
+        older, recent = split_recent(lines, budget["history"])
+        recent_text = "\n".join(recent)
+        if not older or "summary" not in budget:
+            return "", recent_text
+
+        session = await store.get_session(session_id)
+        summary = session.get("rolling_summary") or ""
+        covered = min(int(session.get("summary_lines") or 0), len(older))
+        pending = older[covered:]
+        if len(pending) >= SUMMARY_BATCH_LINES and session_id not in _rolling_tasks:
+            _rolling_tasks[session_id] = asyncio.create_task(
+                self._roll_summary(session_id, summary, older[covered:], len(older), session.get("agent_name"))
+            )
+
+        # Turns the summary does not cover yet fill whatever budget it leaves
+        remaining = budget["summary"] - count_tokens(summary)
+        if pending and remaining > 20:
+            unsummarized = truncate_tokens("\n".join(pending), remaining)
+            summary = f"{summary}\n{unsummarized}".strip()
+        return truncate_tokens(summary, budget["summary"]), recent_text
+
+    async def _roll_summary(self, session_id: str, summary: str, new_lines: list, covered: int, agent: str = None):
+        """Folds `new_lines` into the session's rolling summary, off the assist path."""
+        budget = STAGE_BUDGETS["rolling_summary"]
+        new_turns = truncate_tokens("\n".join(new_lines), budget["history"])
         prompt = f"""
-        You are a smart "Listening Agent" for a financial sales call.
-        Your goal is to analyze the transcript and gauge the potential client's (Lead) INTENT.
-        
-        Determine if the Lead is expressing an intent that requires information from the Knowledge Base (Mutual Funds data or Policy).
-        
-        Intents to Detect:
-        1. **Recommendation**: Wants a suggestion (e.g., "What fund is good for retirement?", "Suggest a mid-cap fund").
-        2. **Information**: Wants specific details (e.g., "What is the return of Axis Bluechip?", "Tell me about this fund").
-        3. **Comparison**: Wants to compare options (e.g., "Which is better, X or Y?").
-        4. **Objection/Concern**: Expressing a worry that needs addressing (e.g., "Is this safe?", "The fees seem high").
-        5. **Goal/Need**: Stating a financial goal that implies a need for a product (e.g., "I want to save for retirement", "I have 5k to invest").
-        
-        Instructions:
-        - Look at the RECENT context (last few turns).
-        - If the user states a **Goal** (e.g., "I want to save for X"), treat it as a **Recommendation** intent (Query: "funds for X").
-        - If an intent is detected, formulate a concise **Search Query** that captures the core need.
-        - If NO clear intent is detected (e.g., small talk, greeting, simple acknowledgement), return "NO_INTENT".
-        - Return ONLY the Search Query or "NO_INTENT".
-        
-        Transcript:
-        {transcript[-2000:]}
+        You maintain a running summary of a financial sales call for the Agent's copilot.
+        Fold the new turns into the current summary. Keep the Lead's goals, budget, risk appetite,
+        funds discussed and concerns; drop small talk. At most 5 sentences.
+
+        Current Summary:
+        {summary or "(none yet)"}
+
+        New Turns:
+        {new_turns}
+
+        Updated Summary:
         """
-        
-        response = self.llm_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.1
-        )
-        
-        result = response.choices[0].message.content.strip()
-        if "NO_INTENT" in result:
-            return None
-        return result
+        try:
+            log_prompt_tokens("rolling_summary", prompt, summary=summary, history=new_turns)
+            updated = await self.llm.complete(prompt, "rolling_summary", max_tokens=budget["summary"], agent=agent)
+            await get_session_store().update_session(session_id, {"rolling_summary": updated, "summary_lines": covered})
+        except Exception as e:
+            logger.error(f"Rolling summary update failed for {session_id}: {e}")
+        finally:
+            _rolling_tasks.pop(session_id, None)
+
+    async def analyze_context(self, transcript: str, trigger_word: str = None, agent: str = None) -> ListeningResult:
+        """
+        One structured call that both checks the trigger phrase and extracts the Lead's intent,
+        replacing the separate verify/intent round trips.
+        """
+        if not transcript:
+            return ListeningResult()
+
+        history = truncate_tokens(transcript, STAGE_BUDGETS["listen"]["history"])
+        prompt = build_listening_prompt(history, trigger_word)
+        log_prompt_tokens("listen", prompt, history=history)
+        try:
+            raw = await self.llm.complete(prompt, "listen", json_mode=True, agent=agent)
+        except LLMUnavailable as e:
+            # Degrade to the latest two turns as the query; the Agent did ask for a lookup
+            logger.warning(f"Listening agent unavailable, using recent turns as the query: {e}")
+            return ListeningResult(
+                trigger_valid=bool(trigger_word) or None,
+                intent_type="information",
+                search_query=truncate_tokens(" ".join(history.splitlines()[-2:]), 80)
+            )
+        return parse_listening_result(raw, trigger_word)
 
     def get_embedding(self, text: str):
         # Using Google Gemini Embeddings
@@ -81,41 +133,67 @@ class RAGService:
         ).execute()
         return response.data
 
-    def search_mutual_funds(self, query_embedding):
+    def search_mutual_funds(self, query_embedding, filters: FundFilters = None):
+        snapshot = get_fund_snapshot()
+        if snapshot is not None:
+            return snapshot.search(query_embedding, filters, threshold=0.3, count=5)
+        # Over-fetch when filtering so a few constraint misses still leave 5 candidates
+        filtering = filters is not None and any(v is not None for v in filters.model_dump().values())
         response = self.supabase.rpc(
             "match_mutual_funds",
             {
                 "query_embedding": query_embedding,
                 "match_threshold": 0.3, # Lower threshold for broader matching
-                "match_count": 5
+                "match_count": 20 if filtering else 5
             }
         ).execute()
+        if not filtering:
+            return response.data
+        return [fund for fund in response.data if fund_matches(fund, filters)][:5]
+
+    def search_funds_by_name(self, names: list) -> list:
+        """Exact-ish lookup for funds the Lead named, so they are never lost to vector ranking."""
+        # PostgREST or=() syntax reserves commas, parentheses and dots
+        patterns = [re.sub(r"[,().%*]", " ", name).strip() for name in names]
+        patterns = [" ".join(p.split()) for p in patterns if p]
+        if not patterns:
+            return []
+        snapshot = get_fund_snapshot()
+        if snapshot is not None:
+            return snapshot.find_by_name(patterns[:5])
+        response = self.supabase.table("mutual_funds").select(
+            "id, scheme_name, category, returns_1yr, metadata"
+        ).or_(",".join(f"scheme_name.ilike.*{p}*" for p in patterns[:5])).limit(5).execute()
         return response.data
 
-    def generate_answer(self, question: str, context_docs: list, transcript: str = "") -> str:
-        # Check if context is from mutual funds or generic KB
-        context_text = ""
-        for doc in context_docs:
-            if 'scheme_name' in doc:
-                # It's a mutual fund
-                context_text += f"Fund: {doc['scheme_name']}\nCategory: {doc['category']}\nReturns (1Y): {doc['returns_1yr']}%\nDetails: {doc['metadata']}\n\n"
-            else:
-                # Generic KB
-                context_text += f"{doc['content']}\n\n"
-        
+    async def generate_answer(self, question: str, context_docs: list, transcript: str = "", intent_type: str = "information",
+                              summary: str = "", agent: str = None, profile: str = "") -> str:
+        budget = STAGE_BUDGETS["answer"]
+        profile = truncate_tokens(profile, budget["profile"], keep_end=False)
+        history = truncate_tokens(transcript, budget["history"])
+        summary = truncate_tokens(summary, budget["summary"])
+        context_text = render_context(context_docs, intent_type, budget["context"])
+
         prompt = f"""
         You are a helpful, sincere, and positive Sales Copilot for financial agents.
         Your goal is to help the agent close the sale while maintaining a warm and trustworthy relationship with the customer.
         
         Instructions:
         1. Answer the User's Intent based ONLY on the provided Knowledge Base Context (Mutual Funds or Policy).
-        2. Use the Conversation History to understand the flow.
+        2. Use the Earlier Conversation summary and Recent Conversation to understand the flow.
         3. Tone: Sincere, Positive, Professional, and Helpful. Avoid being pushy or robotic.
         4. If recommending a fund, mention its name, category, and why it fits (e.g., returns).
         5. Keep the answer concise and actionable for the agent to say aloud.
+        6. Respect the Lead Profile (risk appetite, SIP capacity) when suggesting funds.
 
-        Conversation History:
-        {transcript}
+        Lead Profile:
+        {profile or "(unknown)"}
+
+        Earlier Conversation (summary):
+        {summary or "(none)"}
+
+        Recent Conversation:
+        {history}
         
         Knowledge Base Context:
         {context_text}
@@ -124,83 +202,109 @@ class RAGService:
         
         Suggested Answer (for the Agent to say):
         """
+        log_prompt_tokens("answer", prompt, profile=profile, summary=summary, history=history, context=context_text)
         
-        response = self.llm_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3
-        )
-        return response.choices[0].message.content.strip()
+        return await self.llm.complete(prompt, "answer", temperature=0.3, agent=agent)
 
-    def verify_trigger_context(self, transcript: str, trigger_word: str) -> bool:
-        if not transcript or not trigger_word:
-            return False
-            
-        prompt = f"""
-        You are a context analyzer for a sales call.
-        The Agent just said the trigger phrase: "{trigger_word}".
-        
-        Analyze the transcript to determine if the Agent is using this phrase to signal they are about to look up information for the Lead (Valid).
-        
-        Valid Examples:
-        - "Let me check that fund for you."
-        - "Let me check the returns."
-        - "One moment, let me check." (After Lead asked a question)
-        
-        Invalid Examples:
-        - "Let me check the time."
-        - "Let me check if I left the stove on."
-        - "Let me check my email."
-        
-        Transcript:
-        {transcript[-1000:]}
-        
-        Is this a VALID lookup intent? Return ONLY "YES" or "NO".
-        """
-        
-        response = self.llm_client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.0
-        )
-        
-        result = response.choices[0].message.content.strip().upper()
-        return "YES" in result
+    def answer_from_bank(self, listening: ListeningResult, session: dict) -> dict | None:
+        """A filled answer-bank template when the fund and topic resolve confidently, else None."""
+        snapshot = get_fund_snapshot()
+        if snapshot is None:
+            return None
+        with rag_stage("answer_bank"):
+            hit = snapshot.answer_bank.lookup(listening, session.get("language"), session.get("lead_name"))
+        if hit is None:
+            return None
+        logger.info(f"Answer bank hit: {hit['topic']} for {hit['fund']['scheme_name']} (confidence {hit['confidence']})")
+        return {
+            "status": "success",
+            "question": listening.search_query,
+            "intent_type": listening.intent_type,
+            "speculative_hit": False,
+            "answer_source": "bank",
+            "answer": hit["answer"],
+            "context": [hit["fund"]]
+        }
 
-    async def process_assist_request(self, session_id: str, trigger_word: str = None):
-        transcript = self.get_transcript(session_id)
-        if not transcript:
+    async def process_assist_request(self, session_id: str, trigger_word: str = None, lines: list = None):
+        store = get_session_store()
+        if lines is None:
+            lines = await store.get_transcript_lines(session_id)
+        if not lines:
             return {"error": "No transcript found"}
-            
-        # Verify Trigger if provided
-        if trigger_word:
-            is_valid = self.verify_trigger_context(transcript, trigger_word)
-            if not is_valid:
-                return {"status": "ignored", "message": f"Trigger '{trigger_word}' context was invalid."}
-            
-        # Assess Intent instead of just finding a question
-        search_query = self.assess_user_intent(transcript)
-        
-        if not search_query:
+        session = await store.get_session(session_id)
+        # Fair-queues this call's LLM work against other agents' calls
+        agent = session.get("agent_name")
+
+        _, listen_history = await self.get_history(session_id, "listen", lines)
+
+        with rag_stage("listen"):
+            listening = await self.analyze_context(listen_history, trigger_word, agent)
+
+        if trigger_word and not listening.trigger_valid:
+            return {"status": "ignored", "message": f"Trigger '{trigger_word}' context was invalid."}
+
+        if not listening.has_intent:
             return {"status": "no_intent_detected", "message": "No actionable intent identified."}
-            
-        embedding = self.get_embedding(search_query)
-        
-        # Search both KB and Mutual Funds
-        kb_docs = self.search_knowledge_base(embedding)
-        fund_docs = self.search_mutual_funds(embedding)
-        
+
+        # Common questions about one named fund are answered from the precomputed bank
+        banked = self.answer_from_bank(listening, session)
+        if banked is not None:
+            return banked
+
+        search_query = listening.search_query
+        # Preloaded at call start (LeadContextService); recommendations respect the Lead's profile
+        lead_context = session.get("lead_context") or {}
+        filters = listening.filters
+        if listening.intent_type == "recommendation":
+            filters = merge_filters(filters, profile_filters(lead_context.get("profile")))
+
+        # Context prefetched while the Lead was speaking covers most assists
+        warm = await get_speculative_retriever().lookup(
+            session_id, " ".join([search_query, *listening.mentioned_funds]), session
+        )
+        if warm:
+            kb_docs = warm["kb_docs"]
+            fund_docs = [doc for doc in warm["fund_docs"] if fund_matches(doc, filters)]
+        else:
+            with rag_stage("embed"):
+                embedding = self.get_embedding(search_query)
+
+        # Search both KB and Mutual Funds; named funds come first
+        with rag_stage("search"):
+            named_docs = self.search_funds_by_name(listening.mentioned_funds) if listening.mentioned_funds else []
+            if not warm:
+                kb_docs = self.search_knowledge_base(embedding)
+                fund_docs = self.search_mutual_funds(embedding, filters)
+        if listening.intent_type == "recommendation":
+            fund_docs = personalize(fund_docs, lead_context.get("fund_shortlist") or [], filters)
+
         # Combine results
-        context_docs = kb_docs + fund_docs
-        
+        seen = {doc.get("id") for doc in named_docs}
+        context_docs = named_docs + kb_docs + [doc for doc in fund_docs if doc.get("id") not in seen]
+
         if not context_docs:
-            return {"status": "no_context", "question": search_query, "answer": "I don't have information on that."}
-            
-        answer = self.generate_answer(search_query, context_docs, transcript)
-        
+            return {"status": "no_context", "question": search_query, "intent_type": listening.intent_type, "answer": "I don't have information on that."}
+
+        summary, history = await self.get_history(session_id, "answer", lines)
+        status = "success"
+        with rag_stage("answer"):
+            try:
+                answer = await self.generate_answer(
+                    search_query, context_docs, history, listening.intent_type, summary, agent, describe_profile(lead_context)
+                )
+            except LLMUnavailable as e:
+                # The retrieved fund cards are still worth showing without a generated pitch
+                logger.warning(f"Answer generation unavailable, returning context only: {e}")
+                status = "degraded"
+                answer = "Suggested answer is unavailable right now; see the matching funds below."
+
         return {
-            "status": "success",
+            "status": status,
             "question": search_query,
+            "intent_type": listening.intent_type,
+            "speculative_hit": warm is not None,
+            "answer_source": "llm",
             "answer": answer,
             "context": context_docs
         }
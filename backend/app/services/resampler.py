@@ -0,0 +1,86 @@
+import logging
+from math import gcd
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TARGET_RATE = 16000  # what STT, VAD and the recorder expect
+TAPS_PER_PHASE = 32
+KAISER_BETA = 8.0  # ~80 dB stopband
+ROLLOFF = 0.92  # passband edge as a fraction of the output Nyquist
+
+class PolyphaseResampler:
+    """
+    Streaming rational resampler (rate_out / rate_in = up / down) for mono float audio.
+
+    A windowed-sinc low-pass is split into `up` phases of `taps` taps; each output sample
+    is one dot product of the phase it falls on with the most recent input. The last
+    `taps` - 1 input samples are carried between chunks, so any chunking of the input
+    gives the same output.
+    """
+
+    def __init__(self, rate_in: int, rate_out: int = TARGET_RATE, taps_per_phase: int = TAPS_PER_PHASE):
+        g = gcd(rate_in, rate_out)
+        self.up, self.down = rate_out // g, rate_in // g
+        # When decimating the filter's span scales with the input rate, so the
+        # transition band stays the same width relative to the output rate
+        taps_per_phase *= -(-self.down // self.up)
+        self.taps = taps_per_phase
+        n = self.up * taps_per_phase
+        # Cutoff in cycles per sample of the (virtual) upsampled stream
+        cutoff = ROLLOFF * 0.5 * min(rate_in, rate_out) / (rate_in * self.up)
+        t = np.arange(n) - (n - 1) / 2
+        h = 2 * cutoff * np.sinc(2 * cutoff * t) * np.kaiser(n, KAISER_BETA) * self.up
+        # phases[p, j] = h[p + j * up]
+        self.phases = np.ascontiguousarray(h.reshape(taps_per_phase, self.up).T, dtype=np.float32)
+        self._history = np.zeros(taps_per_phase - 1, dtype=np.float32)
+        self._seen = 0  # input samples consumed so far
+        self._next = 0  # index of the next output sample
+
+    def process(self, x: np.ndarray) -> np.ndarray:
+        if not len(x):
+            return np.zeros(0, dtype=np.float32)
+        buf = np.concatenate((self._history, x.astype(np.float32, copy=False)))
+        start = self._seen - (self.taps - 1)  # input index of buf[0]
+        total = self._seen + len(x)
+        # Output k sits at upsampled position k * down, on input sample (k * down) // up
+        end = -(-total * self.up // self.down)
+        k = np.arange(self._next, end, dtype=np.int64)
+        pos = k * self.down
+        local = pos // self.up - start
+        window = buf[local[:, None] - np.arange(self.taps)]
+        y = np.einsum("kj,kj->k", window, self.phases[pos % self.up])
+
+        self._history = buf[-(self.taps - 1):]
+        self._seen, self._next = total, end
+        return y
+
+class AudioNormalizer:
+    """
+    Turns a client's 16-bit interleaved PCM (any rate, any channel count) into 16 kHz mono
+    16-bit PCM, chunk by chunk: downmix by averaging channels, then PolyphaseResampler.
+    Partial frames at chunk edges are held until the rest arrives.
+    """
+
+    def __init__(self, sample_rate: int, channels: int = 1, target_rate: int = TARGET_RATE):
+        self.sample_rate = sample_rate
+        self.channels = max(1, channels)
+        self.frame_bytes = 2 * self.channels
+        self.passthrough = sample_rate == target_rate and self.channels == 1
+        self.resampler = None if sample_rate == target_rate else PolyphaseResampler(sample_rate, target_rate)
+        self._partial = b""
+
+    def process(self, pcm: bytes) -> bytes:
+        if self.passthrough or not pcm:
+            return pcm
+        data = self._partial + pcm
+        usable = len(data) - len(data) % self.frame_bytes
+        self._partial = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype="<i2")
+        if self.channels > 1:
+            mono = samples.reshape(-1, self.channels).mean(axis=1, dtype=np.float32)
+        else:
+            mono = samples.astype(np.float32)
+        if self.resampler is not None:
+            mono = self.resampler.process(mono)
+        return np.clip(np.rint(mono), -32768, 32767).astype("<i2").tobytes()
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import re
+import time
+from app.core.metrics import SPECULATIVE_LOOKUPS, SPECULATIVE_SAVED_SECONDS, rag_stage
+from app.core.session_store import get_session_store
+
+logger = logging.getLogger(__name__)
+
+WARM_CACHE_SIZE = 4  # prefetched retrievals kept per session
+WARM_CACHE_TTL = 180.0  # seconds before a prefetch is considered stale
+MIN_MATCH = 0.5  # share of the assist query's terms a prefetch must cover to be used
+
+# Canonical terms spotted locally (no LLM) in Lead speech: fund categories, AMCs, goals and concerns
+SIGNAL_PATTERNS = {
+    "large cap": r"large[\s-]?cap|blue[\s-]?chip",
+    "mid cap": r"mid[\s-]?cap",
+    "small cap": r"small[\s-]?cap",
+    "flexi cap": r"flexi[\s-]?cap|multi[\s-]?cap",
+    "elss": r"\belss\b|tax[\s-]?sav\w*|\b80c\b",
+    "index": r"\bindex\b|\bnifty\b|\bsensex\b",
+    "debt": r"\bdebt\b|\bbonds?\b|\bgilt\b|fixed income",
+    "liquid": r"\bliquid\b|emergency fund",
+    "hybrid": r"\bhybrid\b|\bbalanced\b",
+    "gold": r"\bgold\b",
+    "retirement": r"\bretire\w*|\bpension\b",
+    "education": r"\beducation\b|\bcollege\b|\bchild\w*|\bdaughter\b|\bson\b",
+    "house": r"\bhouse\b|\bhome\b|\bproperty\b",
+    "sip": r"\bsips?\b|monthly invest\w*|\bper month\b|\bevery month\b",
+    "lumpsum": r"lump[\s-]?sum|one[\s-]?time",
+    "returns": r"\breturns?\b|\bperformance\b|\bcagr\b",
+    "risk": r"\brisk\w*|\bsafe\w*|\bvolatil\w*|\blos[es]\b|\bloss\w*",
+    "fees": r"\bfees?\b|expense ratio|\bcharges?\b|\bcommission\b",
+    "lock-in": r"lock[\s-]?in|\bwithdraw\w*|\bliquidity\b|exit load",
+    "amc:hdfc": r"\bhdfc\b",
+    "amc:sbi": r"\bsbi\b",
+    "amc:icici": r"\bicici\b",
+    "amc:axis": r"\baxis\b",
+    "amc:kotak": r"\bkotak\b",
+    "amc:nippon": r"\bnippon\b",
+    "amc:aditya birla": r"aditya birla|\bbirla\b",
+    "amc:mirae": r"\bmirae\b",
+    "amc:parag parikh": r"parag parikh|\bppfas\b",
+    "amc:uti": r"\buti\b",
+    "amc:quant": r"\bquant\b",
+    "amc:tata": r"\btata\b",
+    "amc:dsp": r"\bdsp\b",
+}
+_SIGNALS = [(term, re.compile(pattern, re.IGNORECASE)) for term, pattern in SIGNAL_PATTERNS.items()]
+
+def extract_terms(text: str) -> list:
+    """Canonical fund/goal/concern terms mentioned in `text`, in SIGNAL_PATTERNS order."""
+    if not text:
+        return []
+    return [term for term, pattern in _SIGNALS if pattern.search(text)]
+
+def match_score(query_terms: set, entry_terms: list) -> float:
+    if not query_terms:
+        return 0.0
+    return len(query_terms.intersection(entry_terms)) / len(query_terms)
+
+class SpeculativeRetriever:
+    """
+    Prefetches KB and fund context while the Lead is talking, so an assist can skip
+    its embed + search stages.
+
+    Every final Lead utterance that mentions a fund, goal or concern (see
+    SIGNAL_PATTERNS) is embedded and searched in the background. The results go into
+    the session's warm cache (the "warm_cache" session field, so any worker can serve
+    the assist). At most one prefetch runs per session; utterances arriving meanwhile
+    collapse into the latest one. Hits, misses and retrieval time saved are counted in
+    session metadata (see session_stats).
+    """
+
+    def __init__(self):
+        self._rag = None
+        self._running = {}
+        self._pending = {}
+
+    @property
+    def rag(self):
+        if self._rag is None:
+            # Deferred: rag_service imports this module
+            from app.services.rag_service import RAGService
+            self._rag = RAGService()
+        return self._rag
+
+    def on_final_utterance(self, session_id: str, text: str):
+        terms = extract_terms(text)
+        if not terms:
+            return
+        if session_id in self._running:
+            self._pending[session_id] = (text, terms)
+            return
+        self._running[session_id] = asyncio.create_task(self._run(session_id, text, terms))
+
+    async def _run(self, session_id: str, text: str, terms: list):
+        try:
+            while True:
+                await self._prefetch(session_id, text, terms)
+                queued = self._pending.pop(session_id, None)
+                if queued is None:
+                    return
+                text, terms = queued
+        finally:
+            self._running.pop(session_id, None)
+
+    async def _prefetch(self, session_id: str, text: str, terms: list):
+        rag = self.rag
+        start = time.perf_counter()
+        try:
+            with rag_stage("speculate"):
+                embedding = await asyncio.to_thread(rag.get_embedding, text)
+                kb_docs, fund_docs = await asyncio.gather(
+                    asyncio.to_thread(rag.search_knowledge_base, embedding),
+                    asyncio.to_thread(rag.search_mutual_funds, embedding),
+                )
+        except Exception as e:
+            logger.warning(f"Speculative retrieval failed for {session_id}: {e}")
+            return
+        entry = {
+            "terms": terms,
+            "query": text,
+            "kb_docs": kb_docs,
+            "fund_docs": fund_docs,
+            "retrieval_ms": round((time.perf_counter() - start) * 1000, 1),
+            "fetched_at": time.time(),
+        }
+        store = get_session_store()
+        session = await store.get_session(session_id)
+        cache = [e for e in session.get("warm_cache") or [] if e["terms"] != terms and self._fresh(e)]
+        await store.update_session(session_id, {"warm_cache": (cache + [entry])[-WARM_CACHE_SIZE:]})
+        await store.incr_session(session_id, "spec_prefetches")
+        logger.debug(f"Prefetched {len(kb_docs)} KB / {len(fund_docs)} fund docs for {session_id} on {terms}")
+
+    @staticmethod
+    def _fresh(entry: dict) -> bool:
+        return time.time() - entry["fetched_at"] < WARM_CACHE_TTL
+
+    async def lookup(self, session_id: str, query: str, session: dict | None = None) -> dict | None:
+        """The warm-cache entry best covering `query`'s terms, or None. Records the hit or miss."""
+        store = get_session_store()
+        if session is None:
+            session = await store.get_session(session_id)
+        query_terms = set(extract_terms(query))
+        best, best_score = None, 0.0
+        for entry in session.get("warm_cache") or []:
+            score = match_score(query_terms, entry["terms"])
+            # Later entries win ties: they reflect the latest turn
+            if self._fresh(entry) and score >= MIN_MATCH and score >= best_score:
+                best, best_score = entry, score
+
+        if best is None:
+            SPECULATIVE_LOOKUPS.labels(result="miss").inc()
+            await store.incr_session(session_id, "spec_misses")
+            return None
+        SPECULATIVE_LOOKUPS.labels(result="hit").inc()
+        SPECULATIVE_SAVED_SECONDS.observe(best["retrieval_ms"] / 1000)
+        await store.incr_session(session_id, "spec_hits")
+        await store.incr_session(session_id, "spec_saved_ms", best["retrieval_ms"])
+        return best
+
+def session_stats(session: dict) -> dict:
+    """Per-call speculation report from session metadata."""
+    hits, misses = int(session.get("spec_hits", 0)), int(session.get("spec_misses", 0))
+    return {
+        "prefetches": int(session.get("spec_prefetches", 0)),
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / (hits + misses), 2) if hits + misses else None,
+        "saved_ms": round(float(session.get("spec_saved_ms", 0)), 1),
+    }
+
+_retriever = None
+
+def get_speculative_retriever() -> SpeculativeRetriever:
+    global _retriever
+    if _retriever is None:
+        _retriever = SpeculativeRetriever()
+    return _retriever
@@ -0,0 +1,42 @@
+import logging
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class STTProvider:
+    """
+    Interface for streaming speech-to-text backends.
+
+    `start_transcription` reads audio from `websocket_client.receive_bytes()` until the
+    client hangs up (or sends an empty message) and pushes transcript messages back with
+    `websocket_client.send_message()`, as built by `transcript_message`. The socket encodes
+    them for the client's protocol (see client_protocol).
+
+    `audio_format` describes the incoming stream (see audio_codec.AudioFormat). Providers
+    with `accepts_compressed` take containers like WebM/Opus as-is; the others only get
+    16 kHz mono PCM, decoded for them if the client sends something else.
+    """
+
+    accepts_compressed = False
+
+    async def start_transcription(self, websocket_client, language: str = "en", audio_format=None):
+        raise NotImplementedError
+
+def transcript_message(transcript: str, speaker: int | None, is_final: bool) -> dict:
+    return {
+        "type": "transcript",
+        "data": transcript,
+        "speaker": speaker,
+        "is_final": is_final
+    }
+
+def get_stt_service() -> STTProvider:
+    """Returns the provider selected by STT_PROVIDER ("deepgram" or "local")."""
+    provider = settings.STT_PROVIDER.lower()
+    if provider == "deepgram":
+        from app.services.deepgram_service import DeepgramService
+        return DeepgramService()
+    if provider == "local":
+        from app.services.local_stt_service import LocalSTTService
+        return LocalSTTService()
+    raise ValueError(f"Unknown STT_PROVIDER: {settings.STT_PROVIDER}")
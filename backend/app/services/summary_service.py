@@ -1,21 +1,23 @@
 import logging
-from langchain_groq import ChatGroq
-from app.core.config import settings
+from app.core.metrics import SUMMARY_SECONDS, timed
+from app.services.prompt_builder import STAGE_BUDGETS, compact_lines, log_prompt_tokens
+from app.services.llm_gateway import get_llm_gateway
 
 logger = logging.getLogger(__name__)
 
+# What generate_summary returns instead of raising when the LLM call fails
+SUMMARY_FAILED = "Failed to generate summary."
+
 class SummaryService:
-    def __init__(self):
-        self.llm_client = ChatGroq(
-            temperature=0,
-            model_name="llama-3.1-8b-instant",
-            api_key=settings.GROQ_API_KEY
-        )
+    def __init__(self, llm=None):
+        self.llm = llm or get_llm_gateway()
 
     async def generate_summary(self, transcript: str, lead_name: str = "Lead", agent_name: str = "Agent") -> str:
         if not transcript:
             return "No transcript available."
 
+        # Long calls keep their opening and most recent turns within the budget
+        transcript = compact_lines(transcript.splitlines(), STAGE_BUDGETS["summary"]["history"])
         prompt = f"""
         You are an expert Summarizing Agent for financial sales calls.
         Summarize the following conversation between {agent_name} and {lead_name}.
@@ -33,9 +35,10 @@ class SummaryService:
         Summary:
         """
         
+        log_prompt_tokens("summary", prompt, history=transcript)
         try:
-            response = self.llm_client.invoke(prompt)
-            return response.content.strip()
+            with timed(SUMMARY_SECONDS, "call.summary"):
+                return await self.llm.complete(prompt, "summary", agent=agent_name)
         except Exception as e:
             logger.error(f"Error generating summary: {e}")
-            return "Failed to generate summary."
+            return SUMMARY_FAILED
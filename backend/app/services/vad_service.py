@@ -0,0 +1,114 @@
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class EnergyVAD:
+    """
+    Streaming frame-energy voice activity detector for 16-bit mono PCM.
+
+    Audio is cut into fixed frames and each frame's RMS level (dBFS) is compared
+    against max(threshold_db, noise_floor + margin_db). The noise floor tracks the
+    quietest recent frames so the detector adapts to the line. Speech decisions are
+    held for `hangover_ms` so word gaps don't split an utterance. Partial frames and
+    hangover state carry across calls, so chunk boundaries don't matter.
+    """
+
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 30, threshold_db: float = -45.0,
+                 margin_db: float = 12.0, hangover_ms: int = 300):
+        self.sample_rate = sample_rate
+        self.frame_len = sample_rate * frame_ms // 1000
+        self.frame_ms = frame_ms
+        self.threshold_db = threshold_db
+        self.margin_db = margin_db
+        self.hangover_frames = max(0, hangover_ms // frame_ms)
+        self.noise_floor_db = threshold_db - margin_db
+        self._remainder = b""
+        self._since_speech = self.hangover_frames + 1
+
+    def reset(self):
+        self._remainder = b""
+        self._since_speech = self.hangover_frames + 1
+
+    def process(self, pcm: bytes):
+        """
+        Returns (frames, active): an int16 array of shape (n, frame_len) holding every
+        complete frame now available, and a bool array of length n marking speech.
+        """
+        if self._remainder:
+            pcm = self._remainder + pcm
+        frame_bytes = self.frame_len * 2
+        n = len(pcm) // frame_bytes
+        self._remainder = bytes(pcm[n * frame_bytes:])
+        frames = np.frombuffer(pcm, dtype=np.int16, count=n * self.frame_len).reshape(n, self.frame_len)
+        if n == 0:
+            return frames, np.zeros(0, dtype=bool)
+
+        level_db = self.frame_levels(frames)
+        threshold = max(self.threshold_db, self.noise_floor_db + self.margin_db)
+        speech = level_db > threshold
+
+        # Slow-moving floor from the quieter frames of this chunk
+        quiet = level_db[~speech]
+        if quiet.size:
+            self.noise_floor_db = 0.95 * self.noise_floor_db + 0.05 * float(np.percentile(quiet, 20))
+
+        # Hangover: a frame is active if speech occurred within the last `hangover_frames` frames
+        idx = np.arange(n)
+        last_speech = np.maximum.accumulate(np.where(speech, idx, -1 - self._since_speech))
+        active = (idx - last_speech) <= self.hangover_frames
+        self._since_speech = int(n - 1 - last_speech[-1])
+        return frames, active
+
+    @staticmethod
+    def frame_levels(frames: np.ndarray) -> np.ndarray:
+        x = frames.astype(np.float32) / 32768.0
+        rms = np.sqrt(np.mean(x * x, axis=1) + 1e-12)
+        return 20.0 * np.log10(rms)
+
+class SpeechGate:
+    """
+    Drops silence from a 16-bit mono PCM stream before it goes upstream.
+
+    Only frames EnergyVAD marks as speech (including its hangover) pass, plus up to
+    `preroll_ms` of the audio right before each onset so word starts aren't clipped.
+    Counts bytes in and out so the caller can report the saving.
+    """
+
+    def __init__(self, vad: EnergyVAD | None = None, preroll_ms: int = 300):
+        self.vad = vad or EnergyVAD()
+        self.preroll_frames = max(0, preroll_ms // self.vad.frame_ms)
+        self._preroll = []
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def process(self, pcm: bytes) -> bytes:
+        self.bytes_in += len(pcm)
+        frames, active = self.vad.process(pcm)
+        n = len(active)
+        if n == 0:
+            return b""
+
+        idx = np.arange(n)
+        if not active.any():
+            self._preroll = (self._preroll + [f.copy() for f in frames])[-self.preroll_frames:] if self.preroll_frames else []
+            return b""
+
+        # Distance to the next speech frame (scanning right to left) decides the in-chunk pre-roll
+        next_active = np.minimum.accumulate(np.where(active, idx, n + self.preroll_frames)[::-1])[::-1]
+        keep = active | ((next_active - idx) <= self.preroll_frames)
+
+        parts = []
+        first = int(np.argmax(active))
+        carried = self.preroll_frames - first
+        if carried > 0 and self._preroll:
+            parts.extend(f.tobytes() for f in self._preroll[-carried:])
+        parts.append(frames[keep].tobytes())
+
+        last = n - 1 - int(np.argmax(active[::-1]))
+        trailing = frames[last + 1:]
+        self._preroll = [f.copy() for f in trailing[-self.preroll_frames:]] if self.preroll_frames else []
+
+        out = b"".join(parts)
+        self.bytes_out += len(out)
+        return out
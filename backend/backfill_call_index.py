@@ -0,0 +1,34 @@
+"""
+Indexes calls recorded before the call index existed: every chat_history entry on
+investors becomes an interactions row with embedded summary chunks. Safe to re-run;
+rows are upserted by session id. Apply call_index.sql first.
+
+    python backfill_call_index.py
+"""
+import asyncio
+from app.services.call_index import CallIndexService
+
+PAGE_SIZE = 200
+
+async def backfill():
+    service = CallIndexService()
+    start, indexed = 0, 0
+    while True:
+        investors = service.supabase.table("investors")\
+            .select("investor_id, name, chat_history")\
+            .range(start, start + PAGE_SIZE - 1)\
+            .execute().data
+        for investor in investors:
+            for entry in investor.get("chat_history") or []:
+                if not isinstance(entry, dict) or not entry.get("session_id"):
+                    continue
+                await service.index_call(entry, investor.get("name"), entry.get("handling_agent"), investor.get("investor_id"))
+                indexed += 1
+        await service.flush()
+        print(f"Indexed {indexed} calls from {start + len(investors)} investors")
+        if len(investors) < PAGE_SIZE:
+            break
+        start += PAGE_SIZE
+
+if __name__ == "__main__":
+    asyncio.run(backfill())
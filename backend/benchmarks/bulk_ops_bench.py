@@ -0,0 +1,84 @@
+"""
+Rows per second for the dispatch-log maintenance scripts against the fake Supabase,
+with a per-request round trip of --db-latency-ms. "per row" is how the scripts used
+to write (one insert request per log, in a loop); the rest go through BulkTable.
+
+    python -m benchmarks.bulk_ops_bench --rows 20000 --db-latency-ms 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.bulk_ops import CHUNK_SIZE, CONCURRENCY, BulkTable
+from benchmarks.fake_upstreams import FakeUpstreams
+
+
+def make_logs(count: int, reasoning: str = "Language match with the lead") -> list:
+    return [
+        {"id": f"00000000-0000-0000-0000-{i:012d}", "lead_name": f"Lead {i}", "lead_persona": "Salaried (English)",
+         "assigned_agent": f"AGT-{i % 12:03d}", "math_score": 80, "second_score": 78, "is_override": False,
+         "reasoning": reasoning, "admin_corrected": False}
+        for i in range(count)
+    ]
+
+
+async def run(args, rows: dict) -> list:
+    logs = make_logs(args.rows)
+    table = BulkTable("ai_dispatch_logs", chunk_size=args.chunk_size, concurrency=args.concurrency)
+    results = []
+
+    sample = logs[:args.per_row_sample]
+    start = time.perf_counter()
+    for log in sample:
+        await asyncio.to_thread(lambda: table.supabase.table("ai_dispatch_logs").insert(log).execute())
+    results.append(("per row", len(sample), time.perf_counter() - start))
+    rows.clear()
+
+    start = time.perf_counter()
+    report = await table.upsert(logs)
+    results.append(("bulk upsert", report["rows"], time.perf_counter() - start))
+
+    changed = make_logs(args.rows // 10, "Admin override")
+    logs[:len(changed)] = changed
+    start = time.perf_counter()
+    dry = await BulkTable("ai_dispatch_logs", concurrency=args.concurrency, dry_run=True).upsert(logs)
+    results.append((f"dry-run diff ({dry['updated']} changed)", args.rows, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    report = await table.upsert(logs, skip_unchanged=True)
+    results.append((f"upsert changed only ({len(changed)})", args.rows, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    report = await table.delete([log["id"] for log in logs])
+    results.append(("bulk delete", report["rows"], time.perf_counter() - start))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--db-latency-ms", type=float, default=20.0)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--per-row-sample", type=int, default=100, help="Rows to time the per-row loop on")
+    args = parser.parse_args()
+
+    with FakeUpstreams({"db_table": args.db_latency_ms}) as fake:
+        rows = {}
+        fake.tables["ai_dispatch_logs"] = ("id", rows)
+        # Settings load on first use, so the fake's environment is all they see
+        os.environ.update(fake.env())
+        results = asyncio.run(run(args, rows))
+        requests = fake.stats["db_table"]
+
+    for name, count, seconds in results:
+        print(f"{name:<32} {count:>7,} rows  {seconds:7.2f}s  {count / seconds:>9,.0f} rows/s")
+    print(f"{requests:,} requests in total")
+
+
+if __name__ == "__main__":
+    main()
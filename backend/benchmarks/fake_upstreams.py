@@ -0,0 +1,430 @@
+"""
+Local stand-ins for every upstream the call pipeline talks to.
+
+- Deepgram: a websocket server that turns the PCM it receives into scripted
+  interim/final transcript events, paced by the amount of audio received.
+- Groq / OpenAI: an OpenAI-compatible /chat/completions endpoint that answers
+  the RAG, summary and analytics prompts with canned text.
+- Gemini: the batchEmbedContents endpoint, returning deterministic vectors.
+- Supabase: PostgREST RPC (match_documents / match_mutual_funds) and table
+  reads/writes. Tables listed in `FakeUpstreams.tables` keep their rows and
+  honour in./eq. filters, paging and upserts, for the bulk maintenance scripts.
+
+Everything runs on its own event loop in a background thread so the load
+driver's loop only measures the API under test.
+"""
+import asyncio
+import csv
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from collections import Counter
+from urllib.parse import parse_qs, urlparse
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from websockets.asyncio.server import serve
+
+CSV_FILE_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "comprehensive_mutual_funds_data.csv")
+
+EMBEDDING_DIM = 768
+SAMPLE_RATE = 16000
+BYTES_PER_SECOND = SAMPLE_RATE * 2  # 16-bit mono
+
+# Alternating Agent (speaker 0) / Lead (speaker 1) script, based on demo_script.md
+SCRIPT = [
+    (0, "Hello, am I speaking with Karen Smith?"),
+    (1, "Yes, this is Karen. Who is this?"),
+    (0, "Hi Karen, this is John Smith from Dash Consulting, following up on the savings plans."),
+    (1, "I'm a bit worried about market volatility. Is my money actually safe?"),
+    (0, "That's a valid concern. Our plans are principal-protected."),
+    (1, "What about liquidity? Can I withdraw it immediately in an emergency?"),
+    (0, "That is a great question. Let me check the liquidity terms on this plan."),
+    (1, "Also, which mid cap fund would you suggest for retirement?"),
+    (0, "Let me check the best retirement funds for you."),
+    (1, "Okay, send me the details by email."),
+]
+
+KB_DOCS = [
+    {
+        "id": 1,
+        "content": "High-Yield Savings Plan (Tier 1): Partial withdrawals are allowed after 3 months with a nominal fee of 1%. Full penalty-free withdrawals are available after 1 year.",
+        "metadata": {"name": "Product Sheet - High Yield Savings", "category": "Savings"},
+        "similarity": 0.82,
+    },
+    {
+        "id": 2,
+        "content": "Market Volatility Protection: All our Tier 1 savings plans are 100% principal-protected.",
+        "metadata": {"name": "Risk Policy", "category": "Safety"},
+        "similarity": 0.71,
+    },
+]
+
+
+FAKE_INVESTOR = {
+    "investor_id": "INV-BENCH",
+    "name": "Karen",
+    "age": 41,
+    "city": "Pune",
+    "occupation": "Teacher",
+    "risk_appetite": "Medium",
+    "sip_capacity": 5000,
+    "preferred_language": "English",
+    "tier": "Gold",
+    "monthly_income_est": 90000,
+    "ai_analysis_cache": None,
+    "chat_history": [{"summary": "Karen asked about tax-saving options; agent promised ELSS details."}],
+}
+FAKE_DISPATCH_LOG = {
+    "id": "bench-lead",
+    "lead_name": "Karen",
+    "lead_persona": "Cautious saver, Age 41",
+    "assigned_agent": "John",
+}
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def fake_embedding(text: str, dim: int = EMBEDDING_DIM) -> list:
+    """Deterministic unit-ish vector derived from the text hash."""
+    seed = hashlib.sha256(text.encode()).digest()
+    values = []
+    while len(values) < dim:
+        seed = hashlib.sha256(seed).digest()
+        values.extend((b - 127.5) / 127.5 for b in seed)
+    return values[:dim]
+
+
+def load_fund_rows(limit: int = 5) -> list:
+    rows = []
+    try:
+        with open(CSV_FILE_PATH, newline="") as f:
+            for i, row in enumerate(csv.DictReader(f)):
+                if i >= limit:
+                    break
+                rows.append({
+                    "id": i + 1,
+                    "scheme_name": row["scheme_name"],
+                    "category": row["category"],
+                    "returns_1yr": float(row["returns_1yr"] or 0),
+                    "metadata": row,
+                    "similarity": round(0.8 - i * 0.05, 2),
+                })
+    except FileNotFoundError:
+        pass
+    return rows
+
+
+class FakeDeepgram:
+    """
+    Emits one interim result per audio message and a final result every
+    `utterance_seconds` of received audio, cycling through SCRIPT.
+    """
+
+    def __init__(self, utterance_seconds: float = 2.0, latency_ms: float = 0.0, idle_timeout: float = 10.0):
+        self.utterance_seconds = utterance_seconds
+        self.latency_ms = latency_ms
+        # Like Deepgram, which closes a stream after ~10s without audio or KeepAlive
+        self.idle_timeout = idle_timeout
+        self.connections = 0
+        self.bytes_received = 0
+
+    def _result(self, text: str, speaker: int, start: float, duration: float, is_final: bool) -> str:
+        words = [{"word": w, "speaker": speaker} for w in text.split()]
+        return json.dumps({
+            "type": "Results",
+            "start": round(start, 3),
+            "duration": round(duration, 3),
+            "is_final": is_final,
+            "speech_final": is_final,
+            "channel": {"alternatives": [{"transcript": text, "words": words}]},
+        })
+
+    async def handler(self, connection):
+        self.connections += 1
+        params = parse_qs(urlparse(connection.request.path).query)
+        if params.get("encoding", ["linear16"])[0] == "linear16":
+            bytes_per_second = int(params.get("sample_rate", [SAMPLE_RATE])[0]) * 2
+        else:
+            bytes_per_second = BYTES_PER_SECOND
+        utterance_bytes = int(self.utterance_seconds * bytes_per_second)
+
+        turn = 0
+        pending = 0
+        offset = 0.0
+
+        async def emit(is_final: bool):
+            speaker, text = SCRIPT[turn % len(SCRIPT)]
+            if not is_final:
+                words = text.split()
+                text = " ".join(words[: max(1, len(words) * pending // utterance_bytes)])
+            if self.latency_ms:
+                await asyncio.sleep(self.latency_ms / 1000)
+            await connection.send(self._result(text, speaker, offset, pending / bytes_per_second, is_final))
+
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(connection.recv(), timeout=self.idle_timeout)
+                except asyncio.TimeoutError:
+                    break
+                if isinstance(message, str):
+                    if json.loads(message).get("type") != "CloseStream":
+                        continue  # KeepAlive
+                    message = b""
+                if not message:
+                    if pending:
+                        await emit(True)
+                    break
+                self.bytes_received += len(message)
+                pending += len(message)
+                if pending >= utterance_bytes:
+                    await emit(True)
+                    offset += pending / bytes_per_second
+                    pending = 0
+                    turn += 1
+                else:
+                    await emit(False)
+        except Exception:
+            pass
+        await connection.close()
+
+
+def filter_values(value: str) -> set:
+    """The values a PostgREST `eq.x` or `in.(a,"b,c")` filter matches, as strings."""
+    op, _, operand = value.partition(".")
+    if op == "eq":
+        return {operand}
+    if op == "in":
+        return set(next(csv.reader([operand[1:-1]])))
+    raise HTTPException(status_code=400, detail=f"fake PostgREST has no '{op}' filter")
+
+def table_request(rows: dict, key: str, method: str, params, body) -> list:
+    """Serves one request on a stateful fake table: `rows` maps str(key value) to the row."""
+    if method == "POST":
+        for row in body if isinstance(body, list) else [body]:
+            rows[str(row[key])] = {**rows.get(str(row[key]), {}), **row}
+        return []
+    filters = {
+        column: filter_values(value) for column, value in params.items()
+        if column not in ("select", "order", "offset", "limit", "columns", "on_conflict")
+    }
+    if list(filters) == [key]:
+        candidates = [rows[value] for value in sorted(filters[key]) if value in rows]
+    else:
+        candidates = [row for _, row in sorted(rows.items())]
+    matched = [row for row in candidates if all(str(row.get(column)) in values for column, values in filters.items())]
+    if method == "DELETE":
+        for row in matched:
+            del rows[str(row[key])]
+        return []
+    offset = int(params.get("offset", 0))
+    matched = matched[offset:offset + int(params.get("limit", len(matched)))]
+    select = params.get("select", "*")
+    if select != "*":
+        columns = select.split(",")
+        matched = [{column: row.get(column) for column in columns} for row in matched]
+    return matched
+
+def build_http_app(latency_ms: dict, stats: Counter, faults: dict | None = None, tables: dict | None = None) -> FastAPI:
+    """
+    OpenAI-compatible chat, Gemini embeddings and Supabase PostgREST on one app.
+    `faults` maps a route ("llm", "embed", ...) to an HTTP status to fail it with.
+    `tables` maps a table name to (key column, {key: row}) for tables that keep their rows.
+    """
+    app = FastAPI()
+    faults = faults if faults is not None else {}
+    tables = tables if tables is not None else {}
+    fund_rows = load_fund_rows()
+    # pgvector columns come back from PostgREST as text
+    investor = {**FAKE_INVESTOR, "embedding": json.dumps(fake_embedding(FAKE_INVESTOR["name"]))}
+
+    async def delay(route: str):
+        stats[route] += 1
+        ms = latency_ms.get(route, 0)
+        if ms:
+            await asyncio.sleep(ms / 1000)
+        if faults.get(route):
+            raise HTTPException(status_code=faults[route], detail=f"fake {route} fault")
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        await delay("llm")
+
+        if '"trigger_valid"' in prompt:
+            content = json.dumps({
+                "trigger_valid": True,
+                "intent_type": "recommendation",
+                "search_query": "mid cap funds for retirement",
+                "mentioned_funds": [],
+                "filters": {"category": None, "sub_category": None, "max_risk_level": 6,
+                            "min_returns_1yr": None, "max_expense_ratio": None, "max_min_sip": None},
+            })
+        elif "Return ONLY valid JSON" in prompt:
+            content = json.dumps({
+                "sentiment": "Positive",
+                "objections": ["market volatility"],
+                "adherence": "Yes",
+                "next_steps": ["Email plan details"],
+            })
+        elif "Summary:" in prompt:
+            content = "Lead asked about safety and liquidity; agent shared plan terms and will email details."
+        else:
+            content = "Partial withdrawals are allowed after 3 months with a 1% fee, and full withdrawals after a year."
+
+        return {
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4, "total_tokens": (len(prompt) + len(content)) // 4},
+        }
+
+    @app.post("/v1beta/models/{model_action}")
+    async def gemini_embed(model_action: str, request: Request):
+        body = await request.json()
+        await delay("embed")
+        requests = body.get("requests") or [body]
+        embeddings = []
+        for req in requests:
+            text = " ".join(p.get("text", "") for p in req.get("content", {}).get("parts", []))
+            embeddings.append({"values": fake_embedding(text)})
+        if model_action.endswith(":embedContent"):
+            return {"embedding": embeddings[0]}
+        return {"embeddings": embeddings}
+
+    @app.post("/rest/v1/rpc/{function}")
+    async def supabase_rpc(function: str):
+        await delay("db_rpc")
+        if function == "match_documents":
+            return KB_DOCS
+        if function == "match_mutual_funds":
+            return fund_rows
+        return []
+
+    @app.api_route("/rest/v1/{table}", methods=["GET", "POST", "PATCH", "DELETE"])
+    async def supabase_table(table: str, request: Request):
+        await delay("db_table")
+        if table in tables:
+            key, rows = tables[table]
+            body = await request.json() if request.method == "POST" else None
+            return table_request(rows, key, request.method, request.query_params, body)
+        if request.method in ("POST", "PATCH"):
+            body = await request.json()
+            return body if isinstance(body, list) else [body]
+        if table == "investors":
+            return [investor]
+        if table == "ai_dispatch_logs":
+            return [FAKE_DISPATCH_LOG]
+        if table == "mutual_funds":
+            return fund_rows[:1]
+        return []
+
+    @app.get("/__fake__/stats")
+    async def get_stats():
+        return dict(stats)
+
+    return app
+
+
+class FakeUpstreams:
+    """
+    Starts the fake Deepgram websocket and the fake HTTP APIs in a background
+    thread. Use as a context manager; `env()` returns the settings overrides
+    that point the API at them.
+    """
+
+    def __init__(self, latency_ms: dict | None = None, utterance_seconds: float = 2.0, deepgram_latency_ms: float = 0.0, deepgram_idle_timeout: float = 10.0):
+        self.latency_ms = latency_ms or {}
+        self.faults = {}  # route -> HTTP status, editable while running
+        self.tables = {}  # table -> (key column, {key: row}), kept between requests
+        self.stats = Counter()
+        self.deepgram = FakeDeepgram(utterance_seconds, deepgram_latency_ms, deepgram_idle_timeout)
+        self.http_port = free_port()
+        self.ws_port = free_port()
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._stop = None
+
+    def env(self) -> dict:
+        http = f"http://127.0.0.1:{self.http_port}"
+        return {
+            "SUPABASE_URL": http,
+            # supabase-py only checks that the key looks like a JWT
+            "SUPABASE_KEY": "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYmVuY2gifQ.fake",
+            "DEEPGRAM_API_KEY": "fake",
+            "GROQ_API_KEY": "fake",
+            "OPENROUTER_EMBEDDING_KEY": "fake",
+            "GOOGLE_API_KEY": "fake",
+            "DEEPGRAM_URL": f"ws://127.0.0.1:{self.ws_port}/v1/listen",
+            "GROQ_BASE_URL": http,
+            "LLM_FALLBACK_BASE_URL": f"{http}/openai/v1",
+            "GOOGLE_API_BASE_URL": http,
+        }
+
+    def build_app(self) -> FastAPI:
+        return build_http_app(self.latency_ms, self.stats, self.faults, self.tables)
+
+    async def _serve(self):
+        self._stop = asyncio.Event()
+        config = uvicorn.Config(
+            self.build_app(),
+            host="127.0.0.1",
+            port=self.http_port,
+            log_level="warning",
+            lifespan="off",
+        )
+        http_server = uvicorn.Server(config)
+        http_task = asyncio.create_task(http_server.serve())
+        async with serve(self.deepgram.handler, "127.0.0.1", self.ws_port, max_size=None):
+            while not http_server.started:
+                await asyncio.sleep(0.01)
+            self._ready.set()
+            await self._stop.wait()
+        http_server.should_exit = True
+        await http_task
+
+    def start(self):
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self._serve())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="fake-upstreams", daemon=True)
+        self._thread.start()
+        if not self._ready.wait(timeout=15):
+            raise RuntimeError("Fake upstreams failed to start")
+        return self
+
+    def stop(self):
+        if self._loop and self._stop:
+            self._loop.call_soon_threadsafe(self._stop.set)
+        if self._thread:
+            self._thread.join(timeout=10)
+
+    def snapshot(self) -> dict:
+        return {
+            **dict(self.stats),
+            "deepgram_connections": self.deepgram.connections,
+            "deepgram_bytes": self.deepgram.bytes_received,
+        }
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
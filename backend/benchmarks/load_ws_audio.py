@@ -0,0 +1,335 @@
+"""
+Concurrent-call load benchmark for /ws/audio and /assist.
+
+Starts the fake upstreams, launches the API in a subprocess pointed at them,
+then drives N concurrent sessions that stream the checked-in audio_*.wav
+recordings. Whenever a final transcript contains the trigger phrase the
+session fires /assist, and /end-call is hit after hang-up. Runs fully offline.
+
+    cd backend
+    python -m benchmarks.load_ws_audio --sessions 20 --speed 4 --seconds 20
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from collections import defaultdict
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+from websockets.asyncio.client import connect
+
+from app.services.client_protocol import BinaryDecoder
+from benchmarks.fake_upstreams import FakeUpstreams, free_port
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+TRIGGER_WORD = "let me check"
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(values: list) -> dict:
+    return {
+        "count": len(values),
+        "p50": round(percentile(values, 50), 2),
+        "p95": round(percentile(values, 95), 2),
+        "p99": round(percentile(values, 99), 2),
+        "max": round(max(values), 2) if values else 0.0,
+    }
+
+
+def histogram_quantiles(metrics_text: str, prefix: str = "copilot_") -> dict:
+    """
+    Server-side per-stage latency from the API's /metrics histograms, one row per
+    histogram/label set. Quantiles are interpolated within buckets, like PromQL's
+    histogram_quantile.
+    """
+    rows = {}
+    for family in text_string_to_metric_families(metrics_text):
+        if family.type != "histogram" or not family.name.startswith(prefix):
+            continue
+        series = defaultdict(list)
+        for sample in family.samples:
+            if sample.name.endswith("_bucket"):
+                labels = {k: v for k, v in sample.labels.items() if k != "le"}
+                key = family.name[len(prefix):] + "".join(f"[{v}]" for v in labels.values())
+                series[key].append((float(sample.labels["le"]), sample.value))
+        for key, buckets in series.items():
+            buckets.sort()
+            total = buckets[-1][1]
+            if not total:
+                continue
+
+            def quantile(q):
+                rank = q * total
+                prev_le, prev_count = 0.0, 0.0
+                for le, count in buckets:
+                    if count >= rank:
+                        if le == float("inf"):
+                            return prev_le
+                        return prev_le + (le - prev_le) * (rank - prev_count) / max(count - prev_count, 1e-9)
+                    prev_le, prev_count = le, count
+                return prev_le
+
+            rows[key] = {
+                "count": int(total),
+                "p50": round(quantile(0.50) * 1000, 2),
+                "p95": round(quantile(0.95) * 1000, 2),
+                "p99": round(quantile(0.99) * 1000, 2),
+            }
+    return rows
+
+
+def load_pcm(path: str, seconds: float) -> bytes:
+    with wave.open(path, "rb") as wf:
+        frames = wf.readframes(int(wf.getframerate() * seconds) if seconds else wf.getnframes())
+    return frames
+
+
+class LoadRun:
+    def __init__(self, args):
+        self.args = args
+        self.stages = defaultdict(list)  # stage -> latencies in ms
+        self.errors = defaultdict(int)
+        self.assist_status = defaultdict(int)
+        self.speculative_hits = 0
+        self.audio_seconds = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def record(self, stage: str, started: float):
+        self.stages[stage].append((time.perf_counter() - started) * 1000)
+
+    async def run_session(self, index: int, pcm: bytes, base_url: str, ws_url: str, http: httpx.AsyncClient):
+        args = self.args
+        session_id = f"bench-{index}-{int(time.time() * 1000)}"
+        query = f"session_id={session_id}&agent_name=John&lead_name=Karen&lead_id=bench-lead-{index}&protocol={args.protocol}"
+        decoder = BinaryDecoder()
+        chunk_bytes = int(16000 * 2 * args.chunk_ms / 1000)
+        chunk_interval = args.chunk_ms / 1000 / args.speed
+        expected_finals = max(1, int(len(pcm) / (16000 * 2) // args.utterance_seconds))
+        assists = []
+        last_send = [0.0]
+        finals = 0
+        done = asyncio.Event()
+
+        async def assist(trigger: str):
+            started = time.perf_counter()
+            try:
+                res = await http.post(f"{base_url}/assist", json={"session_id": session_id, "trigger_word": trigger})
+                self.record("assist", started)
+                body = res.json()
+                self.assist_status[body.get("status", res.status_code)] += 1
+                self.speculative_hits += bool(body.get("speculative_hit"))
+            except Exception as e:
+                self.errors[f"assist:{type(e).__name__}"] += 1
+
+        started = time.perf_counter()
+        try:
+            async with connect(f"{ws_url}/ws/audio?{query}", max_size=None, open_timeout=30) as ws:
+                self.record("ws_connect", started)
+
+                async def sender():
+                    for offset in range(0, len(pcm), chunk_bytes):
+                        chunk = pcm[offset:offset + chunk_bytes]
+                        last_send[0] = time.perf_counter()
+                        await ws.send(chunk)
+                        self.bytes_sent += len(chunk)
+                        await asyncio.sleep(chunk_interval)
+                    self.audio_seconds += len(pcm) / (16000 * 2)
+
+                async def receiver():
+                    nonlocal finals
+                    got_first = False
+                    async for raw in ws:
+                        self.bytes_received += len(raw)
+                        msg = decoder.decode(raw) if isinstance(raw, bytes) else json.loads(raw)
+                        if msg is None or msg.get("type") != "transcript":
+                            continue
+                        now = time.perf_counter()
+                        if not got_first:
+                            got_first = True
+                            self.stages["first_transcript"].append((now - started) * 1000)
+                        stage = "final_transcript" if msg.get("is_final") else "interim_transcript"
+                        self.stages[stage].append((now - last_send[0]) * 1000)
+                        if msg.get("is_final"):
+                            finals += 1
+                            if TRIGGER_WORD in msg.get("data", "").lower():
+                                assists.append(asyncio.create_task(assist(TRIGGER_WORD)))
+                            if finals >= expected_finals:
+                                done.set()
+                                return
+
+                recv_task = asyncio.create_task(receiver())
+                await sender()
+                try:
+                    await asyncio.wait_for(done.wait(), timeout=args.drain_timeout)
+                except asyncio.TimeoutError:
+                    self.errors["final_transcript_timeout"] += 1
+                recv_task.cancel()
+            if assists:
+                await asyncio.gather(*assists)
+
+            end_started = time.perf_counter()
+            res = await http.post(f"{base_url}/end-call", json={"session_id": session_id})
+            if res.status_code == 200:
+                self.record("end_call", end_started)
+            else:
+                self.errors[f"end_call:{res.status_code}"] += 1
+        except Exception as e:
+            self.errors[f"session:{type(e).__name__}"] += 1
+
+        self.record("session_total", started)
+
+
+def start_api(env: dict, port: int, workdir: str) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.serve_app", "--port", str(port), "--workdir", workdir],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **env},
+    )
+
+
+async def wait_ready(base_url: str, proc: subprocess.Popen, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"API exited with code {proc.returncode}")
+            try:
+                if (await http.get(f"{base_url}/")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError("API did not become ready")
+
+
+async def drive(args, base_url: str, ws_url: str) -> LoadRun:
+    files = sorted(glob.glob(os.path.join(args.audio_dir, "audio_*.wav")))
+    if not files:
+        raise FileNotFoundError(f"No audio_*.wav files in {args.audio_dir}")
+    pcms = [load_pcm(path, args.seconds) for path in files]
+
+    run = LoadRun(args)
+    limits = httpx.Limits(max_connections=args.sessions * 2)
+    async with httpx.AsyncClient(timeout=60, limits=limits) as http:
+        await http.post(f"{base_url}/__bench__/reset")
+        wall = time.perf_counter()
+        await asyncio.gather(*(
+            run.run_session(i, pcms[i % len(pcms)], base_url, ws_url, http)
+            for i in range(args.sessions)
+        ))
+        run.wall_seconds = time.perf_counter() - wall
+        run.server = (await http.get(f"{base_url}/__bench__/stats")).json()
+        run.server_stages = histogram_quantiles((await http.get(f"{base_url}/metrics")).text)
+    return run
+
+
+def build_report(run: LoadRun, upstream: dict) -> dict:
+    server = run.server
+    return {
+        "sessions": run.args.sessions,
+        "speed": run.args.speed,
+        "wall_seconds": round(run.wall_seconds, 2),
+        "audio_seconds": round(run.audio_seconds, 1),
+        "bytes_sent": run.bytes_sent,
+        "protocol": run.args.protocol,
+        "bytes_received": run.bytes_received,
+        "stages_ms": {stage: summarize(values) for stage, values in sorted(run.stages.items())},
+        "server_stages_ms": run.server_stages,
+        "assist_status": dict(run.assist_status),
+        "speculative_hits": run.speculative_hits,
+        "errors": dict(run.errors),
+        "server": {
+            "loop_lag_ms": summarize(server["loop_lag_ms"]),
+            "cpu_seconds": round(server["cpu_seconds"], 2),
+            "cpu_utilization": round(server["cpu_seconds"] / max(server["wall_seconds"], 1e-9), 3),
+            "rss_mb": round(server["rss_mb"], 1),
+        },
+        "upstream_calls": upstream,
+    }
+
+
+def print_report(report: dict):
+    print(f"\nSessions: {report['sessions']}  speed: {report['speed']}x  wall: {report['wall_seconds']}s  audio: {report['audio_seconds']}s")
+    print(f"{'stage':<22}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    rows = dict(report["stages_ms"], loop_lag=report["server"]["loop_lag_ms"])
+    for stage, s in rows.items():
+        print(f"{stage:<22}{s['count']:>7}{s['p50']:>10}{s['p95']:>10}{s['p99']:>10}{s['max']:>10}")
+    if report["server_stages_ms"]:
+        print(f"{'server stage (/metrics)':<42}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}")
+        for stage, s in report["server_stages_ms"].items():
+            print(f"{stage:<42}{s['count']:>7}{s['p50']:>10}{s['p95']:>10}{s['p99']:>10}")
+    server = report["server"]
+    print(f"CPU: {server['cpu_seconds']}s ({server['cpu_utilization'] * 100:.1f}% of one core)  RSS: {server['rss_mb']} MB")
+    print(f"Downstream ({report['protocol']}): {report['bytes_received']} bytes")
+    print(f"Assist: {report['assist_status']}  Speculative hits: {report['speculative_hits']}  Errors: {report['errors'] or 'none'}")
+    print(f"Upstream calls: {report['upstream_calls']}")
+
+
+def run_benchmark(args) -> dict:
+    latency = {"llm": args.llm_latency_ms, "embed": args.embed_latency_ms, "db_rpc": args.db_latency_ms, "db_table": args.db_latency_ms}
+    with FakeUpstreams(latency, args.utterance_seconds, args.deepgram_latency_ms, args.deepgram_idle_timeout) as fakes:
+        port = free_port()
+        with tempfile.TemporaryDirectory() as workdir:
+            env = fakes.env()
+            if args.record_dir:
+                # Recordings for benchmarks.replay_session; the API runs in workdir
+                env["SESSION_RECORD_DIR"] = os.path.abspath(args.record_dir)
+            proc = start_api(env, port, workdir)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                asyncio.run(wait_ready(base_url, proc))
+                run = asyncio.run(drive(args, base_url, f"ws://127.0.0.1:{port}"))
+            finally:
+                proc.terminate()
+                proc.wait(timeout=15)
+        return build_report(run, fakes.snapshot())
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load benchmark for /ws/audio + /assist against local fake upstreams")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent calls")
+    parser.add_argument("--seconds", type=float, default=20.0, help="Seconds of each recording to stream (0 = whole file)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed multiplier (1 = real time)")
+    parser.add_argument("--chunk-ms", type=int, default=250, help="Audio per websocket message, as the browser sends")
+    parser.add_argument("--utterance-seconds", type=float, default=2.0, help="Audio per scripted final transcript")
+    parser.add_argument("--llm-latency-ms", type=float, default=150.0)
+    parser.add_argument("--embed-latency-ms", type=float, default=60.0)
+    parser.add_argument("--db-latency-ms", type=float, default=40.0)
+    parser.add_argument("--deepgram-latency-ms", type=float, default=0.0)
+    parser.add_argument("--deepgram-idle-timeout", type=float, default=10.0, help="Fake Deepgram closes idle streams after this long, like the real one")
+    parser.add_argument("--drain-timeout", type=float, default=30.0)
+    parser.add_argument("--audio-dir", default=BACKEND_DIR)
+    parser.add_argument("--protocol", choices=("json", "binary"), default="json", help="Downstream message encoding")
+    parser.add_argument("--record-dir", default=None, help="Record every session here for benchmarks.replay_session")
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmark(args)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
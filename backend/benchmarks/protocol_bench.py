@@ -0,0 +1,66 @@
+"""
+Downstream bytes and encode CPU per call for the /ws/audio client protocols.
+
+Replays the fake call script as a Deepgram-like stream (one interim per new word, then
+the final) through the JSON and binary encoders. "json (before)" is the old socket path,
+which parsed every provider JSON string and serialized the finals again.
+
+    python -m benchmarks.protocol_bench --calls 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.client_protocol import BinaryDecoder, BinaryEncoder, JSONEncoder
+from benchmarks.fake_upstreams import SCRIPT
+
+NAMES = {0: "John", 1: "Karen"}
+
+
+def call_messages() -> list:
+    messages = []
+    for speaker, text in SCRIPT:
+        words = text.split()
+        for n in range(1, len(words)):
+            messages.append({"type": "transcript", "data": " ".join(words[:n]), "speaker": speaker, "is_final": False})
+        messages.append({"type": "transcript", "data": text, "speaker": speaker, "is_final": True, "speaker_name": NAMES[speaker]})
+    return messages
+
+
+def legacy_encode(message: dict) -> list:
+    # The provider serialized, the socket parsed; finals were serialized again with the speaker name
+    data = json.dumps(message)
+    msg = json.loads(data)
+    return [json.dumps(msg) if msg.get("is_final") else data]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    messages = call_messages()
+    cases = [("json (before)", lambda: legacy_encode), ("json", lambda: JSONEncoder().encode), ("binary", lambda: BinaryEncoder().encode)]
+    for name, make in cases:
+        sent = 0
+        start = time.process_time()
+        for _ in range(args.calls):
+            encode = make()
+            for message in messages:
+                sent += sum(len(frame) for frame in encode(message))
+        seconds = time.process_time() - start
+        print(f"{name:<14} {sent / args.calls:>8,.0f} bytes/call  {seconds / (args.calls * len(messages)) * 1e6:6.2f} us/message")
+
+    # The binary stream decodes back to the JSON protocol's messages
+    decoder, encoder = BinaryDecoder(), BinaryEncoder()
+    decoded = [decoder.decode(frame) for message in messages for frame in encoder.encode(message)]
+    assert [m for m in decoded if m is not None] == messages
+    print(f"{len(messages)} messages per call, binary round trip OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Recall@k, memory and latency of the int8 QuantizedIndex against exact float32 cosine
+search, on synthetic clustered embeddings written to a temporary directory.
+
+    python -m benchmarks.quantized_bench --rows 100000 --dim 768 --queries 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from app.services.quantized_index import QuantizedIndex, normalize, save_index
+
+
+def synthetic(rows: int, dim: int, queries: int, seed: int = 0):
+    """Vectors around a few hundred topic centres, like embeddings of related documents."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((256, dim), dtype=np.float32)
+    data = centres[rng.integers(0, len(centres), rows)] + 0.6 * rng.standard_normal((rows, dim), dtype=np.float32)
+    # Queries are new points on the same topics, so their neighbours are close calls
+    qs = centres[rng.integers(0, len(centres), queries)] + 0.6 * rng.standard_normal((queries, dim), dtype=np.float32)
+    return normalize(data), normalize(qs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    data, queries = synthetic(args.rows, args.dim, args.queries)
+    with tempfile.TemporaryDirectory() as directory:
+        save_index(directory, "embeddings", data)
+        index = QuantizedIndex(directory)
+
+        truth, exact_times = [], []
+        for q in queries:
+            start = time.perf_counter()
+            scores = data @ q
+            top = np.argpartition(-scores, args.k - 1)[:args.k]
+            exact_times.append(time.perf_counter() - start)
+            truth.append(set(top.tolist()))
+
+        print(f"{args.rows} x {args.dim}d, {args.queries} queries, recall@{args.k}")
+        print(f"{'method':<24}{'recall':>8}{'scan MB':>10}{'ms/query':>10}")
+        print(f"{'exact float32':<24}{1.0:>8.3f}{data.nbytes / 2**20:>10.1f}{np.median(exact_times) * 1000:>10.2f}")
+        for label, rescore in (("int8, no rescore", args.k), ("int8 + rescore 4k", args.k * 4), ("int8 + rescore 16k", args.k * 16)):
+            hits, times = 0, []
+            for q, expected in zip(queries, truth):
+                start = time.perf_counter()
+                ids, _ = index.search(q, args.k, rescore=rescore)
+                times.append(time.perf_counter() - start)
+                hits += len(expected & set(ids.tolist()))
+            print(f"{label:<24}{hits / (args.k * len(queries)):>8.3f}{index.scan_bytes / 2**20:>10.1f}{np.median(times) * 1000:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+"""
+Deterministic replay of a recorded call (SESSION_RECORD_DIR, see app/core/session_recorder.py).
+
+Starts the API in a subprocess against replay upstreams that answer from the recording:
+Deepgram emits the recorded transcript events at the same point in the audio stream, and
+the LLM and Supabase endpoints return the recorded responses after their recorded latency
+(scaled by --speed). The driver streams the recorded audio and fires /assist and /end-call
+at their recorded offsets; an /assist also waits for as many final transcripts as the call
+had when it was made, so its prompts see the same conversation. It then reports client and
+server latency, CPU and loop lag, optionally against a baseline report from another commit.
+Embeddings aren't recorded; the replay serves the same deterministic vectors as the fakes.
+
+    cd backend
+    python -m benchmarks.replay_session recordings/abc123.rec --speed 4 --json before.json
+    python -m benchmarks.replay_session recordings/abc123.rec --speed 4 --baseline before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from collections import Counter, defaultdict, deque
+from urllib.parse import urlencode
+
+import httpx
+from fastapi import FastAPI, Request, Response
+from websockets.asyncio.client import connect
+
+from app.core.session_recorder import prompt_key, read_records, template_key
+from benchmarks.fake_upstreams import FakeUpstreams, fake_embedding, free_port
+from benchmarks.load_ws_audio import histogram_quantiles, start_api, summarize, wait_ready
+
+CONNECT_PARAMS = ("agent_name", "lead_name", "lead_id", "language", "codec", "sample_rate", "channels")
+
+
+class Recording:
+    """A recording split into what the client sent and what each upstream answered."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.start = None
+        self.audio = []  # (seconds from start, chunk)
+        self.transcripts = []  # (upstream bytes when emitted, transcript message)
+        self.assists = []  # (seconds from start, final transcripts before it, trigger word)
+        self.end_call = None  # seconds from start
+        self.llm = []
+        self.db = []
+        self.end = {}
+        origin = None
+        for kind, at, payload in read_records(path):
+            if kind == "start":
+                origin, self.start = at, payload
+                continue
+            if origin is None:
+                continue
+            offset = at - origin
+            if kind == "audio":
+                self.audio.append((offset, payload))
+            elif kind == "transcript":
+                if payload["message"].get("type") == "transcript":
+                    self.transcripts.append((payload["upstream_bytes"], payload["message"]))
+            elif kind == "assist":
+                self.assists.append((offset, payload.get("transcript_lines", 0), payload.get("trigger_word")))
+            elif kind == "end_call":
+                self.end_call = offset
+            elif kind == "llm":
+                self.llm.append(payload)
+            elif kind == "db":
+                self.db.append(payload)
+            elif kind == "end":
+                self.end = payload
+        if self.start is None:
+            raise ValueError(f"{path} has no start record (the socket failed before audio)")
+
+    @property
+    def finals(self) -> list:
+        return [m.get("data") for _, m in self.transcripts if m.get("is_final")]
+
+
+class ResponsePool:
+    """
+    Recorded responses, each handed out once: by exact key first (prompt hash, method and
+    full path), else the next unused one of the same group (prompt template, method and
+    path without the query) in recorded order, else the
+    group's last response again. The fallbacks keep a replay going when a commit changes
+    a prompt or a query, or makes more requests (e.g. speculative retrieval).
+    """
+
+    def __init__(self, records: list, key, group):
+        self.records = records
+        self.used = [False] * len(records)
+        self.by_key = defaultdict(deque)
+        self.by_group = defaultdict(deque)
+        self.last = {}
+        for i, record in enumerate(records):
+            self.by_key[key(record)].append(i)
+            self.by_group[group(record)].append(i)
+            self.last[group(record)] = record
+
+    def take(self, key, group) -> tuple[dict | None, str]:
+        for queue, how in ((self.by_key.get(key), "exact"), (self.by_group.get(group), "order")):
+            while queue:
+                i = queue.popleft()
+                if not self.used[i]:
+                    self.used[i] = True
+                    return self.records[i], how
+        if group in self.last:
+            return self.last[group], "reused"
+        return None, "miss"
+
+
+class ReplayDeepgram:
+    """Emits each recorded transcript event once as much audio has arrived as when it was recorded."""
+
+    def __init__(self, transcripts: list, idle_timeout: float = 10.0):
+        self.transcripts = transcripts
+        self.idle_timeout = idle_timeout
+        self.connections = 0
+        self.bytes_received = 0
+
+    @staticmethod
+    def _result(msg: dict) -> str:
+        speaker = {} if msg.get("speaker") is None else {"speaker": msg["speaker"]}
+        words = [{"word": w, **speaker} for w in (msg.get("data") or "").split()]
+        return json.dumps({
+            "type": "Results",
+            "is_final": bool(msg.get("is_final")),
+            "speech_final": bool(msg.get("is_final")),
+            "channel": {"alternatives": [{"transcript": msg.get("data") or "", "words": words}]},
+        })
+
+    async def handler(self, connection):
+        self.connections += 1
+        pending = deque(self.transcripts)
+        received = 0
+
+        async def flush(upto: float):
+            while pending and pending[0][0] <= upto:
+                await connection.send(self._result(pending.popleft()[1]))
+
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(connection.recv(), timeout=self.idle_timeout)
+                except asyncio.TimeoutError:
+                    break
+                if isinstance(message, str):
+                    if json.loads(message).get("type") != "CloseStream":
+                        continue  # KeepAlive / Finalize
+                    message = b""
+                if not message:
+                    await flush(float("inf"))
+                    break
+                received += len(message)
+                self.bytes_received += len(message)
+                await flush(received)
+        except Exception:
+            pass
+        await connection.close()
+
+
+def build_replay_app(recording: Recording, stats: Counter, speed: float, upstream_latency: bool = True) -> FastAPI:
+    """The fake upstreams' routes, answered from the recording instead of canned data."""
+    app = FastAPI()
+    llm = ResponsePool(recording.llm, lambda r: r["prompt"], lambda r: r["template"])
+    db = ResponsePool(recording.db, lambda r: (r["method"], r["path"]), lambda r: (r["method"], r["path"].split("?")[0]))
+
+    async def replay(route: str, pool: ResponsePool, key, group) -> dict | None:
+        found, how = pool.take(key, group)
+        stats[f"{route}_{how}"] += 1
+        if found is not None and upstream_latency:
+            await asyncio.sleep(found["seconds"] / speed)
+        return found
+
+    @app.post("/openai/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        found = await replay("llm", llm, prompt_key(prompt), template_key(prompt))
+        content = found["response"] if found else ""
+        return {
+            "id": "chatcmpl-replay",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "replay"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        }
+
+    @app.post("/v1beta/models/{model_action}")
+    async def gemini_embed(model_action: str, request: Request):
+        body = await request.json()
+        stats["embed"] += 1
+        embeddings = [
+            {"values": fake_embedding(" ".join(p.get("text", "") for p in req.get("content", {}).get("parts", [])))}
+            for req in body.get("requests") or [body]
+        ]
+        if model_action.endswith(":embedContent"):
+            return {"embedding": embeddings[0]}
+        return {"embeddings": embeddings}
+
+    @app.api_route("/rest/v1/{path:path}", methods=["GET", "POST", "PATCH", "DELETE"])
+    async def supabase(path: str, request: Request):
+        full = request.scope["raw_path"].decode()
+        if request.scope["query_string"]:
+            full += "?" + request.scope["query_string"].decode()
+        found = await replay("db", db, (request.method, full), (request.method, full.split("?")[0]))
+        if found is None:
+            return []
+        return Response(content=found["body"], status_code=found["status"], media_type="application/json")
+
+    @app.get("/__fake__/stats")
+    async def get_stats():
+        return dict(stats)
+
+    return app
+
+
+class ReplayUpstreams(FakeUpstreams):
+    """FakeUpstreams serving one recording; `stats` counts exact, order-matched and missed responses."""
+
+    def __init__(self, recording: Recording, speed: float = 1.0, upstream_latency: bool = True):
+        super().__init__()
+        self.recording = recording
+        self.speed = speed
+        self.upstream_latency = upstream_latency
+        self.deepgram = ReplayDeepgram(recording.transcripts)
+
+    def build_app(self) -> FastAPI:
+        return build_replay_app(self.recording, self.stats, self.speed, self.upstream_latency)
+
+
+async def wait_warm(base_url: str, timeout: float = 60.0):
+    """Waits out the startup warm-up, so its probes don't draw on the recorded responses' latency."""
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while time.monotonic() < deadline:
+            if (await http.get(f"{base_url}/ready")).status_code == 200:
+                return
+            await asyncio.sleep(0.1)
+
+
+async def drive(recording: Recording, args, base_url: str, ws_url: str) -> dict:
+    start = recording.start
+    session_id = f"replay-{start['session_id']}-{int(time.time() * 1000)}"
+    query = urlencode({"session_id": session_id, **{k: start[k] for k in CONNECT_PARAMS if start.get(k) is not None}})
+    stages = defaultdict(list)
+    errors = Counter()
+    assist_status = Counter()
+    finals = []
+    expected = len(recording.finals)
+    progress = asyncio.Condition()
+    done = asyncio.Event()
+    last_send = [0.0]
+
+    def record(stage: str, started: float):
+        stages[stage].append((time.perf_counter() - started) * 1000)
+
+    async with httpx.AsyncClient(timeout=60) as http:
+        await http.post(f"{base_url}/__bench__/reset")
+        started = time.perf_counter()
+
+        async def at(offset: float):
+            delay = started + offset / args.speed - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        async def assist(offset: float, lines: int, trigger: str | None):
+            await at(offset)
+            try:
+                async with progress:
+                    await asyncio.wait_for(progress.wait_for(lambda: len(finals) >= lines), args.drain_timeout)
+            except asyncio.TimeoutError:
+                errors["assist_anchor_timeout"] += 1
+            sent = time.perf_counter()
+            try:
+                res = await http.post(f"{base_url}/assist", json={"session_id": session_id, "trigger_word": trigger})
+                record("assist", sent)
+                assist_status[res.json().get("status", res.status_code)] += 1
+            except Exception as e:
+                errors[f"assist:{type(e).__name__}"] += 1
+
+        try:
+            async with connect(f"{ws_url}/ws/audio?{query}", max_size=None, open_timeout=30) as ws:
+                record("ws_connect", started)
+
+                async def sender():
+                    for offset, chunk in recording.audio:
+                        await at(offset)
+                        last_send[0] = time.perf_counter()
+                        await ws.send(chunk)
+
+                async def receiver():
+                    got_first = False
+                    async for raw in ws:
+                        msg = json.loads(raw)
+                        if msg.get("type") != "transcript":
+                            continue
+                        now = time.perf_counter()
+                        if not got_first:
+                            got_first = True
+                            stages["first_transcript"].append((now - started) * 1000)
+                        stage = "final_transcript" if msg.get("is_final") else "interim_transcript"
+                        stages[stage].append((now - last_send[0]) * 1000)
+                        if msg.get("is_final"):
+                            async with progress:
+                                finals.append(msg.get("data"))
+                                progress.notify_all()
+                            if len(finals) >= expected:
+                                done.set()
+
+                recv_task = asyncio.create_task(receiver())
+                await asyncio.gather(sender(), *(assist(*request) for request in recording.assists))
+                if expected:
+                    try:
+                        await asyncio.wait_for(done.wait(), timeout=args.drain_timeout)
+                    except asyncio.TimeoutError:
+                        errors["final_transcript_timeout"] += 1
+                recv_task.cancel()
+
+            if recording.end_call is not None:
+                await at(recording.end_call)
+                end_started = time.perf_counter()
+                res = await http.post(f"{base_url}/end-call", json={"session_id": session_id})
+                if res.status_code == 200:
+                    record("end_call", end_started)
+                else:
+                    errors[f"end_call:{res.status_code}"] += 1
+        except Exception as e:
+            errors[f"session:{type(e).__name__}"] += 1
+        record("session_total", started)
+        wall = time.perf_counter() - started
+        server = (await http.get(f"{base_url}/__bench__/stats")).json()
+        server_stages = histogram_quantiles((await http.get(f"{base_url}/metrics")).text)
+
+    return {
+        "recording": os.path.basename(recording.path),
+        "speed": args.speed,
+        "wall_seconds": round(wall, 2),
+        "audio_chunks": len(recording.audio),
+        "stages_ms": {stage: summarize(values) for stage, values in sorted(stages.items())},
+        "server_stages_ms": server_stages,
+        "assist_status": dict(assist_status),
+        "errors": dict(errors),
+        # Same transcripts in the same order is the replay's determinism check
+        "transcript_mismatches": sum(a != b for a, b in zip(finals, recording.finals)) + abs(len(finals) - expected),
+        "server": {
+            "loop_lag_ms": summarize(server["loop_lag_ms"]),
+            "cpu_seconds": round(server["cpu_seconds"], 3),
+            "cpu_utilization": round(server["cpu_seconds"] / max(server["wall_seconds"], 1e-9), 3),
+            "rss_mb": round(server["rss_mb"], 1),
+        },
+    }
+
+
+def run_replay(args) -> dict:
+    recording = Recording(args.recording)
+    with ReplayUpstreams(recording, args.speed, not args.no_upstream_latency) as upstreams:
+        env = {
+            **upstreams.env(),
+            # Always through the (replayed) Deepgram stream, and never re-recorded
+            "STT_PROVIDER": "deepgram",
+            "SESSION_RECORD_DIR": "",
+        }
+        port = free_port()
+        with tempfile.TemporaryDirectory() as workdir:
+            proc = start_api(env, port, workdir)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                asyncio.run(wait_ready(base_url, proc))
+                asyncio.run(wait_warm(base_url))
+                upstreams.stats.clear()
+                report = asyncio.run(drive(recording, args, base_url, f"ws://127.0.0.1:{port}"))
+            finally:
+                proc.terminate()
+                proc.wait(timeout=15)
+        report["upstream_calls"] = upstreams.snapshot()
+    return report
+
+
+def compare(report: dict, baseline: dict) -> list:
+    """(metric, baseline, current, change %) for the client stages' p50/p95 and the server's CPU."""
+    rows = []
+    for stage, now in report["stages_ms"].items():
+        before = baseline.get("stages_ms", {}).get(stage)
+        if before:
+            rows += [(f"{stage} {q}", before[q], now[q]) for q in ("p50", "p95")]
+    rows.append(("server cpu_seconds", baseline["server"]["cpu_seconds"], report["server"]["cpu_seconds"]))
+    rows.append(("server loop_lag p95", baseline["server"]["loop_lag_ms"]["p95"], report["server"]["loop_lag_ms"]["p95"]))
+    return [(name, b, n, round((n - b) / b * 100, 1) if b else None) for name, b, n in rows]
+
+
+def print_report(report: dict, baseline: dict | None = None):
+    print(f"\nReplay of {report['recording']} at {report['speed']}x: {report['wall_seconds']}s, {report['audio_chunks']} audio chunks")
+    print(f"{'stage':<22}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for stage, s in dict(report["stages_ms"], loop_lag=report["server"]["loop_lag_ms"]).items():
+        print(f"{stage:<22}{s['count']:>7}{s['p50']:>10}{s['p95']:>10}{s['p99']:>10}{s['max']:>10}")
+    server = report["server"]
+    print(f"CPU: {server['cpu_seconds']}s ({server['cpu_utilization'] * 100:.1f}% of one core)  RSS: {server['rss_mb']} MB")
+    print(f"Assist: {report['assist_status']}  Errors: {report['errors'] or 'none'}  Transcript mismatches: {report['transcript_mismatches']}")
+    print(f"Upstream calls: {report['upstream_calls']}")
+    if baseline:
+        print(f"\n{'vs baseline':<34}{'before':>10}{'now':>10}{'change':>10}")
+        for name, before, now, change in compare(report, baseline):
+            print(f"{name:<34}{before:>10}{now:>10}{'' if change is None else f'{change:+.1f}%':>10}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded call against the API with recorded upstream responses")
+    parser.add_argument("recording", help="<session_id>.rec from SESSION_RECORD_DIR")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed multiplier (1 = real time); upstream latencies scale with it")
+    parser.add_argument("--no-upstream-latency", action="store_true", help="Answer upstream requests immediately (CPU-only comparison)")
+    parser.add_argument("--drain-timeout", type=float, default=30.0)
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the report to this file")
+    parser.add_argument("--baseline", default=None, help="Report JSON from an earlier run to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_replay(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
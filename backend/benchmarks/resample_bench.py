@@ -0,0 +1,53 @@
+"""
+Throughput of the streaming downmix + resample to 16 kHz mono, per core.
+
+    python -m benchmarks.resample_bench --seconds 60 --chunk-ms 250
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+
+from app.services.resampler import AudioNormalizer
+
+CASES = [(44100, 2), (48000, 2), (48000, 1), (8000, 1)]
+
+
+def synthetic_pcm(rate: int, channels: int, seconds: float, seed: int = 0) -> bytes:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(rate * seconds)) / rate
+    tone = 8000 * np.sin(2 * np.pi * 440 * t)
+    frames = tone[:, None] + rng.normal(0, 500, (len(t), channels))
+    return np.clip(frames, -32768, 32767).astype("<i2").tobytes()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--chunk-ms", type=int, default=250)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    for rate, channels in CASES:
+        pcm = synthetic_pcm(rate, channels, args.seconds)
+        chunk = rate * args.chunk_ms // 1000 * 2 * channels
+        frames = len(pcm) // (2 * channels)
+        timings = []
+        for _ in range(args.repeat):
+            normalizer = AudioNormalizer(rate, channels)
+            # process_time: CPU seconds of this process, i.e. one core
+            start = time.process_time()
+            out = sum(len(normalizer.process(pcm[i:i + chunk])) for i in range(0, len(pcm), chunk))
+            timings.append(time.process_time() - start)
+
+        best = max(min(timings), 1e-9)
+        print(f"{rate} Hz x{channels} in {args.chunk_ms} ms chunks: {frames / best:,.0f} frames/s per core, "
+              f"{args.seconds / best:,.0f}x realtime ({out // 2} samples out)")
+
+
+if __name__ == "__main__":
+    main()
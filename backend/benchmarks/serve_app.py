@@ -0,0 +1,99 @@
+"""
+Runs the API under uvicorn with an event-loop lag probe and a stats route.
+
+Used by the load driver as a subprocess so the measured loop, CPU and RSS
+belong to the API alone:
+
+    python -m benchmarks.serve_app --port 8001 --workdir /tmp/bench
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import uvicorn
+
+PROBE_INTERVAL = 0.05
+
+
+class LoopLagProbe:
+    """Measures how late a periodic sleep wakes up on the serving loop."""
+
+    def __init__(self, interval: float = PROBE_INTERVAL):
+        self.interval = interval
+        self.samples = []
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval) * 1000)
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux; peak rather than current, but better than nothing
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def cpu_seconds() -> float:
+    t = os.times()
+    return t.user + t.system
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--workdir", default=None, help="Where call recordings are written")
+    args = parser.parse_args()
+
+    from app.main import app
+
+    if args.workdir:
+        os.makedirs(args.workdir, exist_ok=True)
+        os.chdir(args.workdir)
+
+    probe = LoopLagProbe()
+    baseline = {"cpu": cpu_seconds(), "wall": time.monotonic()}
+
+    @app.get("/__bench__/stats")
+    async def bench_stats():
+        return {
+            "loop_lag_ms": probe.samples,
+            "cpu_seconds": cpu_seconds() - baseline["cpu"],
+            "wall_seconds": time.monotonic() - baseline["wall"],
+            "rss_mb": rss_mb(),
+        }
+
+    @app.post("/__bench__/reset")
+    async def bench_reset():
+        probe.samples.clear()
+        baseline["cpu"] = cpu_seconds()
+        baseline["wall"] = time.monotonic()
+        return {"ok": True}
+
+    async def serve():
+        server = uvicorn.Server(uvicorn.Config(app, host=args.host, port=args.port, log_level="warning"))
+        probe_task = asyncio.create_task(probe.run())
+        try:
+            await server.serve()
+        finally:
+            probe_task.cancel()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Cold-start benchmark: how long `import app.main` takes, how soon a fresh API process
+answers and reports ready, and the latency of its first requests.
+
+Runs the API in a subprocess against the local fake upstreams, so it is fully offline.
+
+    cd backend
+    python -m benchmarks.startup_bench --runs 3
+    python -m benchmarks.startup_bench --no-warmup   # first request pays for client setup
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fake_upstreams import FakeUpstreams, free_port
+from benchmarks.load_ws_audio import BACKEND_DIR, start_api
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+# Touches Supabase through a service, like the dashboard's first call
+FIRST_REQUEST = "/agents/"
+
+
+def measure_import(env: dict) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, env={**os.environ, **env}, capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+async def poll(http: httpx.AsyncClient, url: str, proc: subprocess.Popen, ok=lambda r: r.status_code == 200, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"API exited with code {proc.returncode}")
+        try:
+            response = await http.get(url)
+            if ok(response):
+                return response
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.02)
+    raise RuntimeError(f"{url} did not respond in {timeout}s")
+
+
+async def measure_boot(env: dict, port: int) -> dict:
+    base_url = f"http://127.0.0.1:{port}"
+    with tempfile.TemporaryDirectory() as workdir:
+        started = time.perf_counter()
+        proc = start_api(env, port, workdir)
+        try:
+            async with httpx.AsyncClient(timeout=30) as http:
+                await poll(http, f"{base_url}/", proc)
+                listening = time.perf_counter() - started
+                readiness = (await poll(http, f"{base_url}/ready", proc)).json()
+                ready = time.perf_counter() - started
+                latencies = []
+                for _ in range(3):
+                    t = time.perf_counter()
+                    (await http.get(f"{base_url}{FIRST_REQUEST}")).raise_for_status()
+                    latencies.append(time.perf_counter() - t)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=15)
+    return {
+        "listening_s": listening,
+        "ready_s": ready,
+        "first_request_ms": latencies[0] * 1000,
+        "warm_request_ms": statistics.median(latencies[1:]) * 1000,
+        "readiness": readiness,
+    }
+
+
+def run_benchmark(args) -> dict:
+    with FakeUpstreams({"db_table": args.db_latency_ms}) as fakes:
+        env = {**fakes.env(), "WARMUP_ON_STARTUP": str(not args.no_warmup).lower()}
+        imports = [measure_import(env) for _ in range(args.runs)]
+        boots = [asyncio.run(measure_boot(env, free_port())) for _ in range(args.runs)]
+
+    def median(key):
+        return round(statistics.median(b[key] for b in boots), 3)
+
+    return {
+        "runs": args.runs,
+        "warmup": not args.no_warmup,
+        "import_s": round(statistics.median(imports), 3),
+        "listening_s": median("listening_s"),
+        "ready_s": median("ready_s"),
+        "first_request_ms": median("first_request_ms"),
+        "warm_request_ms": median("warm_request_ms"),
+        "readiness": boots[-1]["readiness"],
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Startup-time benchmark against local fake upstreams")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--no-warmup", action="store_true", help="Start with WARMUP_ON_STARTUP=false")
+    parser.add_argument("--db-latency-ms", type=float, default=40.0)
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the report to this file")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmark(args)
+    print(f"import app.main: {report['import_s']}s  listening: {report['listening_s']}s  ready: {report['ready_s']}s")
+    print(f"first {FIRST_REQUEST}: {report['first_request_ms']:.1f} ms  warm: {report['warm_request_ms']:.1f} ms  "
+          f"(warm-up {'on' if report['warmup'] else 'off'})")
+    print(f"readiness: {report['readiness']}")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+Compiles comprehensive_mutual_funds_data.csv into a versioned fund snapshot (typed
+NumPy columns, string tables and normalized embeddings) and makes it current. Servers
+with FUND_SNAPSHOT_DIR pointing at the output directory swap to it without a restart.
+Only funds whose text changed since the current version are re-embedded.
+
+    python build_fund_snapshot.py
+    python build_fund_snapshot.py --csv ../comprehensive_mutual_funds_data.csv --out snapshots/funds
+"""
+import argparse
+import csv
+import os
+import time
+from app.core.clients import EMBEDDING_MODEL, get_embeddings
+from app.core.config import settings
+from app.services.fund_snapshot import build_snapshot
+
+DEFAULT_CSV = os.path.join(os.path.dirname(__file__), "..", "comprehensive_mutual_funds_data.csv")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=DEFAULT_CSV)
+    parser.add_argument("--out", default=settings.FUND_SNAPSHOT_DIR or "snapshots/funds")
+    parser.add_argument("--batch-size", type=int, default=100, help="Funds per embedding request")
+    args = parser.parse_args()
+
+    with open(args.csv, newline="") as f:
+        rows = list(csv.DictReader(f))
+    started = time.perf_counter()
+    version = build_snapshot(
+        rows, args.out, get_embeddings().embed_documents, EMBEDDING_MODEL,
+        source=os.path.abspath(args.csv), batch_size=args.batch_size,
+    )
+    print(f"Built fund snapshot {version} ({len(rows)} funds) in {time.perf_counter() - started:.1f}s -> {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+-- Call-history index: one interactions row per finished call, searchable by text and by meaning
+
+ALTER TABLE public.interactions
+ADD COLUMN IF NOT EXISTS session_id text UNIQUE,
+ADD COLUMN IF NOT EXISTS lead_name text,
+ADD COLUMN IF NOT EXISTS agent_name text,
+ADD COLUMN IF NOT EXISTS summary text,
+ADD COLUMN IF NOT EXISTS created_at timestamptz DEFAULT now();
+
+ALTER TABLE public.interactions
+ADD COLUMN IF NOT EXISTS search tsvector GENERATED ALWAYS AS (
+  setweight(to_tsvector('english', coalesce(summary, '')), 'A') ||
+  setweight(jsonb_to_tsvector('english', coalesce(objections_raised, '[]'::jsonb), '["string"]'), 'A') ||
+  setweight(to_tsvector('english', coalesce(transcript, '')), 'B')
+) STORED;
+
+CREATE INDEX IF NOT EXISTS interactions_search_idx ON public.interactions USING gin (search);
+-- Keyset paging: newest first, optionally per agent
+CREATE INDEX IF NOT EXISTS interactions_created_idx ON public.interactions (created_at DESC, interaction_id DESC);
+CREATE INDEX IF NOT EXISTS interactions_agent_created_idx ON public.interactions (agent_name, created_at DESC);
+
+-- Embedded summary chunks
+CREATE TABLE IF NOT EXISTS public.interaction_chunks (
+  id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  interaction_id text REFERENCES public.interactions(interaction_id) ON DELETE CASCADE,
+  chunk_index integer,
+  content text,
+  embedding vector(768),
+  UNIQUE (interaction_id, chunk_index)
+);
+
+CREATE INDEX IF NOT EXISTS interaction_chunks_embedding_idx
+ON public.interaction_chunks USING hnsw (embedding vector_cosine_ops);
+
+-- Replaces the earlier version without `until`
+drop function if exists match_call_chunks (vector, float, int, text, timestamptz);
+
+-- Best-matching chunk per call, most similar first
+create or replace function match_call_chunks (
+  query_embedding vector(768),
+  match_threshold float,
+  match_count int,
+  filter_agent text default null,
+  since timestamptz default null,
+  until timestamptz default null
+)
+returns table (
+  interaction_id text,
+  content text,
+  similarity float
+)
+language plpgsql
+as $$
+begin
+  return query
+  select best.interaction_id, best.content, best.similarity
+  from (
+    select distinct on (c.interaction_id)
+      c.interaction_id,
+      c.content,
+      1 - (c.embedding <=> query_embedding) as similarity
+    from (
+      select * from interaction_chunks
+      order by interaction_chunks.embedding <=> query_embedding
+      limit match_count * 5
+    ) c
+    join interactions i on i.interaction_id = c.interaction_id
+    where 1 - (c.embedding <=> query_embedding) > match_threshold
+      and (filter_agent is null or i.agent_name = filter_agent)
+      and (since is null or i.created_at >= since)
+      and (until is null or i.created_at < until)
+    order by c.interaction_id, c.embedding <=> query_embedding
+  ) best
+  order by best.similarity desc
+  limit match_count;
+end;
+$$;
@@ -0,0 +1,69 @@
+"""
+Assigns investors (leads) to agents in one batch and writes ai_dispatch_logs.
+
+    python dispatch_leads.py --dry-run
+    python dispatch_leads.py --only-unassigned --capacity 50
+    python dispatch_leads.py --method optimal   # needs the `dispatch` extra (scipy)
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+import uuid
+import numpy as np
+from app.services.bulk_ops import BulkTable, add_bulk_arguments, format_report, table_from_args
+from app.services.dispatch_engine import DispatchEngine, build_dispatch_logs, parse_embeddings
+
+async def dispatch_leads(args) -> bool:
+    agents = await BulkTable("agents", "agent_id").fetch_all("agent_id, name, languages, performance_score, embedding")
+    leads = await BulkTable("investors", "investor_id").fetch_all("investor_id, name, age, occupation, preferred_language, embedding")
+    table = table_from_args("ai_dispatch_logs", args)
+    if args.only_unassigned:
+        dispatched = {row["lead_name"] for row in await table.fetch_all("lead_name")}
+        leads = [lead for lead in leads if lead.get("name") not in dispatched]
+    if not agents or not leads:
+        print(f"Nothing to dispatch ({len(agents)} agents, {len(leads)} leads).")
+        return True
+
+    started = time.perf_counter()
+    agent_matrix, _ = parse_embeddings([a.get("embedding") for a in agents])
+    lead_matrix, has_embedding = parse_embeddings([l.get("embedding") for l in leads], agent_matrix.shape[1])
+    result = DispatchEngine().run(
+        lead_matrix, agent_matrix,
+        np.array([a.get("performance_score") or 0 for a in agents], dtype=np.float32),
+        [l.get("preferred_language") for l in leads],
+        [a.get("languages") for a in agents],
+        capacity=args.capacity,
+        method=args.method,
+    )
+    logs = build_dispatch_logs(leads, agents, result)
+    elapsed = time.perf_counter() - started
+    print(f"Matched {len(logs)}/{len(leads)} leads to {len(agents)} agents in {elapsed * 1000:.0f} ms "
+          f"({int((~has_embedding).sum())} leads without embeddings, "
+          f"{sum(log['is_override'] for log in logs)} capacity overrides)")
+
+    if args.dry_run:
+        for log in logs[:10]:
+            print(f"  {log['lead_name']} -> {log['assigned_agent']} ({log['math_score']}): {log['reasoning']}")
+
+    # Ids are set here so a retried chunk that did land isn't inserted twice
+    for log in logs:
+        log["id"] = str(uuid.uuid4())
+    report = await table.upsert(logs)
+    print(format_report(report))
+    return not report["failed"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--method", choices=("greedy", "optimal"), default="greedy")
+    parser.add_argument("--capacity", type=int, default=None, help="Max leads per agent (default: even split + 20%%)")
+    parser.add_argument("--only-unassigned", action="store_true", help="Skip leads that already have a dispatch log")
+    add_bulk_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if not asyncio.run(dispatch_leads(args)):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Re-runs transcription, summary and report over saved call recordings (audio_<session>.*),
+e.g. after changing the STT model or the prompts. Transcription is spread over a process
+pool; LLM stages are held to --rpm/--tpm. Finished calls are checkpointed per --tag, so
+re-running the same command resumes where it stopped.
+
+    python reprocess_calls.py --engine faster-whisper --model small --write-back
+    python reprocess_calls.py --engine segments --stages report   # no STT model: dry run
+    python reprocess_calls.py --tag prompts-v2 --rpm 60 --tpm 60000
+"""
+import argparse
+import asyncio
+import logging
+from app.core.config import settings
+from app.services.batch_reprocess import DRY_RUN_ENGINE, STAGES, ReprocessJob
+from app.services.llm_gateway import LLMGateway, build_providers
+from app.services.llm_scheduler import LLMScheduler
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recordings_dir", nargs="?", default=".")
+    parser.add_argument("--engine", default=settings.LOCAL_STT_ENGINE, help=f"faster-whisper, vosk or {DRY_RUN_ENGINE} (no model)")
+    parser.add_argument("--model", default=settings.LOCAL_STT_MODEL)
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--workers", type=int, default=None, help="STT processes (default: one per core)")
+    parser.add_argument("--stages", default=",".join(STAGES), help="LLM stages to run after transcription")
+    parser.add_argument("--rpm", type=int, default=settings.LLM_RATE_LIMIT_RPM, help="LLM requests per minute for this job")
+    parser.add_argument("--tpm", type=int, default=settings.LLM_RATE_LIMIT_TPM, help="LLM tokens per minute for this job")
+    parser.add_argument("--concurrency", type=int, default=settings.LLM_MAX_CONCURRENCY)
+    parser.add_argument("--tag", default=None, help="Checkpoint key (default: engine, STT model and LLM model)")
+    parser.add_argument("--checkpoint", default="reprocess_checkpoint.jsonl")
+    parser.add_argument("--write-back", action="store_true", help="Update the interactions table and re-embed summaries")
+    parser.add_argument("--batch-size", type=int, default=50, help="Calls per bulk write")
+    parser.add_argument("--force", action="store_true", help="Ignore the checkpoint and redo every recording")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    call_index = None
+    if args.write_back:
+        from app.services.call_index import CallIndexService
+        call_index = CallIndexService()
+
+    job = ReprocessJob(
+        args.recordings_dir,
+        args.checkpoint,
+        args.tag or f"{args.engine}:{args.model}:{settings.LLM_MODEL}",
+        # No hedging: a duplicate request would spend the job's budget twice
+        llm=LLMGateway(build_providers(), hedge=False),
+        scheduler=LLMScheduler(args.rpm, args.tpm, args.concurrency),
+        call_index=call_index,
+        engine=args.engine,
+        model=args.model,
+        compute_type=settings.LOCAL_STT_COMPUTE_TYPE,
+        cpu_threads=settings.LOCAL_STT_CPU_THREADS,
+        workers=args.workers,
+        language=args.language,
+        stages=tuple(stage for stage in args.stages.split(",") if stage),
+        max_segment_ms=settings.LOCAL_STT_MAX_SEGMENT_MS,
+        write_batch=args.batch_size,
+    )
+    stats = asyncio.run(job.run(force=args.force))
+    print(f"{stats['done']} reprocessed, {stats['skipped']} already done, {stats['failed']} failed "
+          f"of {stats['found']} recordings" + (f" in {stats['seconds']}s" if "seconds" in stats else ""))
+
+if __name__ == "__main__":
+    main()
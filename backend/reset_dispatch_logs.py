@@ -1,19 +1,19 @@
-import os
-import asyncio
-from supabase import create_client, Client
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-if not SUPABASE_URL or not SUPABASE_KEY:
-    print("Error: SUPABASE_URL or SUPABASE_KEY not found in environment.")
-    exit(1)
+"""
+Resets ai_dispatch_logs to the snapshot below (or a --csv file with the same columns):
+logs not in it are deleted and the rest upserted by id, in bulk, with their call history
+cleared (RESET_VALUES). Logs already matching the snapshot aren't rewritten, so they keep
+their created_at. --dry-run prints what would change.
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    python reset_dispatch_logs.py --dry-run
+    python reset_dispatch_logs.py --csv dispatch_logs.csv --concurrency 8
+"""
+import argparse
+import asyncio
+import csv
+import io
+import logging
+import sys
+from app.services.bulk_ops import add_bulk_arguments, format_report, table_from_args
 
 # Data provided by user
 csv_data = """
@@ -34,59 +34,60 @@ e37ccbc4-dcd8-4d91-ae42-001e1eb32b39,Meena Shinde,Salaried (Tamil),Aditi Deshmuk
 ece19892-bc5c-4ab2-850c-ec34e339427c,Ganesh Kulkarni,Salaried (English),Ganesh Kale,Ganesh Kale,82,81,false,"Ganesh Kale is assigned as he speaks English, matching the lead's language requirement, and has a manageable current lead load.",false,2025-11-28 22:35:16.980728+00
 """
 
-async def reset_dispatch_logs():
-    print("Resetting ai_dispatch_logs...")
-    
-    # 1. Truncate table (delete all rows)
-    try:
-        # Note: Supabase-py doesn't have a direct truncate, so we delete all.
-        # Assuming 'id' is a column we can filter on, or we can use a condition that matches all.
-        # Or we can just delete where id is not null.
-        # But wait, we need to be careful.
-        # Let's try to delete all.
-        supabase.table("ai_dispatch_logs").delete().neq("lead_name", "PLACEHOLDER_TO_MATCH_ALL").execute() 
-        # Actually .neq("id", "00000000-0000-0000-0000-000000000000") might work if UUID.
-        # Or just loop and delete if needed, but that's slow.
-        # Let's assume we can just insert and ignore duplicates? No, we want to remove old ones.
-        
-        # Better approach: Just insert the new ones. If we want to clear old ones, we might need a separate step.
-        # Let's try to delete everything first.
-        # A trick to delete all rows: .neq("lead_name", "NonExistentName") will delete nothing.
-        # .gt("created_at", "1970-01-01") should match all.
-        supabase.table("ai_dispatch_logs").delete().gt("created_at", "1970-01-01").execute()
-        print("Cleared existing logs.")
-    except Exception as e:
-        print(f"Error clearing logs: {e}")
+# Per-call columns a reset clears on the logs it keeps, when the table has them
+RESET_VALUES = {"chat_history": []}
+
+COLUMNS = ["id", "lead_name", "lead_persona", "top_candidate", "assigned_agent", "math_score",
+           "second_score", "is_override", "reasoning", "admin_corrected", "created_at"]
 
-    lines = csv_data.strip().split('\n')
-    for line in lines:
-        parts = line.split(',')
-        if len(parts) < 5:
+def parse_logs(text: str) -> list:
+    logs = []
+    for parts in csv.reader(io.StringIO(text.strip())):
+        if len(parts) < len(COLUMNS) - 1 or parts[0] == "id":
             continue
-            
-        # Parse (rough)
-        # id,lead_name,lead_persona,top_candidate,assigned_agent,math_score,second_score,is_override,reasoning,admin_corrected,created_at
-        log = {
-            "id": parts[0],
-            "lead_name": parts[1],
-            "lead_persona": parts[2],
-            "top_candidate": parts[3],
-            "assigned_agent": parts[4],
-            "math_score": int(parts[5]),
-            "second_score": int(parts[6]),
-            "is_override": parts[7].lower() == 'true',
-            "reasoning": parts[8].strip('"'), # Remove quotes if present
-            "admin_corrected": parts[9].lower() == 'true',
-            # "created_at": parts[10] # Let DB handle or use provided
-        }
-        
-        try:
-            supabase.table("ai_dispatch_logs").insert(log).execute()
-            print(f"Inserted log for {log['lead_name']}")
-        except Exception as e:
-            print(f"Error inserting {log['lead_name']}: {e}")
+        row = dict(zip(COLUMNS, parts))
+        logs.append({
+            "id": row["id"],
+            "lead_name": row["lead_name"],
+            "lead_persona": row["lead_persona"],
+            "top_candidate": row["top_candidate"],
+            "assigned_agent": row["assigned_agent"],
+            "math_score": int(row["math_score"]),
+            "second_score": int(row["second_score"]),
+            "is_override": row["is_override"].lower() == "true",
+            "reasoning": row["reasoning"],
+            "admin_corrected": row["admin_corrected"].lower() == "true",
+            # created_at is left to the database
+        })
+    return logs
+
+async def reset_dispatch_logs(args) -> bool:
+    if args.csv:
+        with open(args.csv, newline="") as f:
+            logs = parse_logs(f.read())
+    else:
+        logs = parse_logs(csv_data)
+    print(f"Resetting ai_dispatch_logs to {len(logs)} logs...")
+
+    table = table_from_args("ai_dispatch_logs", args)
+    keep = {log["id"] for log in logs}
+    existing = await table.fetch_all()
+    stale = [row["id"] for row in existing if row["id"] not in keep]
+    reset = {column: value for column, value in RESET_VALUES.items() if any(column in row for row in existing)}
+    logs = [{**log, **reset} for log in logs]
+    reports = [await table.delete(stale), await table.upsert(logs, skip_unchanged=True)]
+    for report in reports:
+        print(format_report(report))
+    return not any(report["failed"] for report in reports)
 
-    print("Reset complete.")
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csv", default=None, help="Snapshot to reset to (default: the one in this script)")
+    add_bulk_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if not asyncio.run(reset_dispatch_logs(args)):
+        sys.exit(1)
 
 if __name__ == "__main__":
-    asyncio.run(reset_dispatch_logs())
+    main()
@@ -1,30 +1,31 @@
-import os
-import asyncio
-from supabase import create_client, Client
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+"""
+Seeds ai_dispatch_logs with sample leads spread round-robin over the agents. Each log
+gets an id derived from its position, so re-running updates the same logs instead of
+adding duplicates; --count N writes N logs (the templates repeat) for load testing.
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    print("Error: SUPABASE_URL or SUPABASE_KEY not found in environment.")
-    exit(1)
+    python seed_dispatch_logs.py
+    python seed_dispatch_logs.py --count 20000 --concurrency 8
+    python seed_dispatch_logs.py --count 20000 --dry-run
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import uuid
+from app.services.bulk_ops import add_bulk_arguments, format_report, table_from_args
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+SEED_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "copilot/seed_dispatch_logs")
 
-async def seed_dispatch_logs():
+async def seed_dispatch_logs(args) -> bool:
     print("Seeding ai_dispatch_logs...")
+    table = table_from_args("ai_dispatch_logs", args)
 
     # Fetch existing agents to ensure valid foreign keys/mappings
-    agents_response = supabase.table("agents").select("agent_id").execute()
-    agents = agents_response.data
-    
+    agents = await asyncio.to_thread(lambda: table.supabase.table("agents").select("agent_id").execute().data)
+
     if not agents:
         print("No agents found. Please seed agents first.")
-        return
+        return False
 
     print(f"Found {len(agents)} agents: {[a['agent_id'] for a in agents]}")
 
@@ -74,22 +75,27 @@ async def seed_dispatch_logs():
 
     logs = []
     # Distribute leads among agents
-    for i, template in enumerate(lead_templates):
-        agent = agents[i % len(agents)] # Round-robin assignment
+    for i in range(args.count or len(lead_templates)):
+        template = lead_templates[i % len(lead_templates)]
         log = template.copy()
-        log["assigned_agent"] = agent["agent_id"]
+        log["id"] = str(uuid.uuid5(SEED_NAMESPACE, str(i)))
+        if i >= len(lead_templates):
+            log["lead_name"] = f"{template['lead_name']} {i // len(lead_templates) + 1}"
+        log["assigned_agent"] = agents[i % len(agents)]["agent_id"]  # Round-robin assignment
         logs.append(log)
 
-    for log in logs:
-        try:
-            # Check if lead already exists to avoid duplicates (optional, based on name)
-            # For now, just insert.
-            data = supabase.table("ai_dispatch_logs").insert(log).execute()
-            print(f"Inserted log for {log['lead_name']} assigned to {log['assigned_agent']}")
-        except Exception as e:
-            print(f"Error inserting {log['lead_name']}: {e}")
+    report = await table.upsert(logs)
+    print(format_report(report))
+    return not report["failed"]
 
-    print("Seeding complete.")
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=None, help="Logs to write (default: one per template)")
+    add_bulk_arguments(parser)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if not asyncio.run(seed_dispatch_logs(args)):
+        sys.exit(1)
 
 if __name__ == "__main__":
-    asyncio.run(seed_dispatch_logs())
+    main()
@@ -1,9 +1,11 @@
 import asyncio
+import math
 import os
 import csv
 from dotenv import load_dotenv
 from supabase import create_client, Client
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from app.services.fund_snapshot import fund_text, parse_number
 
 # Load env vars
 load_dotenv()
@@ -66,6 +68,11 @@ async def create_table_if_not_exists():
     
     pass
 
+def number(value, cast=float):
+    # Missing values ("-", "") are stored as NULL rather than 0
+    parsed = parse_number(value)
+    return None if math.isnan(parsed) else cast(parsed)
+
 async def seed():
     print("Seeding Mutual Funds...")
     
@@ -83,16 +90,7 @@ async def seed():
     for fund in funds:
         # Create a text representation for embedding
         # We want to capture the essence: Name, Category, Risk, Returns
-        text_content = f"""
-        Fund Name: {fund['scheme_name']}
-        Category: {fund['category']} ({fund['sub_category']})
-        Risk Level: {fund['risk_level']}
-        AMC: {fund['amc_name']}
-        Returns: 1Y: {fund['returns_1yr']}%, 3Y: {fund['returns_3yr']}%, 5Y: {fund['returns_5yr']}%
-        Expense Ratio: {fund['expense_ratio']}%
-        Min SIP: {fund['min_sip']}
-        Rating: {fund['rating']}
-        """
+        text_content = fund_text(fund)
         
         print(f"Embedding {fund['scheme_name']}...")
         vector = embeddings.embed_query(text_content)
@@ -100,12 +98,12 @@ async def seed():
         data = {
             "scheme_name": fund['scheme_name'],
             "category": fund['category'],
-            "risk_level": int(fund['risk_level']) if fund['risk_level'].isdigit() else 0,
-            "returns_1yr": float(fund['returns_1yr']) if fund['returns_1yr'].replace('.','',1).replace('-','').isdigit() else 0.0,
-            "returns_3yr": float(fund['returns_3yr']) if fund['returns_3yr'].replace('.','',1).replace('-','').isdigit() else 0.0,
-            "returns_5yr": float(fund['returns_5yr']) if fund['returns_5yr'].replace('.','',1).replace('-','').isdigit() else 0.0,
-            "expense_ratio": float(fund['expense_ratio']) if fund['expense_ratio'].replace('.','',1).isdigit() else 0.0,
-            "min_sip": float(fund['min_sip']) if fund['min_sip'].replace('.','',1).isdigit() else 0.0,
+            "risk_level": number(fund['risk_level'], int),
+            "returns_1yr": number(fund['returns_1yr']),
+            "returns_3yr": number(fund['returns_3yr']),
+            "returns_5yr": number(fund['returns_5yr']),
+            "expense_ratio": number(fund['expense_ratio']),
+            "min_sip": number(fund['min_sip']),
             "metadata": fund, # Store raw row as metadata
             "embedding": vector
         }
@@ -0,0 +1,20 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pytest
+
+# Settings require these keys; the tests only talk to fakes, so any value will do
+for key in ("SUPABASE_URL", "SUPABASE_KEY", "GROQ_API_KEY", "OPENROUTER_EMBEDDING_KEY", "GOOGLE_API_KEY"):
+    os.environ.setdefault(key, "test")
+
+from app.core.config import settings
+from benchmarks.fake_upstreams import FakeUpstreams
+
+@pytest.fixture
+def fake_upstreams(monkeypatch):
+    """Running FakeUpstreams, with every upstream setting pointed at it for the test."""
+    with FakeUpstreams() as fake:
+        for key, value in fake.env().items():
+            monkeypatch.setattr(settings, key, value)
+        yield fake
@@ -0,0 +1,73 @@
+import csv
+import sys
+import os
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_upstreams import CSV_FILE_PATH, fake_embedding
+from app.core.config import settings
+from app.services.fund_snapshot import FundSnapshotStore, build_snapshot
+from app.services.listening_agent import ListeningResult
+
+def snapshot(root: str):
+    with open(CSV_FILE_PATH, newline="") as f:
+        rows = list(csv.DictReader(f))[:120]
+    build_snapshot(rows, root, lambda texts: [fake_embedding(t) for t in texts], "fake")
+    return FundSnapshotStore(root, check_seconds=0).get()
+
+def ask(query: str, funds: list, intent: str = "information") -> ListeningResult:
+    return ListeningResult(intent_type=intent, search_query=query, mentioned_funds=funds)
+
+def test_answers_built_per_fund_topic_and_language():
+    with tempfile.TemporaryDirectory() as root:
+        bank = snapshot(root).answer_bank
+        assert bank.answers["2:returns:en"].startswith("{lead}, Aditya Birla SL Arbitrage Fund has returned 5.6% over 1 year")
+        assert "return diya hai" in bank.answers["2:returns:hinglish"]
+        # Row 4 has no 5-year return; the answer leaves it out rather than inventing one
+        assert "5 years" not in bank.answers["4:returns:en"] and "3 years" in bank.answers["4:returns:en"]
+        assert {key.split(":")[1] for key in bank.answers} == {"returns", "risk", "expense_ratio", "min_sip", "category_comparison"}
+
+def test_lookup_serves_only_confident_matches():
+    with tempfile.TemporaryDirectory() as root:
+        bank = snapshot(root).answer_bank
+        hit = bank.lookup(ask("returns of Aditya Birla SL Arbitrage Fund", ["Aditya Birla SL Arbitrage Fund"]), "en", "Karen Shah")
+        assert hit["topic"] == "returns" and hit["fund"]["id"] == 2 and hit["confidence"] == 1.0
+        assert hit["answer"].startswith("Karen, Aditya Birla SL Arbitrage Fund has returned 5.6%")
+
+        hit = bank.lookup(ask("birla arbitrage ka expense ratio", ["birla sl arbitrage"]), "hi", None)
+        assert hit["topic"] == "expense_ratio" and hit["answer"].startswith("Aditya Birla SL Arbitrage Fund ka expense ratio")
+
+        hit = bank.lookup(ask("how does it compare", ["AXIS Arbitrage Fund"], "comparison"), "en", "Karen")
+        assert hit["topic"] == "category_comparison" and "ranks #" in hit["answer"]
+        for unnamed in ("Lead", "  ", ""):
+            hit = bank.lookup(ask("returns of Aditya Birla SL Arbitrage Fund", ["Aditya Birla SL Arbitrage Fund"]), "en", unnamed)
+            assert hit["answer"].startswith("Aditya Birla SL Arbitrage Fund has returned")
+
+        misses = [
+            ask("returns of the arbitrage fund", ["Arbitrage Fund"]),  # several funds match equally
+            ask("returns and expense ratio", ["AXIS Arbitrage Fund"]),  # two topics
+            ask("tell me about it", ["AXIS Arbitrage Fund"]),  # no topic
+            ask("good returns for retirement", ["AXIS Arbitrage Fund"], "recommendation"),
+            ask("returns of these two", ["AXIS Arbitrage Fund", "Aditya Birla SL Arbitrage Fund"]),
+        ]
+        assert all(bank.lookup(listening, "en", "Karen") is None for listening in misses)
+
+def test_rag_service_answers_from_bank():
+    from app.services.rag_service import RAGService
+    original = settings.FUND_SNAPSHOT_DIR
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            snapshot(root)
+            settings.FUND_SNAPSHOT_DIR = root
+            service = RAGService.__new__(RAGService)  # the bank needs no upstream clients
+            session = {"language": "en", "lead_name": "Karen"}
+            result = service.answer_from_bank(ask("minimum SIP for AXIS Arbitrage Fund", ["AXIS Arbitrage Fund"]), session)
+            assert result["answer_source"] == "bank" and result["context"][0]["scheme_name"] == "AXIS Arbitrage Fund"
+            assert service.answer_from_bank(ask("is it a good idea", ["AXIS Arbitrage Fund"]), session) is None
+    finally:
+        settings.FUND_SNAPSHOT_DIR = original
+
+if __name__ == "__main__":
+    test_answers_built_per_fund_topic_and_language()
+    test_lookup_serves_only_confident_matches()
+    test_rag_service_answers_from_bank()
@@ -0,0 +1,85 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.session_store import get_session_store
+from app.services.assist_coordinator import SUPERSEDED, AssistCoordinator
+
+class Pipeline:
+    """Stands in for RAGService.process_assist_request; each run waits until released."""
+
+    def __init__(self):
+        self.runs = []
+        self.cancelled = []
+        self.release = asyncio.Event()
+
+    def __call__(self, lines):
+        return self.run(lines)
+
+    async def run(self, lines):
+        self.runs.append(len(lines))
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled.append(len(lines))
+            raise
+        return {"status": "success", "answer": f"answer at {len(lines)} lines"}
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def test_concurrent_requests_share_one_run_and_reuse_the_answer():
+    async def run():
+        store, coordinator, pipeline = get_session_store(), AssistCoordinator(), Pipeline()
+        for line in ("Karen: Is my money safe?", "John: Let me check"):
+            await store.append_transcript("dedup-1", line)
+        first = asyncio.create_task(coordinator.assist("dedup-1", "let me check", pipeline))
+        second = asyncio.create_task(coordinator.assist("dedup-1", "let me check", pipeline))
+        await settle()
+        pipeline.release.set()
+        (result, fresh), (joined, joined_fresh) = await asyncio.gather(first, second)
+        assert pipeline.runs == [2]
+        assert result == joined == {"status": "success", "answer": "answer at 2 lines"}
+        assert fresh and not joined_fresh
+
+        # Same window again: the stored answer, no run
+        assert await coordinator.assist("dedup-1", "let me check", pipeline) == (result, False)
+        assert pipeline.runs == [2]
+    asyncio.run(run())
+
+def test_newer_window_cancels_the_running_assist():
+    async def run():
+        store, coordinator, pipeline = get_session_store(), AssistCoordinator(), Pipeline()
+        await store.append_transcript("dedup-2", "Karen: What about liquidity?")
+        older = asyncio.create_task(coordinator.assist("dedup-2", "let me check", pipeline))
+        await settle()
+        await store.append_transcript("dedup-2", "Karen: And the exit load?")
+        newer = asyncio.create_task(coordinator.assist("dedup-2", "let me check", pipeline))
+        await settle()
+        assert pipeline.cancelled == [1]
+        pipeline.release.set()
+        assert await older == (SUPERSEDED, False)
+        result, fresh = await newer
+        assert fresh and result["answer"] == "answer at 2 lines"
+        assert pipeline.runs == [1, 2]
+    asyncio.run(run())
+
+def test_degraded_answers_are_not_reused():
+    async def run():
+        store, coordinator, calls = get_session_store(), AssistCoordinator(), []
+        await store.append_transcript("dedup-3", "Karen: Which fund is best?")
+        async def degraded(lines):
+            calls.append(len(lines))
+            return {"status": "degraded", "answer": "Suggested answer is unavailable right now."}
+        for _ in range(2):
+            result, fresh = await coordinator.assist("dedup-3", None, degraded)
+            assert fresh and result["status"] == "degraded"
+        assert calls == [1, 1]
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_concurrent_requests_share_one_run_and_reuse_the_answer()
+    test_newer_window_cancels_the_running_assist()
+    test_degraded_answers_are_not_reused()
@@ -0,0 +1,76 @@
+import asyncio
+import json
+import shutil
+import subprocess
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pytest
+from app.services.audio_codec import DecodedSource, deepgram_params, negotiate_format, parse_format, sniff_format
+
+WEBM_HEADER = b"\x1a\x45\xdf\xa3\x9f\x42\x86\x81\x01"
+
+class FakeSocket:
+    """Plays back ASGI websocket messages."""
+    def __init__(self, *messages):
+        self.messages = list(messages)
+
+    async def receive(self):
+        return self.messages.pop(0)
+
+    async def receive_bytes(self):
+        return self.messages.pop(0) if self.messages else b""
+
+def test_sniff_and_parse():
+    assert sniff_format(WEBM_HEADER).codec == "webm"
+    assert sniff_format(b"OggS\x00\x02").codec == "ogg"
+    assert sniff_format(b"RIFF\x24\x00\x00\x00WAVEfmt ").codec == "wav"
+    assert sniff_format(b"\x00\x01" * 100).is_pcm
+    assert parse_format("opus").codec == "webm"
+    assert parse_format("pcm", 48000, 2).describe() == {"codec": "linear16", "sample_rate": 48000, "channels": 2}
+    for bad in (("aac", None, None), ("pcm", 96000, None), ("pcm", 16000, 6), ("pcm", "16000", None)):
+        with pytest.raises(ValueError):
+            parse_format(*bad)
+
+def test_deepgram_params():
+    assert deepgram_params(parse_format(None)) == "encoding=linear16&sample_rate=16000&channels=1"
+    assert deepgram_params(parse_format("webm")) == ""
+
+def test_negotiation_sources():
+    async def run():
+        fmt, first, init = await negotiate_format(FakeSocket(), "ogg")
+        assert fmt.codec == "ogg" and first == b"" and not init
+        fmt, first, init = await negotiate_format(FakeSocket(
+            {"type": "websocket.receive", "text": json.dumps({"type": "init", "codec": "pcm", "sample_rate": 8000})}
+        ))
+        assert fmt.is_pcm and fmt.sample_rate == 8000 and init
+        fmt, first, init = await negotiate_format(FakeSocket({"type": "websocket.receive", "bytes": WEBM_HEADER}))
+        assert fmt.codec == "webm" and first == WEBM_HEADER and not init
+    asyncio.run(run())
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_decoded_source_yields_pcm():
+    tone = (np.sin(np.arange(16000) * 2 * np.pi * 440 / 16000) * 8000).astype(np.int16)
+    ogg = subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-f", "s16le", "-ar", "16000", "-ac", "1", "-i", "pipe:0", "-c:a", "libopus", "-f", "ogg", "pipe:1"],
+        input=tone.tobytes(), capture_output=True, check=True,
+    ).stdout
+
+    async def run():
+        chunks = [ogg[i:i + 1000] for i in range(0, len(ogg), 1000)]
+        source = DecodedSource(FakeSocket(*chunks), parse_format("ogg"))
+        pcm = bytearray()
+        while data := await source.receive_bytes():
+            pcm.extend(data)
+        return len(pcm)
+
+    # About one second of 16 kHz 16-bit audio comes back
+    assert abs(asyncio.run(run()) - 32000) < 4000
+
+if __name__ == "__main__":
+    test_sniff_and_parse()
+    test_deepgram_params()
+    test_negotiation_sources()
+    test_decoded_source_yields_pcm()
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import sys
+import os
+import tempfile
+import wave
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from app.core.config import settings
+from app.services.batch_reprocess import DRY_RUN_ENGINE, ReprocessJob, find_recordings, speech_segments
+from app.services.call_index import CallIndexService
+from app.services.llm_gateway import LLMGateway, build_providers
+from app.services.llm_scheduler import LLMScheduler
+
+def bursts(rate: int, seconds: list) -> np.ndarray:
+    """A 300 Hz tone for each duration, separated by a second of silence."""
+    parts = []
+    for s in seconds:
+        t = np.arange(int(rate * s)) / rate
+        parts += [np.zeros(rate), 8000 * np.sin(2 * np.pi * 300 * t)]
+    return np.concatenate(parts + [np.zeros(rate)])
+
+def write_wav(path: str, rate: int, channels: int, seconds: list):
+    mono = bursts(rate, seconds)
+    with wave.open(path, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(rate)
+        wf.writeframes(np.repeat(mono[:, None], channels, axis=1).astype("<i2").tobytes())
+
+def test_speech_segments_split_long_utterances():
+    pcm = bursts(16000, [1.0, 2.5]).astype("<i2").tobytes()
+    segments = speech_segments(pcm, max_segment_ms=1500)
+    # 1 s, then 2.5 s (plus VAD hangover) cut at 1.5 s
+    assert len(segments) == 3
+    assert abs(segments[0][0] - 1.0) < 0.1 and abs(segments[1][0] - 3.0) < 0.1
+
+def test_reprocess_checkpoints_and_writes_back_in_bulk(fake_upstreams, monkeypatch):
+    with tempfile.TemporaryDirectory() as workdir:
+        write_wav(os.path.join(workdir, "audio_a1.wav"), 16000, 1, [1.0, 2.0])
+        write_wav(os.path.join(workdir, "audio_b2.wav"), 48000, 2, [1.5])
+        write_wav(os.path.join(workdir, "audio_c3.wav"), 16000, 1, [0.5, 0.5, 0.5])
+        with open(os.path.join(workdir, "notes.txt"), "w") as f:
+            f.write("not a recording")
+        assert [s for s, _ in find_recordings(workdir)] == ["a1", "b2", "c3"]
+        checkpoint = os.path.join(workdir, "checkpoint.jsonl")
+
+        def job():
+            return ReprocessJob(
+                workdir, checkpoint, "test",
+                llm=LLMGateway(build_providers(), hedge=False),
+                scheduler=LLMScheduler(rpm=600),
+                call_index=CallIndexService(),
+                engine=DRY_RUN_ENGINE, workers=2, write_batch=2,
+            )
+
+        monkeypatch.setattr(settings, "LLM_FALLBACK_BASE_URL", "")
+        first = asyncio.run(job().run())
+        after_first = fake_upstreams.snapshot()
+        second = asyncio.run(job().run())
+        after_second = fake_upstreams.snapshot()
+
+        with open(checkpoint) as f:
+            results = {r["session_id"]: r for r in map(json.loads, f)}
+
+    assert first["done"] == 3 and first["failed"] == 0
+    assert second == {"found": 3, "skipped": 3, "done": 0, "failed": 0}
+    assert after_second == after_first  # nothing re-run
+
+    assert len(results["a1"]["lines"]) == 2 and len(results["c3"]["lines"]) == 3
+    assert results["b2"]["duration_seconds"] == 3.5  # 48 kHz stereo, normalized
+    assert results["a1"]["report"]["sentiment"] == "Positive"
+    assert results["a1"]["summary"].startswith("Lead asked about safety")
+    # Two LLM calls per recording; two bulk writes (upsert + chunk delete each), then one chunk upsert
+    assert after_first["llm"] == 6
+    assert after_first["db_table"] == 5 and after_first["embed"] == 1
+
+def reprocess(workdir: str, stages: tuple, tag: str = "test") -> dict:
+    job = ReprocessJob(
+        workdir, os.path.join(workdir, "checkpoint.jsonl"), tag,
+        llm=LLMGateway(build_providers(), hedge=False), call_index=CallIndexService(),
+        engine=DRY_RUN_ENGINE, workers=1, stages=stages,
+    )
+    return asyncio.run(job.run())
+
+def test_failed_summary_is_neither_saved_nor_checkpointed(fake_upstreams, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_FALLBACK_BASE_URL", "")
+    fake_upstreams.faults["llm"] = 503
+    with tempfile.TemporaryDirectory() as workdir:
+        write_wav(os.path.join(workdir, "audio_a1.wav"), 16000, 1, [1.0])
+        stats = reprocess(workdir, ("summary",))
+        assert stats["failed"] == 1 and stats["done"] == 0
+        assert not os.path.exists(os.path.join(workdir, "checkpoint.jsonl"))
+    assert fake_upstreams.stats["db_table"] == 0
+
+def test_single_stage_keeps_the_other_stages_columns(fake_upstreams, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_FALLBACK_BASE_URL", "")
+    stored = {"interaction_id": "a1", "summary": "Old summary", "sentiment": "Negative",
+              "objections_raised": ["Too risky"], "report_summary": {"sentiment": "Negative"}}
+    rows = {"a1": dict(stored)}
+    fake_upstreams.tables["interactions"] = ("interaction_id", rows)
+    with tempfile.TemporaryDirectory() as workdir:
+        write_wav(os.path.join(workdir, "audio_a1.wav"), 16000, 1, [1.0])
+
+        assert reprocess(workdir, ("summary",), "summary")["done"] == 1
+        assert rows["a1"]["summary"].startswith("Lead asked about safety")
+        assert {k: rows["a1"][k] for k in ("sentiment", "objections_raised", "report_summary")} == \
+            {k: stored[k] for k in ("sentiment", "objections_raised", "report_summary")}
+
+        summary = rows["a1"]["summary"]
+        assert reprocess(workdir, ("report",), "report")["done"] == 1
+        assert rows["a1"]["summary"] == summary and rows["a1"]["sentiment"] == "Positive"
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import pytest
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.bulk_ops import BulkTable
+from reset_dispatch_logs import csv_data, parse_logs, reset_dispatch_logs
+
+def log(i, reasoning="Language match"):
+    return {"id": f"lead-{i:04d}", "lead_name": f"Lead, {i}", "math_score": 80, "reasoning": reasoning}
+
+@pytest.fixture
+def rows(fake_upstreams):
+    """The fake's ai_dispatch_logs table, keyed by id."""
+    table = {}
+    fake_upstreams.tables["ai_dispatch_logs"] = ("id", table)
+    return table
+
+def test_chunked_upsert_diff_and_delete(fake_upstreams, rows):
+    async def run():
+        table = BulkTable("ai_dispatch_logs", chunk_size=100, concurrency=4)
+        report = await table.upsert([log(i) for i in range(450)])
+        assert report["rows"] == 450 and report["requests"] == 5 and report["failed"] == 0
+        assert fake_upstreams.stats["db_table"] == 5 and len(rows) == 450
+
+        # Dry run: a diff against the stored rows, nothing written
+        changed = [log(i, "Override") for i in range(10)] + [log(i) for i in range(10, 450)] + [log(450)]
+        dry = await BulkTable("ai_dispatch_logs", dry_run=True).upsert(changed)
+        assert (dry["inserted"], dry["updated"], dry["unchanged"]) == (1, 10, 440)
+        assert len(rows) == 450 and rows["lead-0000"]["reasoning"] == "Language match"
+        assert (await BulkTable("ai_dispatch_logs", dry_run=True).delete(["lead-0001", "missing"]))["keys"] == ["lead-0001"]
+
+        # Only the changed rows are sent
+        report = await table.upsert(changed, skip_unchanged=True)
+        assert report["rows"] == 11 and report["requests"] == 1
+        assert rows["lead-0000"]["reasoning"] == "Override" and len(rows) == 451
+
+        report = await table.delete([f"lead-{i:04d}" for i in range(300)])
+        assert report["rows"] == 300 and report["requests"] == 2 and len(rows) == 151
+        assert len(await table.fetch_all("id")) == 151
+        assert [r["id"] for r in await table.fetch(["Lead, 400"], column="lead_name")] == ["lead-0400"]
+    asyncio.run(run())
+
+def test_failed_chunks_are_retried_then_reported(fake_upstreams, rows):
+    async def run():
+        fake_upstreams.faults["db_table"] = 502
+        table = BulkTable("ai_dispatch_logs", chunk_size=10, retries=2, backoff=0.01)
+        report = await table.upsert([log(i) for i in range(20)])
+        assert report["rows"] == 0 and report["failed"] == 20 and len(report["errors"]) == 2
+        assert fake_upstreams.stats["db_table"] == 6  # two chunks, three attempts each
+        fake_upstreams.faults.clear()
+        report = await table.upsert([log(i) for i in range(20)])
+        assert report["rows"] == 20 and report["failed"] == 0 and len(rows) == 20
+    asyncio.run(run())
+
+def test_reset_clears_the_call_history_of_kept_logs(fake_upstreams, rows):
+    snapshot = parse_logs(csv_data)
+    rows.update({log["id"]: {**log, "chat_history": []} for log in snapshot})
+    rows[snapshot[0]["id"]]["chat_history"] = [{"summary": "Called about SIPs"}]
+    rows[snapshot[1]["id"]]["reasoning"] = "Admin override"
+    rows["stale"] = {"id": "stale", "lead_name": "Old lead", "chat_history": []}
+
+    args = argparse.Namespace(csv=None, dry_run=False, chunk_size=100, concurrency=2, retries=0)
+    assert asyncio.run(reset_dispatch_logs(args))
+    assert "stale" not in rows and len(rows) == len(snapshot)
+    assert rows[snapshot[0]["id"]]["chat_history"] == []
+    assert rows[snapshot[1]["id"]]["reasoning"] == snapshot[1]["reasoning"]
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
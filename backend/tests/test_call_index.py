@@ -0,0 +1,84 @@
+import asyncio
+import pytest
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.call_index import CallIndexService, chunk_text, decode_cursor, encode_cursor, interaction_row
+
+SUMMARY = ("Karen asked about mid cap funds for retirement. She worried the fees were too high. "
+           "The agent explained expense ratios and agreed to email a comparison.")
+
+def entry(session_id):
+    return {
+        "timestamp": "2026-10-12T10:15:00",
+        "conversation": "John: Hello Karen: Hi",
+        "summary": SUMMARY,
+        "call_analytics": {"duration_seconds": 312.4},
+        "handling_agent": "John",
+        "session_id": session_id,
+    }
+
+def test_chunking_and_rows():
+    chunks = chunk_text(SUMMARY, max_tokens=10)
+    assert len(chunks) == 3 and chunks[1] == "She worried the fees were too high."
+    assert chunk_text(SUMMARY) == [SUMMARY]
+    row = interaction_row(entry("s1"), "Karen", None, "INV-1")
+    assert row["interaction_id"] == "s1" and row["agent_name"] == "John"
+    assert row["date"] == "2026-10-12" and row["duration_sec"] == 312
+    cursor = encode_cursor(row)
+    assert decode_cursor(cursor) == ("2026-10-12T10:15:00", "s1")
+    # A cursor goes into the PostgREST filter, so only a timestamp and an id get through
+    for bad in ("not base64!", encode_cursor({"created_at": "yesterday", "interaction_id": "s1"}),
+                encode_cursor({"created_at": "2026-10-12T10:15:00", "interaction_id": 's1",and(x.eq.1)'})):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+def test_summary_chunks_embedded_in_batches(fake_upstreams):
+    async def run(service):
+        for i in range(3):
+            await service.index_call(entry(f"s{i}"), "Karen", "John")
+        await service.flush()
+
+    asyncio.run(run(CallIndexService()))
+    stats = fake_upstreams.snapshot()
+
+    # Three interaction upserts, then one embedding request and one chunk upsert for all calls
+    assert stats["embed"] == 1
+    assert stats["db_table"] == 4
+
+class RecordingRPC:
+    """Stands in for the Supabase client; remembers RPC calls and matches nothing."""
+
+    def __init__(self):
+        self.calls = []
+        self.data = []
+
+    def rpc(self, function, params):
+        self.calls.append((function, params))
+        return self
+
+    def execute(self):
+        return self
+
+def test_semantic_search_is_date_bounded(fake_upstreams):
+    service = CallIndexService()
+    service.supabase = RecordingRPC()
+    result = service.semantic_search("worried about fees", "John", "2026-10-01", "2026-10-08", 5)
+    assert result == {"results": [], "next_cursor": None}
+    function, params = service.supabase.calls[0]
+    assert function == "match_call_chunks" and params["since"] == "2026-10-01" and params["until"] == "2026-10-08"
+
+def test_semantic_search_rejects_a_cursor():
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api.calls import router
+
+    app = FastAPI()
+    app.include_router(router)
+    cursor = encode_cursor({"created_at": "2026-10-12T10:15:00", "interaction_id": "s1"})
+    response = TestClient(app).get("/calls/search", params={"q": "fees", "semantic": "true", "cursor": cursor})
+    assert response.status_code == 400 and "cursor" in response.json()["detail"]
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,71 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.client_protocol import (
+    FLAG_DELTA, FRAME_SPEAKER, FRAME_TRANSCRIPT, BinaryDecoder, BinaryEncoder, JSONEncoder, negotiate_protocol,
+)
+
+def transcript(text, speaker, is_final=False, name=None):
+    message = {"type": "transcript", "data": text, "speaker": speaker, "is_final": is_final}
+    if name is not None:
+        message["speaker_name"] = name
+    return message
+
+def test_negotiation_falls_back_to_json():
+    assert negotiate_protocol(None, ["copilot.binary.v1"]) == ("binary", "copilot.binary.v1")
+    assert negotiate_protocol("json", ["other", "copilot.binary.v1"]) == ("binary", "copilot.binary.v1")
+    assert negotiate_protocol("binary", []) == ("binary", None)
+    assert negotiate_protocol("protobuf", []) == ("json", None)
+    assert negotiate_protocol(None, ["other"]) == ("json", None)
+
+def test_binary_round_trip_with_word_deltas():
+    messages = [
+        transcript("What", 1),
+        transcript("What about", 1),
+        transcript("What a bout liquidity", 1),  # a revised word
+        transcript("What about liquidity?", 1, True, "Karen"),
+        transcript("Let me", 0),  # new speaker: no delta across utterances
+        transcript("Let me check", 0, True, "John"),
+        transcript("नमस्ते  ji", None),  # double space can't be rebuilt from words: sent whole
+        transcript("नमस्ते  ji kaise", None, True, "Unknown"),
+        {"type": "assist", "status": "success", "answer": "Partial withdrawals after 3 months.", "context": [{"id": 2}]},
+        transcript("Yes", 1, True, "Karen"),
+    ]
+    encoder, decoder = BinaryEncoder(), BinaryDecoder()
+    frames = [encoder.encode(message) for message in messages]
+    decoded = [decoder.decode(frame) for batch in frames for frame in batch]
+    assert [m for m in decoded if m is not None] == messages
+
+    # Speaker names go out once, interims after the first are deltas carrying only new words
+    kinds = [frame[0] for batch in frames for frame in batch]
+    assert kinds.count(FRAME_SPEAKER) == 3
+    assert frames[1][0][1] & FLAG_DELTA and frames[1][0].endswith(b"about") and b"What" not in frames[1][0]
+    assert frames[2][0][1] & FLAG_DELTA and frames[2][0].endswith(b"a bout liquidity")
+    assert frames[4][0][0] == FRAME_TRANSCRIPT and not frames[4][0][1] & FLAG_DELTA
+    assert not frames[6][0][1] & FLAG_DELTA
+
+def test_binary_is_smaller_than_json():
+    words = "I am a bit worried about market volatility is my money actually safe".split()
+    messages = [transcript(" ".join(words[:n]), 1) for n in range(1, len(words))]
+    messages.append(transcript(" ".join(words), 1, True, "Karen"))
+    json_bytes = sum(len(f) for m in messages for f in JSONEncoder().encode(m))
+    encoder = BinaryEncoder()
+    binary_bytes = sum(len(f) for m in messages for f in encoder.encode(m))
+    assert binary_bytes * 5 < json_bytes
+
+def test_binary_protocol_end_to_end():
+    from benchmarks.load_ws_audio import parse_args, run_benchmark
+    report = run_benchmark(parse_args([
+        "--sessions", "1", "--seconds", "8", "--speed", "16", "--protocol", "binary",
+        "--llm-latency-ms", "5", "--embed-latency-ms", "5", "--db-latency-ms", "5",
+    ]))
+    assert report["errors"] == {}
+    assert report["stages_ms"]["final_transcript"]["count"] == 4
+    assert report["stages_ms"]["interim_transcript"]["count"] > 0
+
+if __name__ == "__main__":
+    test_negotiation_falls_back_to_json()
+    test_binary_round_trip_with_word_deltas()
+    test_binary_is_smaller_than_json()
+    test_binary_protocol_end_to_end()
@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import pytest
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from app.services.dispatch_engine import DispatchEngine, build_dispatch_logs, language_mask, parse_embeddings
+from dispatch_leads import dispatch_leads
+
+AGENTS = [
+    {"name": "Priya", "languages": ["English", "Hindi"], "performance_score": 4.8},
+    {"name": "Ravi", "languages": ["English", "Tamil"], "performance_score": 4.0},
+    {"name": "Meera", "languages": ["Marathi"], "performance_score": 3.5},
+]
+
+def test_parse_embeddings_and_language_mask():
+    matrix, present = parse_embeddings(["[1, 0]", [0, 1], None])
+    assert matrix.shape == (3, 2) and present.tolist() == [True, True, False]
+    mask = language_mask(["hindi", None, "Kannada"], [a["languages"] for a in AGENTS])
+    assert mask.tolist() == [[True, False, False], [True, True, True], [False, False, False]]
+
+def test_respects_language_and_capacity():
+    agent_vectors = np.eye(3, dtype=np.float32)
+    # Every lead is closest to Priya, but Tamil and Marathi speakers must go elsewhere
+    leads = [
+        {"name": "A", "preferred_language": "Hindi", "age": 30, "occupation": "Engineer"},
+        {"name": "B", "preferred_language": "Hindi"},
+        {"name": "C", "preferred_language": "Tamil"},
+        {"name": "D", "preferred_language": "Marathi"},
+        {"name": "E", "preferred_language": "Kannada"},
+    ]
+    lead_vectors = np.tile(np.array([1, 0.1, 0.1], dtype=np.float32), (len(leads), 1))
+    lead_vectors[1, 0] = 0.5  # B is a weaker match for Priya than A
+    lead_vectors[4, 0] = 0.3  # ...and E weaker still
+    result = DispatchEngine().run(
+        lead_vectors, agent_vectors, np.array([a["performance_score"] for a in AGENTS]),
+        [l.get("preferred_language") for l in leads], [a["languages"] for a in AGENTS], capacity=2,
+    )
+    assert result.assigned.tolist()[:4] == [0, 0, 1, 2]
+    assert result.assigned[4] == 1  # Priya is full; the unspoken language doesn't restrict
+    assert np.bincount(result.assigned, minlength=3).max() <= 2
+
+    logs = build_dispatch_logs(leads, AGENTS, result)
+    assert [log["assigned_agent"] for log in logs] == ["Priya", "Priya", "Ravi", "Meera", "Ravi"]
+    assert logs[0]["lead_persona"] == "Engineer, Age 30"
+    assert logs[0]["reasoning"].startswith("Speaks Hindi") and not logs[0]["is_override"]
+    assert logs[4]["is_override"] and "Priya scored higher" in logs[4]["reasoning"]
+    assert logs[4]["reasoning"].startswith("No agent speaks Kannada")
+    assert all(log["math_score"] >= log["second_score"] or log["is_override"] for log in logs)
+
+def test_large_batch_fills_every_lead_within_capacity():
+    rng = np.random.default_rng(1)
+    n_leads, n_agents = 20_000, 25
+    result = DispatchEngine().run(
+        rng.standard_normal((n_leads, 64), dtype=np.float32),
+        rng.standard_normal((n_agents, 64), dtype=np.float32),
+        rng.uniform(3, 5, n_agents),
+        [None] * n_leads, [["English"]] * n_agents,
+    )
+    counts = np.bincount(result.assigned, minlength=n_agents)
+    assert (result.assigned >= 0).all()
+    assert counts.max() <= int(np.ceil(n_leads / n_agents * 1.2))
+    # Capacity only ever pushes a lead to a lower-scoring agent
+    assert (result.assigned_score <= result.top_score + 1e-6).all()
+
+def test_dispatch_script_writes_only_unassigned_leads(fake_upstreams):
+    agents = {f"a{i}": {"agent_id": f"a{i}", **agent, "embedding": None} for i, agent in enumerate(AGENTS)}
+    leads = {f"l{i}": {"investor_id": f"l{i}", "name": name, "preferred_language": "English", "embedding": None}
+             for i, name in enumerate(["A", "B", "C"])}
+    logs = {"old": {"id": "old", "lead_name": "A", "assigned_agent": "Ravi"}}
+    fake_upstreams.tables.update(agents=("agent_id", agents), investors=("investor_id", leads),
+                                 ai_dispatch_logs=("id", logs))
+
+    args = argparse.Namespace(method="greedy", capacity=None, only_unassigned=True, dry_run=False,
+                              chunk_size=1, concurrency=2, retries=0)
+    assert asyncio.run(dispatch_leads(args))
+    assert sorted(log["lead_name"] for log in logs.values()) == ["A", "B", "C"]
+    assert all(key == log["id"] for key, log in logs.items())
+    # Everyone has a log now
+    assert asyncio.run(dispatch_leads(args)) and len(logs) == 3
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,88 @@
+import csv
+import sys
+import os
+import tempfile
+import threading
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import math
+import numpy as np
+from benchmarks.fake_upstreams import CSV_FILE_PATH, fake_embedding
+from app.services.fund_snapshot import FundSnapshotStore, build_snapshot, fund_text, parse_number
+from app.services.listening_agent import FundFilters, fund_matches
+
+def load_rows(limit: int = 120) -> list:
+    with open(CSV_FILE_PATH, newline="") as f:
+        return list(csv.DictReader(f))[:limit]
+
+class CountingEmbedder:
+    def __init__(self):
+        self.texts = 0
+
+    def __call__(self, texts: list) -> list:
+        self.texts += len(texts)
+        return [fake_embedding(t) for t in texts]
+
+def test_parse_number():
+    assert parse_number("-1.25") == -1.25 and parse_number("1,200") == 1200.0
+    for missing in ("", "-", "N/A", None, "abc"):
+        assert math.isnan(parse_number(missing))
+
+def test_build_and_search():
+    rows = load_rows()
+    with tempfile.TemporaryDirectory() as root:
+        build_snapshot(rows, root, CountingEmbedder(), "fake")
+        snapshot = FundSnapshotStore(root, check_seconds=0).get()
+
+        assert snapshot.rows == len(rows)
+        assert snapshot.numbers["returns_1yr"].dtype == np.float32
+        # Placeholders are unknown, not zero
+        dash = next(i for i, r in enumerate(rows) if r["alpha"] == "-")
+        assert snapshot.row(dash)["metadata"]["alpha"] is None
+
+        target = 17
+        hits = snapshot.search(fake_embedding(fund_text(rows[target])), threshold=0.0, count=3)
+        assert hits[0]["id"] == target + 1 and hits[0]["scheme_name"] == rows[target]["scheme_name"]
+        assert hits[0]["similarity"] > 0.99 and isinstance(hits[0]["metadata"]["risk_level"], int)
+
+        filters = FundFilters(category="Equity", max_risk_level=6, max_expense_ratio=1.0)
+        filtered = snapshot.search(fake_embedding("equity growth"), filters, threshold=-1.0, count=50)
+        assert filtered and all(fund_matches(f, filters) for f in filtered)
+        expected = sum(fund_matches({"metadata": snapshot.row(i)["metadata"]}, filters) for i in range(len(rows)))
+        assert len(filtered) == min(50, expected)
+
+        name = rows[5]["scheme_name"]
+        assert snapshot.find_by_name([name.upper()[:20]])[0]["scheme_name"].lower().startswith(name.lower()[:20])
+
+def test_hot_swap_reuses_embeddings_and_keeps_old_readers():
+    rows = load_rows()
+    embedder = CountingEmbedder()
+    with tempfile.TemporaryDirectory() as root:
+        first = build_snapshot(rows, root, embedder, "fake")
+        store = FundSnapshotStore(root, check_seconds=0)
+        old = store.get()
+        assert old.version == first and embedder.texts == len(rows)
+
+        edited = [dict(r) for r in rows]
+        edited[3]["returns_1yr"] = "99.9"
+        second = build_snapshot(edited, root, embedder, "fake")
+        assert embedder.texts == len(rows) + 1  # only the edited fund is re-embedded
+
+        # Readers swap on their next access; a reference taken before keeps working
+        results = []
+        reader = threading.Thread(target=lambda: results.append(store.get().version))
+        reader.start()
+        reader.join()
+        assert results == [second] and store.version == second
+        assert old.row(3)["metadata"]["returns_1yr"] != 99.9
+        assert store.get().row(3)["metadata"]["returns_1yr"] == 99.9
+
+        # A broken pointer doesn't take the current version down
+        with open(os.path.join(root, "CURRENT"), "w") as f:
+            f.write("missing-version")
+        assert not store.reload() and store.version == second
+
+if __name__ == "__main__":
+    test_parse_number()
+    test_build_and_search()
+    test_hot_swap_reuses_embeddings_and_keeps_old_readers()
@@ -0,0 +1,55 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_upstreams import FakeUpstreams
+from app.core.config import settings
+from app.core.session_store import SessionStore
+import app.core.session_store as session_store_module
+from app.services.lead_context import LeadContextService, describe_profile, merge_filters, profile_filters
+from app.services.listening_agent import FundFilters
+from app.services.rag_service import personalize
+
+def test_profile_fills_unstated_filters():
+    defaults = profile_filters({"risk_appetite": "Medium", "sip_capacity": 5000})
+    assert defaults.max_risk_level == 5 and defaults.max_min_sip == 5000
+    merged = merge_filters(FundFilters(max_risk_level=2, category="Debt"), defaults)
+    assert merged.max_risk_level == 2 and merged.category == "Debt" and merged.max_min_sip == 5000
+    assert profile_filters({"risk_appetite": "High"}).max_risk_level is None
+
+def test_personalize_promotes_shortlist():
+    funds = [{"id": 1, "scheme_name": "A"}, {"id": 2, "scheme_name": "B"}]
+    shortlist = [{"id": 2, "scheme_name": "B"}, {"id": 3, "scheme_name": "C", "metadata": {"risk_level": "6"}}, {"id": 4, "scheme_name": "D"}]
+    ranked = personalize(funds, shortlist, FundFilters(max_risk_level=5))
+    assert [f["id"] for f in ranked] == [2, 1, 4]
+
+def test_bootstrap_loads_profile_and_shortlist():
+    async def run(service):
+        context = await service.bootstrap("s-lead", "bench-lead", "Karen")
+        stored = (await session_store_module._store.get_session("s-lead"))["lead_context"]
+        return context, stored
+
+    session_store_module._store = SessionStore()
+    original = settings.SUPABASE_URL, settings.SUPABASE_KEY
+    try:
+        with FakeUpstreams() as fake:
+            env = fake.env()
+            settings.SUPABASE_URL, settings.SUPABASE_KEY = env["SUPABASE_URL"], env["SUPABASE_KEY"]
+            context, stored = asyncio.run(run(LeadContextService()))
+    finally:
+        settings.SUPABASE_URL, settings.SUPABASE_KEY = original
+        session_store_module._store = None
+
+    assert stored == context
+    assert context["profile"]["risk_appetite"] == "Medium"
+    assert context["dispatch"]["lead_persona"] == "Cautious saver, Age 41"
+    assert len(context["prior_calls"]) == 1
+    shortlist = context["fund_shortlist"]
+    assert shortlist and all(int(f["metadata"]["risk_level"]) <= 5 for f in shortlist)
+    assert "risk appetite Medium" in describe_profile(context)
+
+if __name__ == "__main__":
+    test_profile_fills_unstated_filters()
+    test_personalize_promotes_shortlist()
+    test_bootstrap_loads_profile_and_shortlist()
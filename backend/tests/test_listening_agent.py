@@ -0,0 +1,37 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.listening_agent import FundFilters, fund_matches, parse_listening_result
+
+def test_parses_json_and_normalizes_fields():
+    raw = '''Here you go:
+    {"trigger_valid": "yes", "intent_type": "Goal", "search_query": "funds for retirement",
+     "mentioned_funds": "Axis Bluechip, HDFC Top 100", "filters": {"max_risk_level": 3, "max_min_sip": 5000}}'''
+    result = parse_listening_result(raw, "let me check")
+    assert result.trigger_valid is True
+    assert result.intent_type == "recommendation"
+    assert result.mentioned_funds == ["Axis Bluechip", "HDFC Top 100"]
+    assert result.filters.max_risk_level == 3
+    assert result.has_intent
+
+def test_falls_back_to_plain_text_answers():
+    assert parse_listening_result("NO", "let me check").trigger_valid is False
+    assert not parse_listening_result("NO_INTENT").has_intent
+    result = parse_listening_result("YES\nreturns of Axis Bluechip", "let me check")
+    assert result.trigger_valid is True
+    assert result.search_query == "returns of Axis Bluechip"
+
+def test_fund_filters_use_metadata():
+    fund = {"scheme_name": "X", "category": "Equity", "returns_1yr": 12.0,
+            "metadata": {"risk_level": "6", "expense_ratio": "0.5", "min_sip": "500", "sub_category": "Mid Cap Mutual Funds"}}
+    assert fund_matches(fund, FundFilters(category="equity", sub_category="Mid Cap Mutual Funds", max_min_sip=1000))
+    assert not fund_matches(fund, FundFilters(max_risk_level=3))
+    assert not fund_matches(fund, FundFilters(category="Debt"))
+    # Missing values never exclude a fund
+    assert fund_matches({"scheme_name": "Y"}, FundFilters(max_expense_ratio=0.1))
+
+if __name__ == "__main__":
+    test_parses_json_and_normalizes_fields()
+    test_falls_back_to_plain_text_answers()
+    test_fund_filters_use_metadata()
@@ -0,0 +1,89 @@
+import asyncio
+import sys
+import os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.fake_upstreams import FakeUpstreams
+from app.services.llm_gateway import CircuitBreaker, LLMGateway, LLMProvider, LLMUnavailable
+from app.services.llm_scheduler import LLMScheduler
+
+PROMPT = "Summary:"
+
+def make_gateway(primary: FakeUpstreams, fallback: FakeUpstreams, failures: int = 2) -> LLMGateway:
+    return LLMGateway([
+        LLMProvider("primary", f"http://127.0.0.1:{primary.http_port}/openai/v1", "fake", "fake-model",
+                    CircuitBreaker(failure_threshold=failures, reset_timeout=60)),
+        LLMProvider("fallback", f"http://127.0.0.1:{fallback.http_port}/openai/v1", "fake", "fake-model",
+                    CircuitBreaker(failure_threshold=failures, reset_timeout=60)),
+    ])
+
+def test_circuit_breaker_half_open_probe():
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    now[0] = 10
+    assert breaker.allow()       # single probe
+    assert not breaker.allow()
+    breaker.record_failure()     # probe failed: open again
+    assert breaker.state == "open"
+    now[0] = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+def test_gateway_hedges_fails_over_and_trips_breaker():
+    with FakeUpstreams() as primary, FakeUpstreams() as fallback:
+        gateway = make_gateway(primary, fallback)
+
+        async def run():
+            # Healthy primary answers alone
+            assert await gateway.complete(PROMPT, "summary", deadline=2.0)
+            assert primary.stats["llm"] == 1 and fallback.stats["llm"] == 0
+
+            # Slow primary: the hedge to the fallback wins well before the primary finishes
+            primary.latency_ms["llm"] = 1500
+            start = time.perf_counter()
+            assert await gateway.complete(PROMPT, "summary", deadline=2.0)
+            assert time.perf_counter() - start < 1.4
+            assert fallback.stats["llm"] == 1
+            primary.latency_ms["llm"] = 0
+
+            # Failing primary: immediate fail-over, then the open breaker skips it
+            primary.faults["llm"] = 503
+            for _ in range(3):
+                assert await gateway.complete(PROMPT, "summary", deadline=2.0)
+            assert primary.stats["llm"] == 4
+            assert gateway.providers[0].breaker.state == "open"
+
+            # Nothing answers within the deadline
+            fallback.latency_ms["llm"] = 1000
+            try:
+                await gateway.complete(PROMPT, "summary", deadline=0.3)
+                assert False, "expected LLMUnavailable"
+            except LLMUnavailable:
+                pass
+
+        asyncio.run(run())
+
+def test_fail_over_requests_are_charged_to_the_quota():
+    with FakeUpstreams() as primary, FakeUpstreams() as fallback:
+        gateway = make_gateway(primary, fallback)
+        gateway.scheduler = LLMScheduler(rpm=60)
+        primary.faults["llm"] = 503
+
+        async def run():
+            assert await gateway.complete(PROMPT, "summary", max_tokens=100, deadline=2.0)
+            assert primary.stats["llm"] == fallback.stats["llm"] == 1
+            # Two requests went out, so two came out of the bucket (one refills per second)
+            assert 58 <= gateway.scheduler.requests.level < 59
+
+        asyncio.run(run())
+
+if __name__ == "__main__":
+    test_circuit_breaker_half_open_probe()
+    test_gateway_hedges_fails_over_and_trips_breaker()
+    test_fail_over_requests_are_charged_to_the_quota()
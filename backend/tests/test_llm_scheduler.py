@@ -0,0 +1,57 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.llm_scheduler import LLMScheduler, TokenBucket
+
+def test_token_bucket_refills_over_time():
+    now = [0.0]
+    bucket = TokenBucket(60, clock=lambda: now[0])  # 1 per second, burst of 60
+    bucket.take(60)
+    assert bucket.wait_time(2) == 2.0
+    now[0] = 1.5
+    assert bucket.wait_time(1) == 0.0
+    # Requests larger than the bucket wait for it to fill rather than forever
+    assert bucket.wait_time(1000) == 58.5
+
+def test_priority_then_round_robin_per_agent():
+    async def run():
+        scheduler = LLMScheduler(max_concurrency=1)
+        order = []
+        gate = asyncio.Event()
+
+        async def call(stage, agent, label):
+            async with scheduler.slot(stage, agent):
+                order.append(label)
+                if label == "blocker":
+                    await gate.wait()
+
+        blocker = asyncio.create_task(call("report", "x", "blocker"))
+        await asyncio.sleep(0)
+        queued = [
+            ("report", "a", "report-a1"), ("report", "a", "report-a2"), ("summary", "b", "summary-b"),
+            ("rolling_summary", "a", "rolling-a"),
+            ("listen", "a", "listen-a"), ("answer", "a", "answer-a"), ("listen", "b", "listen-b"),
+        ]
+        tasks = []
+        for args in queued:
+            tasks.append(asyncio.create_task(call(*args)))
+            await asyncio.sleep(0)
+        assert scheduler.queued() == len(queued)
+
+        # A waiter whose deadline passes leaves the queue without taking a slot
+        abandoned = asyncio.create_task(call("listen", "c", "abandoned"))
+        await asyncio.sleep(0)
+        abandoned.cancel()
+
+        gate.set()
+        await asyncio.gather(blocker, *tasks)
+        assert order == ["blocker", "listen-a", "listen-b", "answer-a", "rolling-a", "report-a1", "summary-b", "report-a2"]
+        assert scheduler.in_flight == 0 and scheduler.queued() == 0
+
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    test_token_bucket_refills_over_time()
+    test_priority_then_round_robin_per_agent()
@@ -0,0 +1,34 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from benchmarks.load_ws_audio import parse_args, run_benchmark
+
+def test_load_benchmark_offline():
+    # Short, accelerated run: 2 calls x 16s of audio -> 8 finals each, one "let me check"
+    args = parse_args([
+        "--sessions", "2",
+        "--seconds", "16",
+        "--speed", "16",
+        "--llm-latency-ms", "5",
+        "--embed-latency-ms", "5",
+        "--db-latency-ms", "5",
+        "--deepgram-idle-timeout", "1",
+    ])
+    report = run_benchmark(args)
+
+    assert report["errors"] == {}
+    stages = report["stages_ms"]
+    assert stages["ws_connect"]["count"] == 2
+    assert stages["final_transcript"]["count"] == 16
+    assert stages["assist"]["count"] >= 2
+    assert report["assist_status"].get("success", 0) >= 2
+    assert stages["end_call"]["count"] == 2
+    assert report["server"]["rss_mb"] > 0
+    assert report["upstream_calls"]["deepgram_connections"] == 2
+    # Server-side stage histograms scraped from /metrics
+    assert report["server_stages_ms"]["rag_stage_seconds[embed]"]["count"] >= 2
+    assert report["server_stages_ms"]["stt_first_transcript_seconds[deepgram]"]["count"] == 2
+
+if __name__ == "__main__":
+    test_load_benchmark_offline()
@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from app.core.config import settings
+from app.services.local_stt_service import ENGINE_PACKAGES, LocalSTTService
+
+SR = 16000
+CHUNK = SR * 2 // 10  # 100ms messages, as the browser sends them
+
+def make_call_audio():
+    # 1s line noise, 1s "speech", 1s line noise, 1s "speech", 0.5s line noise
+    rng = np.random.default_rng(0)
+    noise = lambda s: rng.normal(0, 30, int(SR * s)).astype(np.int16)
+    t = np.arange(SR) / SR
+    speech = (np.sin(2 * np.pi * 220 * t) * 8000 * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))).astype(np.int16)
+    return np.concatenate([noise(1), speech, noise(1), speech, noise(0.5)]).tobytes()
+
+class StubTranscriber(LocalSTTService):
+    """Answers in-process with the segment's length instead of running an engine in the pool."""
+
+    def __init__(self):
+        super().__init__()
+        self.segments = []
+
+    async def _transcribe(self, pcm: bytes, language: str) -> str:
+        self.segments.append(len(pcm))
+        return f"{len(pcm) // (SR * 2 // 1000)} ms"
+
+class Client:
+    def __init__(self, pcm: bytes):
+        self.chunks = [pcm[i:i + CHUNK] for i in range(0, len(pcm), CHUNK)] + [b""]
+        self.messages = []
+
+    async def receive_bytes(self) -> bytes:
+        await asyncio.sleep(0)  # lets interim transcriptions run between messages
+        return self.chunks.pop(0)
+
+    async def send_message(self, msg: dict):
+        self.messages.append(msg)
+
+def transcribe(monkeypatch, **overrides) -> list:
+    # The stub needs no engine installed
+    monkeypatch.setitem(ENGINE_PACKAGES, settings.LOCAL_STT_ENGINE, "numpy")
+    for key, value in overrides.items():
+        monkeypatch.setattr(settings, key, value)
+    client = Client(make_call_audio())
+    asyncio.run(StubTranscriber().start_transcription(client))
+    return client.messages
+
+def test_utterances_get_interims_then_one_final(monkeypatch):
+    messages = transcribe(monkeypatch, LOCAL_STT_INTERIM_MS=300)
+    finals = [m for m in messages if m["is_final"]]
+    assert len(finals) == 2
+    assert all(m["type"] == "transcript" and m["speaker"] is None for m in messages)
+
+    # Each utterance (1s plus the VAD's 300ms hangover) gets growing interims before its final
+    first_final = messages.index(finals[0])
+    for utterance, final in ((messages[:first_final], finals[0]), (messages[first_final + 1:-1], finals[1])):
+        interims = [int(m["data"].split()[0]) for m in utterance]
+        assert len(interims) >= 2 and interims == sorted(interims)
+        assert 1200 <= int(final["data"].split()[0]) <= 1400
+        assert interims[-1] <= int(final["data"].split()[0])
+
+def test_long_utterances_are_cut_at_the_max_segment(monkeypatch):
+    whole = transcribe(monkeypatch, LOCAL_STT_INTERIM_MS=60000)
+    cut = transcribe(monkeypatch, LOCAL_STT_INTERIM_MS=60000, LOCAL_STT_MAX_SEGMENT_MS=500)
+    assert all(m["is_final"] for m in whole + cut)
+    lengths = [int(m["data"].split()[0]) for m in cut]
+    # Cut once a message takes the segment past the max
+    assert len(cut) > len(whole) and max(lengths) <= 600
+    # Cutting loses no speech, however short the last piece
+    assert sum(lengths) == sum(int(m["data"].split()[0]) for m in whole)
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,88 @@
+import asyncio
+import datetime
+import pytest
+import sys
+import time
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import fakeredis
+from app.services import performance_rollups
+from app.services.performance_rollups import RedisRollupStore, RollupStore
+
+def history_entry(session_id, seconds):
+    return {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "session_id": session_id,
+        "handling_agent": "Priya",
+        "call_analytics": {"sentiment": "Positive", "duration": "Unknown", "duration_seconds": seconds},
+    }
+
+async def exercise(store: RollupStore):
+    assert await store.record_call("Priya", history_entry("s1", 120))
+    assert await store.record_call("Priya", history_entry("s2", 60))
+    assert not await store.record_call("Priya", history_entry("s2", 60))  # socket teardown retried
+    await store.record_call("Ravi", history_entry("s3", 30))
+    await store.record_call("Team:North", history_entry("s4", 45))
+    await store.record_report("Priya", "s1", {"sentiment": "positive", "objections": ["Too risky", "too  risky"]})
+    await store.record_report("Priya", "s2", {"sentiment": "Negative", "objections": ["Too risky", "High fees"]})
+
+    stats = await store.get_agent_stats("Priya", days=3)
+    totals = stats["totals"]
+    assert totals["calls"] == 2 and totals["talk_seconds"] == 180 and totals["avg_call_seconds"] == 90
+    assert totals["sentiment"] == {"Positive": 1, "Negative": 1} and totals["positive_share"] == 0.5
+    assert totals["objections"][0] == {"objection": "too risky", "count": 2}
+    assert stats["daily"][0]["calls"] == 2 and stats["daily"][1]["calls"] == 0
+    assert [row["agent"] for row in await store.leaderboard()] == ["Priya", "Ravi", "Team:North"]
+
+def test_memory_rollups():
+    asyncio.run(exercise(RollupStore()))
+
+def test_memory_dedup_is_bounded(monkeypatch):
+    monkeypatch.setattr(performance_rollups, "SEEN_MAX", 2)
+    async def run():
+        store = RollupStore()
+        for session_id in ("s1", "s2", "s3"):
+            assert await store.record_call("Priya", history_entry(session_id, 10))
+        assert list(store._seen) == ["call:s2", "call:s3"]
+        assert not await store.record_call("Priya", history_entry("s3", 10))
+    asyncio.run(run())
+
+def test_memory_day_counters_expire(monkeypatch):
+    monkeypatch.setattr(performance_rollups, "DAY_TTL", 0.2)
+    async def run():
+        store = RollupStore()
+        old = {**history_entry("s1", 10), "timestamp": "2026-01-05T10:00:00"}
+        await store.record_call("Priya", old)
+        time.sleep(0.3)
+        await store.record_call("Priya", history_entry("s2", 10))
+        assert "rollup:agent:Priya:2026-01-05" not in store._counters
+        assert (await store.get_agent_stats("Priya", days=1))["totals"]["calls"] == 2
+    asyncio.run(run())
+
+async def fail_once(store: RollupStore, monkeypatch):
+    apply = store._apply
+    async def failing(*args):
+        monkeypatch.setattr(store, "_apply", apply)
+        raise ConnectionError("write lost")
+    monkeypatch.setattr(store, "_apply", failing)
+    with pytest.raises(ConnectionError):
+        await store.record_call("Priya", history_entry("s1", 10))
+    # The failed session isn't marked as counted, so its retry is
+    assert await store.record_call("Priya", history_entry("s1", 10))
+    assert (await store.get_agent_stats("Priya", days=1))["totals"]["calls"] == 1
+
+def test_failed_apply_releases_the_claim(monkeypatch):
+    asyncio.run(fail_once(RollupStore(), monkeypatch))
+    asyncio.run(fail_once(RedisRollupStore(fakeredis.FakeAsyncRedis()), monkeypatch))
+
+def test_redis_rollups():
+    async def run():
+        client = fakeredis.FakeAsyncRedis()
+        await exercise(RedisRollupStore(client))
+        assert await client.ttl(f"rollup:agent:Priya:{datetime.date.today().isoformat()}") > 0
+        assert await client.ttl("rollup:agent:Priya") == -1
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
@@ -0,0 +1,42 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.prompt_builder import compact_lines, count_tokens, render_context, split_recent
+
+LINES = [f"{'Agent' if i % 2 else 'Lead'}: turn {i} about mid cap funds and SIP amounts" for i in range(200)]
+
+def test_split_recent_keeps_whole_turns_within_budget():
+    older, recent = split_recent(LINES, 100)
+    assert older + recent == LINES
+    assert recent[-1] == LINES[-1]
+    assert count_tokens("\n".join(recent)) <= 100
+    # Nothing to drop when the call is short
+    assert split_recent(LINES[:3], 100) == ([], LINES[:3])
+
+def test_compact_lines_keeps_opening_and_recent_turns():
+    text = compact_lines(LINES, 300)
+    assert count_tokens(text) <= 300
+    assert text.startswith(LINES[0])
+    assert text.endswith(LINES[-1])
+    assert "turns omitted" in text
+
+def test_render_context_picks_fields_by_intent():
+    fund = {"scheme_name": "Axis Midcap Fund", "category": "Equity", "returns_1yr": 12.0,
+            "metadata": {"sub_category": "Mid Cap Mutual Funds", "returns_1yr": "12.0", "risk_level": "6",
+                         "expense_ratio": "0.5", "sd": "14.2", "fund_manager": "Shreyash Devalkar", "amc_name": "Axis"}}
+    kb = {"content": "Partial withdrawals are allowed after 3 months."}
+
+    recommendation = render_context([fund, kb], "recommendation", 500)
+    assert "Axis Midcap Fund (Equity / Mid Cap Mutual Funds): 1Y 12.0%, risk 6/6" in recommendation
+    assert "manager" not in recommendation and "amc_name" not in recommendation
+    assert recommendation.endswith(kb["content"])
+    assert "std dev 14.2" in render_context([fund], "objection", 500)
+
+    # Budget stops adding docs
+    assert render_context([fund, kb], "information", count_tokens(render_context([fund], "information", 500)) + 1).count("\n") == 0
+
+if __name__ == "__main__":
+    test_split_recent_keeps_whole_turns_within_budget()
+    test_compact_lines_keeps_opening_and_recent_turns()
+    test_render_context_picks_fields_by_intent()
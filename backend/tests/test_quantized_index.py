@@ -0,0 +1,54 @@
+import sys
+import os
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from app.services.quantized_index import QuantizedIndex, normalize, quantize_int8, save_index
+
+def vectors(rows: int = 5000, dim: int = 64, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((32, dim))
+    return normalize(centres[rng.integers(0, 32, rows)] + 0.7 * rng.standard_normal((rows, dim)))
+
+def test_int8_codes_reconstruct_closely():
+    data = vectors()
+    codes, scale = quantize_int8(data)
+    assert codes.dtype == np.int8 and scale.shape == (data.shape[1],)
+    assert np.abs(codes * scale - data).max() <= scale.max() / 2 + 1e-6
+
+def test_search_matches_exact_and_respects_mask():
+    data = vectors()
+    queries = vectors(50, seed=1)
+    with tempfile.TemporaryDirectory() as directory:
+        save_index(directory, "embeddings", data)
+        index = QuantizedIndex(directory)
+        assert index.scan_bytes == data.size  # one byte per dimension
+
+        hits = 0
+        for q in queries:
+            ids, scores = index.search(q, 10)
+            expected = np.argsort(-(data @ q))[:10]
+            hits += len(set(ids.tolist()) & set(expected.tolist()))
+            # Returned scores are exact cosines, best first
+            assert np.allclose(scores, data[ids] @ q, atol=1e-5) and np.all(np.diff(scores) <= 0)
+        assert hits / (10 * len(queries)) >= 0.99
+
+        mask = np.zeros(len(data), dtype=bool)
+        mask[::7] = True
+        ids, _ = index.search(queries[0], 10, mask)
+        assert len(ids) == 10 and np.all(ids % 7 == 0)
+        assert len(index.search(queries[0], 10, np.zeros(len(data), dtype=bool))[0]) == 0
+
+def test_falls_back_to_exact_without_codes():
+    data = vectors(500)
+    with tempfile.TemporaryDirectory() as directory:
+        np.save(os.path.join(directory, "embeddings.npy"), data)
+        index = QuantizedIndex(directory)
+        ids, _ = index.search(data[42], 3)
+        assert index.codes is None and ids[0] == 42
+
+if __name__ == "__main__":
+    test_int8_codes_reconstruct_closely()
+    test_search_matches_exact_and_respects_mask()
+    test_falls_back_to_exact_without_codes()
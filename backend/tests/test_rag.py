@@ -20,7 +20,7 @@ async def test_rag():
     print("Testing RAG Service...")
     
     # 1. Identify Question
-    transcript = service.get_transcript(session_id)
+    transcript = await service.get_transcript(session_id)
     print(f"Transcript: {transcript}")
     
     question = service.identify_last_question(transcript)
@@ -0,0 +1,65 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from app.services.resampler import AudioNormalizer, PolyphaseResampler
+
+def tone(freq: float, rate: int, seconds: float = 1.0, amplitude: float = 8000.0) -> np.ndarray:
+    t = np.arange(int(rate * seconds)) / rate
+    return amplitude * np.sin(2 * np.pi * freq * t)
+
+def peak_hz(samples: np.ndarray, rate: int) -> float:
+    spectrum = np.abs(np.fft.rfft(samples * np.hanning(len(samples))))
+    return np.fft.rfftfreq(len(samples), 1 / rate)[spectrum.argmax()]
+
+def test_output_length_matches_ratio():
+    for rate in (8000, 22050, 44100, 48000):
+        y = PolyphaseResampler(rate).process(tone(440, rate))
+        assert abs(len(y) - 16000) <= 1
+
+def test_tone_is_preserved():
+    for rate in (8000, 44100, 48000):
+        y = PolyphaseResampler(rate).process(tone(1000, rate))
+        assert abs(peak_hz(y, 16000) - 1000) < 2
+        # Skip the filter's start-up; the level stays within 1 dB
+        rms = np.sqrt(np.mean(y[1000:] ** 2))
+        assert abs(20 * np.log10(rms / (8000 / np.sqrt(2)))) < 1
+
+def test_above_nyquist_is_filtered():
+    y = PolyphaseResampler(48000).process(tone(10000, 48000))
+    rms = np.sqrt(np.mean(y[1000:] ** 2))
+    assert rms < 8000 / np.sqrt(2) * 0.01  # at least 40 dB down, not aliased to 6 kHz
+
+def test_chunking_does_not_change_output():
+    x = tone(700, 44100) + np.random.default_rng(0).normal(0, 300, 44100)
+    whole = PolyphaseResampler(44100).process(x)
+    resampler = PolyphaseResampler(44100)
+    cuts = np.sort(np.random.default_rng(1).choice(np.arange(1, len(x)), 40, replace=False))
+    pieces = [resampler.process(part) for part in np.split(x, cuts)]
+    assert np.allclose(np.concatenate(pieces), whole, atol=1e-2)
+
+def test_normalizer_downmixes_and_carries_partial_frames():
+    left = tone(1000, 48000, 0.5)
+    stereo = np.stack([left, -left / 2], axis=1).astype("<i2").tobytes()  # mean is left / 4
+    normalizer = AudioNormalizer(48000, 2)
+    # Chunk sizes that split frames (4 bytes) and samples (2 bytes)
+    out = b"".join(normalizer.process(stereo[i:i + 1001]) for i in range(0, len(stereo), 1001))
+    assert len(out) % 2 == 0 and abs(len(out) // 2 - 8000) <= 1
+    mono = np.frombuffer(out, dtype="<i2").astype(np.float64)
+    assert abs(peak_hz(mono, 16000) - 1000) < 4
+    rms = np.sqrt(np.mean(mono[1000:] ** 2))
+    assert abs(rms - 2000 / np.sqrt(2)) < 100
+
+def test_normalizer_passes_16k_mono_through():
+    pcm = tone(440, 16000, 0.1).astype("<i2").tobytes()
+    normalizer = AudioNormalizer(16000, 1)
+    assert normalizer.passthrough and normalizer.process(pcm) is pcm
+
+if __name__ == "__main__":
+    test_output_length_matches_ratio()
+    test_tone_is_preserved()
+    test_above_nyquist_is_filtered()
+    test_chunking_does_not_change_output()
+    test_normalizer_downmixes_and_carries_partial_frames()
+    test_normalizer_passes_16k_mono_through()
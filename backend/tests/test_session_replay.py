@@ -0,0 +1,64 @@
+import glob
+import sys
+import os
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.config import settings
+from app.core.session_recorder import open_recorder, read_records, record, recording
+
+def test_recorder_appends_only_inside_a_recorded_call():
+    original = settings.SESSION_RECORD_DIR
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            settings.SESSION_RECORD_DIR = root
+            assert open_recorder("not-started", create=False) is None
+            with recording(open_recorder("call/1")) as recorder:
+                recorder.write("start", {"session_id": "call/1"})
+                record("audio", b"\x01\x02")
+                record("llm", {"stage": "listen", "response": "ok"})
+            record("llm", {"stage": "answer"})  # outside the call: dropped
+            # An /assist on another worker appends to the same file
+            with recording(open_recorder("call/1", create=False)):
+                record("assist", {"trigger_word": "let me check"})
+            path = os.path.join(root, "call_1.rec")
+            with open(path, "ab") as f:
+                f.write(b"\x05torn")  # a crashed worker's partial record
+            records = [(kind, payload) for kind, _, payload in read_records(path)]
+            assert records == [
+                ("start", {"session_id": "call/1"}),
+                ("audio", b"\x01\x02"),
+                ("llm", {"stage": "listen", "response": "ok"}),
+                ("assist", {"trigger_word": "let me check"}),
+            ]
+        settings.SESSION_RECORD_DIR = None
+        assert open_recorder("call/1") is None
+    finally:
+        settings.SESSION_RECORD_DIR = original
+
+def test_recorded_call_replays_deterministically():
+    from benchmarks import load_ws_audio, replay_session
+    with tempfile.TemporaryDirectory() as root:
+        load_ws_audio.run_benchmark(load_ws_audio.parse_args([
+            "--sessions", "1", "--seconds", "16", "--speed", "16",
+            "--llm-latency-ms", "5", "--embed-latency-ms", "5", "--db-latency-ms", "5",
+            "--record-dir", root,
+        ]))
+        [path] = glob.glob(os.path.join(root, "*.rec"))
+        recorded = replay_session.Recording(path)
+        assert len(recorded.finals) == 8 and recorded.assists and recorded.end_call is not None
+
+        report = replay_session.run_replay(replay_session.parse_args([path, "--speed", "16"]))
+        assert report["errors"] == {}
+        assert report["transcript_mismatches"] == 0
+        assert report["assist_status"] == {"success": 1}
+        assert report["stages_ms"]["end_call"]["count"] == 1
+        # Every LLM call got one of the recorded answers. Most match their prompt exactly; at
+        # 16x on a loaded machine the transcript can run ahead of an /assist and fall back to order.
+        calls = report["upstream_calls"]
+        assert calls.get("llm_exact", 0) + calls.get("llm_order", 0) == len(recorded.llm)
+        assert calls.get("llm_exact", 0) >= 1 and "llm_miss" not in calls and "db_miss" not in calls
+
+if __name__ == "__main__":
+    test_recorder_appends_only_inside_a_recorded_call()
+    test_recorded_call_replays_deterministically()
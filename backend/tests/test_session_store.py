@@ -0,0 +1,134 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import asyncio
+import json
+import pytest
+import tempfile
+import threading
+import time
+
+import fakeredis
+import httpx
+from fakeredis import TcpFakeServer
+from websockets.asyncio.client import connect
+
+from app.core import session_store
+from app.core.session_store import RedisSessionStore, SessionStore
+from benchmarks.fake_upstreams import FakeUpstreams, free_port
+from benchmarks.load_ws_audio import start_api, wait_ready
+
+def test_push_is_routed_to_socket_owner():
+    async def run():
+        server = fakeredis.FakeServer()
+        worker_a = RedisSessionStore(fakeredis.FakeAsyncRedis(server=server), worker_id="worker-a")
+        worker_b = RedisSessionStore(fakeredis.FakeAsyncRedis(server=server), worker_id="worker-b")
+
+        queue = await worker_a.register_socket("s1", {"lead_name": "Karen"})
+        await worker_a.append_transcript("s1", "John: Hello")
+        await worker_a.append_transcript("s1", "Karen: Is my money safe?")
+
+        # Any worker sees the transcript and metadata
+        assert await worker_b.get_transcript("s1") == "John: Hello Karen: Is my money safe?"
+        assert (await worker_b.get_session("s1"))["worker"] == "worker-a"
+
+        # A push from worker B lands on worker A's socket queue
+        assert await worker_b.push("s1", {"type": "assist", "answer": "Yes"})
+        assert await asyncio.wait_for(queue.get(), timeout=5) == {"type": "assist", "answer": "Yes"}
+
+        # After hang-up nobody owns the socket, but the transcript stays for /end-call
+        await worker_a.unregister_socket("s1")
+        assert not await worker_b.push("s1", {"type": "assist"})
+        assert await worker_b.get_transcript_lines("s1") == ["John: Hello", "Karen: Is my money safe?"]
+
+        await worker_a.close()
+        await worker_b.close()
+
+    asyncio.run(run())
+
+def test_unregister_keeps_a_reconnect_on_another_worker():
+    async def run():
+        server = fakeredis.FakeServer()
+        worker_a = RedisSessionStore(fakeredis.FakeAsyncRedis(server=server), worker_id="worker-a")
+        worker_b = RedisSessionStore(fakeredis.FakeAsyncRedis(server=server), worker_id="worker-b")
+        await worker_a.register_socket("s1")
+        await worker_b.register_socket("s1")
+        # The old socket's hang-up arrives after the reconnect
+        await worker_a.unregister_socket("s1")
+        assert (await worker_a.get_session("s1"))["worker"] == "worker-b"
+        await worker_b.unregister_socket("s1")
+        assert "worker" not in await worker_a.get_session("s1")
+        await worker_a.close()
+        await worker_b.close()
+
+    asyncio.run(run())
+
+def test_local_sessions_are_dropped_a_ttl_after_hang_up(monkeypatch):
+    monkeypatch.setattr(session_store, "SESSION_TTL", 0.2)
+
+    async def run():
+        store = SessionStore()
+        await store.register_socket("s1", {"lead_name": "Karen"})
+        await store.append_transcript("s1", "Karen: Hello")
+        await store.unregister_socket("s1")
+        # Still there for /end-call
+        assert (await store.get_session("s1"))["lead_name"] == "Karen"
+        assert await store.get_transcript_lines("s1") == ["Karen: Hello"]
+
+        time.sleep(0.3)
+        await store.register_socket("s2", {"lead_name": "Ravi"})
+        await store.unregister_socket("s2")
+        assert await store.get_session("s1") == {} and await store.get_transcript_lines("s1") == []
+        assert (await store.get_session("s2"))["lead_name"] == "Ravi"
+
+    asyncio.run(run())
+
+def test_assist_and_end_call_on_another_worker():
+    redis_port = free_port()
+    redis_server = TcpFakeServer(("127.0.0.1", redis_port), server_type="redis")
+    threading.Thread(target=redis_server.serve_forever, daemon=True).start()
+
+    async def call(url_a: str, url_b: str):
+        async with connect(f"{url_a.replace('http', 'ws')}/ws/audio?session_id=mw-1&agent_name=John&lead_name=Karen") as ws:
+            # 6s of audio -> 3 scripted finals from the fake Deepgram
+            for _ in range(24):
+                await ws.send(bytes(8000))
+            finals = 0
+            while finals < 3:
+                msg = json.loads(await asyncio.wait_for(ws.recv(), timeout=10))
+                finals += msg.get("type") == "transcript" and msg.get("is_final")
+
+            async with httpx.AsyncClient(timeout=30) as http:
+                # Worker B has no socket for this session, yet finds its transcript...
+                res = (await http.post(f"{url_b}/assist", json={"session_id": "mw-1"})).json()
+                assert res["status"] == "success"
+
+                # ...and the result is pushed down worker A's socket
+                while True:
+                    msg = json.loads(await asyncio.wait_for(ws.recv(), timeout=10))
+                    if msg.get("type") == "assist":
+                        break
+                assert msg["answer"] == res["answer"]
+
+                report = await http.post(f"{url_b}/end-call", json={"session_id": "mw-1"})
+                assert report.status_code == 200
+                assert report.json()["sentiment"] == "Positive"
+
+    procs = []
+    try:
+        with FakeUpstreams(deepgram_idle_timeout=1) as fakes, tempfile.TemporaryDirectory() as workdir:
+            env = {**fakes.env(), "REDIS_URL": f"redis://127.0.0.1:{redis_port}"}
+            ports = [free_port(), free_port()]
+            procs = [start_api(env, port, workdir) for port in ports]
+            url_a, url_b = (f"http://127.0.0.1:{port}" for port in ports)
+            for url, proc in zip((url_a, url_b), procs):
+                asyncio.run(wait_ready(url, proc))
+            asyncio.run(call(url_a, url_b))
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait(timeout=15)
+        redis_server.shutdown()
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__]))
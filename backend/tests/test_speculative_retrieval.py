@@ -0,0 +1,57 @@
+import asyncio
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.core.session_store import SessionStore
+import app.core.session_store as session_store_module
+from app.services.speculative_retrieval import SpeculativeRetriever, extract_terms, session_stats
+
+class RecordingRAG:
+    """Stands in for RAGService's retrieval methods and counts embeddings."""
+    def __init__(self):
+        self.embedded = []
+
+    def get_embedding(self, text):
+        self.embedded.append(text)
+        return [0.1, 0.2]
+
+    def search_knowledge_base(self, embedding):
+        return [{"content": "Partial withdrawals are allowed after 3 months."}]
+
+    def search_mutual_funds(self, embedding, filters=None):
+        return [{"id": 7, "scheme_name": "Axis Midcap Fund", "category": "Equity", "returns_1yr": 12.0, "metadata": {}}]
+
+def test_extract_terms():
+    assert extract_terms("Which mid-cap fund would you suggest for retirement?") == ["mid cap", "retirement"]
+    assert extract_terms("Is my money safe with HDFC?") == ["risk", "amc:hdfc"]
+    assert extract_terms("Okay, send me the details by email.") == []
+
+def test_prefetch_then_lookup():
+    async def run():
+        session_store_module._store = SessionStore()
+        retriever = SpeculativeRetriever()
+        retriever._rag = rag = RecordingRAG()
+
+        retriever.on_final_utterance("s1", "Okay, thanks.")  # small talk: nothing fetched
+        retriever.on_final_utterance("s1", "Which mid cap fund would you suggest for retirement?")
+        retriever.on_final_utterance("s1", "And what about withdrawals?")  # coalesced behind the first
+        await retriever._running["s1"]
+        assert len(rag.embedded) == 2
+
+        hit = await retriever.lookup("s1", "mid cap funds for retirement")
+        assert hit["fund_docs"][0]["scheme_name"] == "Axis Midcap Fund"
+        assert await retriever.lookup("s1", "gold ETF expense ratio") is None
+
+        stats = session_stats(await session_store_module._store.get_session("s1"))
+        assert stats["prefetches"] == 2 and stats["hits"] == 1 and stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+
+    try:
+        asyncio.run(run())
+    finally:
+        session_store_module._store = None
+
+if __name__ == "__main__":
+    test_extract_terms()
+    test_prefetch_then_lookup()
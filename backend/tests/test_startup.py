@@ -0,0 +1,39 @@
+import subprocess
+import sys
+import os
+import time
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+def test_import_is_lazy():
+    # No settings in the environment and none of the SDKs loaded until they are used
+    check = (
+        "import sys, app.main, app.services.deepgram_service, app.core.config as config;"
+        "assert config.settings._settings is None;"
+        "loaded = [m for m in ('openai', 'supabase', 'langchain_google_genai') if m in sys.modules];"
+        "assert not loaded, loaded"
+    )
+    env = {k: v for k, v in os.environ.items() if k not in ("SUPABASE_URL", "SUPABASE_KEY", "GROQ_API_KEY", "OPENROUTER_EMBEDDING_KEY", "GOOGLE_API_KEY")}
+    result = subprocess.run([sys.executable, "-c", check], cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+def test_ready_reports_warmup(fake_upstreams):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 30
+        response = client.get("/ready")
+        while response.status_code == 503 and time.monotonic() < deadline:
+            time.sleep(0.05)
+            response = client.get("/ready")
+
+    body = response.json()
+    assert response.status_code == 200 and body["status"] == "ready"
+    assert set(body["checks"]) == {"supabase", "embeddings", "llm", "tokenizer", "redis"}
+    assert body["warmup_seconds"] is not None
+
+if __name__ == "__main__":
+    import pytest
+    sys.exit(pytest.main([__file__]))
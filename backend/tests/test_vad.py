@@ -0,0 +1,61 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+from app.services.vad_service import EnergyVAD, SpeechGate
+
+SR = 16000
+
+def make_call_audio():
+    # 1s line noise, 1s "speech", 2s line noise, 1s "speech", 1s line noise
+    rng = np.random.default_rng(0)
+    noise = lambda s: rng.normal(0, 30, int(SR * s)).astype(np.int16)
+    t = np.arange(SR) / SR
+    speech = (np.sin(2 * np.pi * 220 * t) * 8000 * (0.6 + 0.4 * np.sin(2 * np.pi * 3 * t))).astype(np.int16)
+    return np.concatenate([noise(1), speech, noise(2), speech, noise(1)]).tobytes()
+
+def run_vad(pcm: bytes, chunk: int):
+    vad = EnergyVAD()
+    flags = []
+    for i in range(0, len(pcm), chunk):
+        _, active = vad.process(pcm[i:i + chunk])
+        flags.extend(active.tolist())
+    return np.array(flags)
+
+def test_vad_is_independent_of_chunking():
+    pcm = make_call_audio()
+    whole = run_vad(pcm, len(pcm))
+    # Odd chunk sizes split samples and frames across messages
+    assert np.array_equal(whole, run_vad(pcm, 7777))
+    assert np.array_equal(whole, run_vad(pcm, 8000))
+
+def test_vad_finds_both_utterances_with_hangover():
+    flags = run_vad(make_call_audio(), 8000)
+    onsets = np.flatnonzero(np.diff(flags.astype(int)) == 1) + 1
+    offsets = np.flatnonzero(np.diff(flags.astype(int)) == -1) + 1
+    frames_per_s = 1000 // 30
+    assert len(onsets) == 2 and len(offsets) == 2
+    assert abs(onsets[0] - frames_per_s) <= 1
+    # Hangover (300ms = 10 frames) keeps the detector open after the utterance ends
+    assert offsets[0] - onsets[0] >= frames_per_s + 9
+
+def test_speech_gate_drops_silence_and_keeps_preroll():
+    pcm = make_call_audio()
+    gate = SpeechGate(preroll_ms=300)
+    out = b"".join(gate.process(pcm[i:i + 8000]) for i in range(0, len(pcm), 8000))
+
+    assert gate.bytes_in == len(pcm)
+    assert gate.bytes_out == len(out)
+    # Two 1s utterances + hangover + pre-roll out of 6s of audio
+    assert 2 * SR * 2 < len(out) < 3.5 * SR * 2
+
+    # Output starts with the pre-roll: the 10 frames of noise right before the first onset
+    frame_bytes = gate.vad.frame_len * 2
+    onset = 33 * frame_bytes
+    assert out[:10 * frame_bytes] == pcm[onset - 10 * frame_bytes:onset]
+
+if __name__ == "__main__":
+    test_vad_is_independent_of_chunking()
+    test_vad_finds_both_utterances_with_hangover()
+    test_speech_gate_drops_silence_and_keeps_preroll()
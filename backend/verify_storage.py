@@ -1,68 +1,74 @@
-import os
+"""
+Checks where call history is stored for dispatched leads: the chat_history column on
+ai_dispatch_logs and on the investor with the lead's name. Leads and investors are read
+in bulk, so --all covers every dispatch log in a few requests.
+
+    python verify_storage.py e21637fd-c75f-4f53-8d83-1f84199fde74
+    python verify_storage.py --all
+"""
+import argparse
 import asyncio
-from supabase import create_client, Client
-from dotenv import load_dotenv
-import json
+import logging
+from app.services.bulk_ops import CONCURRENCY, RETRIES, BulkTable
 
-load_dotenv()
+DEFAULT_LEAD_ID = "e21637fd-c75f-4f53-8d83-1f84199fde74"
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+def describe_history(row: dict) -> str:
+    if "chat_history" not in row:
+        return "no chat_history column"
+    history = row["chat_history"]
+    if isinstance(history, list):
+        keys = f", keys {sorted(history[0].keys())}" if history and isinstance(history[0], dict) else ""
+        return f"{len(history)} entries{keys}"
+    return f"{type(history).__name__}: {history}"
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    print("Error: SUPABASE_URL or SUPABASE_KEY not found.")
-    exit(1)
+async def verify_storage(args):
+    logs_table = BulkTable("ai_dispatch_logs", concurrency=args.concurrency, retries=args.retries)
+    investors_table = BulkTable("investors", "investor_id", concurrency=args.concurrency, retries=args.retries)
+    if args.all:
+        logs = await logs_table.fetch_all()
+        lead_ids = [log["id"] for log in logs]
+    else:
+        lead_ids = args.lead_ids or [DEFAULT_LEAD_ID]
+        logs = await logs_table.fetch(lead_ids)
+    print(f"--- Verifying storage for {len(lead_ids)} leads ---")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    names = [log["lead_name"] for log in logs if log.get("lead_name")]
+    investors = {}
+    for investor in await investors_table.fetch(names, column="name"):
+        investors.setdefault(investor.get("name"), investor)
 
-async def verify_storage():
-    lead_id = "e21637fd-c75f-4f53-8d83-1f84199fde74"
-    print(f"--- Verifying Storage for Lead ID: {lead_id} ---")
-    
-    # 1. Check ai_dispatch_logs
-    print("\n1. Checking ai_dispatch_logs...")
-    log_res = supabase.table("ai_dispatch_logs").select("*").eq("id", lead_id).execute()
-    if log_res.data:
-        log = log_res.data[0]
-        print(f"Lead Name: {log.get('lead_name')}")
-        print(f"Assigned Agent: {log.get('assigned_agent')}")
-        
-        # Check if chat_history column exists and has data
-        if "chat_history" in log:
-            history = log["chat_history"]
-            print(f"chat_history in ai_dispatch_logs: {type(history)}")
-            if isinstance(history, list):
-                print(f"Count: {len(history)}")
-            else:
-                print(f"Content: {history}")
-        else:
-            print("chat_history column NOT found in ai_dispatch_logs")
-            
+    logs_by_id = {log["id"]: log for log in logs}
+    missing_logs, missing_investors, with_history = 0, 0, 0
+    for lead_id in lead_ids:
+        log = logs_by_id.get(lead_id)
+        if log is None:
+            missing_logs += 1
+            print(f"{lead_id}: not found in ai_dispatch_logs")
+            continue
         lead_name = log.get("lead_name")
-        
-        # 2. Check investors
-        print(f"\n2. Checking investors for Name: '{lead_name}'...")
-        inv_res = supabase.table("investors").select("*").eq("name", lead_name).execute()
-        if inv_res.data:
-            inv = inv_res.data[0]
-            print(f"Investor ID: {inv.get('investor_id')}")
-            
-            if "chat_history" in inv:
-                history = inv["chat_history"]
-                print(f"chat_history in investors: {type(history)}")
-                if isinstance(history, list):
-                    print(f"Count: {len(history)}")
-                    if len(history) > 0:
-                        print("Sample Entry keys:", history[0].keys())
-                else:
-                    print(f"Content: {history}")
-            else:
-                print("chat_history column NOT found in investors")
+        line = f"{lead_id} {lead_name} (agent {log.get('assigned_agent')}): dispatch log {describe_history(log)}"
+        investor = investors.get(lead_name)
+        if investor is None:
+            missing_investors += 1
+            line += "; investor not found"
         else:
-            print(f"Investor not found with name: {lead_name}")
-            
-    else:
-        print("Lead not found in ai_dispatch_logs")
+            line += f"; investor {investor.get('investor_id')} {describe_history(investor)}"
+            with_history += bool(investor.get("chat_history"))
+        print(line)
+
+    print(f"\n{len(lead_ids)} leads: {missing_logs} without a dispatch log, "
+          f"{missing_investors} without an investor, {with_history} with investor chat history")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("lead_ids", nargs="*", help=f"Dispatch log ids (default: {DEFAULT_LEAD_ID})")
+    parser.add_argument("--all", action="store_true", help="Verify every dispatch log")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Requests in flight")
+    parser.add_argument("--retries", type=int, default=RETRIES, help="Retries per failed chunk")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(verify_storage(args))
 
 if __name__ == "__main__":
-    asyncio.run(verify_storage())
+    main()